@@ -0,0 +1,563 @@
+"""
+NOVA STORM Benchmarks
+Headless checks and timings for the bullet hell simulation.
+
+    python benchmarks.py determinism    # Same seeded run at 60, 120 and 144 Hz
+    python benchmarks.py collisions     # Mask vs circle hit tests on recorded or bot runs
+    python benchmarks.py boss           # Boss fight frame time at full power
+    python benchmarks.py steering       # Thousands of homing, accelerating, redirecting and splitting bullets
+    python benchmarks.py items          # A boss phase change cancelling thousands of bullets into score items
+    python benchmarks.py rewind         # Snapshot, delta and restore cost for the rewind ring
+    python benchmarks.py rollback       # Re-simulating the deepest netplay rollback under load
+"""
+
+import os
+import sys
+import math
+import time
+import json
+import zlib
+import argparse
+
+# No window or audio device needed
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+
+import numpy as np
+import bullet_hell as game
+from render_queue import RenderQueue
+from stage import load_stage
+from rewind import RewindBuffer
+from netplay import MAX_ROLLBACK
+
+SAMPLE_RATE = 12  # Trajectory samples per second; divides 60, 120 and 144 evenly
+
+# ============== SCENARIOS ==============
+
+def scripted_controls(t):
+    # Pilot as a function of game time (seconds), so every frame rate flies the same path.
+    # It never shoots: a kill lands on whichever step a bullet reaches its target, and one
+    # early kill reshuffles every wave after it. Focus only toggles on the sample grid,
+    # which every rate steps on, so the change of speed lands at the same moment.
+    return game.Controls(dx=math.sin(t * 1.3), dy=0.3 * math.sin(t * 0.5),
+                         focused=math.sin(math.floor(t * SAMPLE_RATE) / SAMPLE_RATE * 0.4) > 0.6)
+
+def waves_scenario(seed):
+    sim = game.Simulation(seed)
+    sim.player.invincible = float('inf')  # A death at one rate but not another would end the comparison
+    return sim
+
+def boss_scenario(seed):
+    sim = waves_scenario(seed)
+    sim.boss = game.Boss(sim.rng)
+    sim.boss_spawned = True
+    return sim
+
+def stage_scenario(seed):
+    stage = load_stage(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'stages', 'stage1.json'),
+                       list(game.ENEMY_KIND_BY_NAME))
+    sim = game.Simulation(seed, stage=stage)
+    sim.player.invincible = float('inf')
+    return sim
+
+SCENARIOS = {
+    'waves': waves_scenario,
+    'boss': boss_scenario,
+    'stage': stage_scenario,
+}
+
+def bot_controls(sim, t):
+    # Shoots constantly and slides under the first enemy it finds, or the boss
+    player = sim.player
+    if sim.boss and not sim.boss.defeated:
+        target = sim.boss.x
+    else:
+        xs = [table['x'][0] for table in sim.enemies.values() if len(table)]
+        target = xs[0] if xs else player.x
+    dx = max(-1.0, min(1.0, (target - player.x) / 20))
+    return game.Controls(dx=dx, dy=0.5 * math.sin(t * 0.7), shooting=True)
+
+# ============== DETERMINISM ==============
+
+def sample(sim):
+    enemies = {name: np.stack([table['x'], table['y']], axis=1).astype(np.float64)
+               for name, table in sim.enemies.items()}
+    bullets = np.stack([sim.enemy_bullets['x'], sim.enemy_bullets['y']], axis=1).astype(np.float64)
+    boss = (sim.boss.x, sim.boss.y) if sim.boss and not sim.boss.defeated else None
+    return {
+        'player': np.array([sim.player.x, sim.player.y]),
+        'enemies': enemies,
+        'boss': boss,
+        'bullets': bullets,
+        'score': sim.score,
+    }
+
+def record_trajectory(scenario, seed, hz, seconds):
+    sim = SCENARIOS[scenario](seed)
+    dt = game.FRAME_RATE / hz
+    steps_per_sample = hz // SAMPLE_RATE
+    samples = []
+    start = time.perf_counter()
+    for step in range(hz * seconds):
+        # Stick input read mid-step, so it sums to the same path at any rate
+        sim.step(scripted_controls((step + 0.5) / hz), dt)
+        sim.sounds.clear()
+        if (step + 1) % steps_per_sample == 0:
+            samples.append(sample(sim))
+    elapsed = time.perf_counter() - start
+    return samples, elapsed / (hz * seconds) * 1000
+
+def on_screen(points):
+    # Bullets in the cull margin leave at slightly different steps at each rate, so only
+    # bullets inside the screen have to find a partner
+    inside = ((points[:, 0] >= 0) & (points[:, 0] <= game.SCREEN_WIDTH) &
+              (points[:, 1] >= 0) & (points[:, 1] <= game.SCREEN_HEIGHT))
+    return points[inside]
+
+def nearest_distance(points, reference):
+    # Worst distance from any on-screen point to its closest reference point
+    points = on_screen(points)
+    if not len(points):
+        return 0.0
+    if not len(reference):
+        return math.inf
+    d = points[:, None, :] - reference[None, :, :]
+    return float(np.sqrt((d * d).sum(axis=2).min(axis=1).max()))
+
+def compare(samples, reference):
+    worst = {'player': 0.0, 'enemies': 0.0, 'boss': 0.0, 'bullets': 0.0}
+    enemy_mismatches = 0
+    bullet_count_diff = 0
+    for got, want in zip(samples, reference):
+        worst['player'] = max(worst['player'], float(np.abs(got['player'] - want['player']).max()))
+        for name, positions in got['enemies'].items():
+            expected = want['enemies'][name]
+            if len(positions) != len(expected):
+                enemy_mismatches += 1
+            elif len(positions):
+                worst['enemies'] = max(worst['enemies'], float(np.abs(positions - expected).max()))
+        if got['boss'] and want['boss']:
+            worst['boss'] = max(worst['boss'], max(abs(a - b) for a, b in zip(got['boss'], want['boss'])))
+        worst['bullets'] = max(worst['bullets'], nearest_distance(got['bullets'], want['bullets']),
+                               nearest_distance(want['bullets'], got['bullets']))
+        bullet_count_diff = max(bullet_count_diff,
+                                abs(len(on_screen(got['bullets'])) - len(on_screen(want['bullets']))))
+    return worst, enemy_mismatches, bullet_count_diff
+
+def run_determinism(args):
+    ok = True
+    for scenario in args.scenarios:
+        print(f"{scenario}: seed {args.seed}, {args.seconds}s of game time, compared to 60 Hz")
+        print(f"  {'rate':>6} {'ms/step':>8} {'player':>8} {'enemies':>8} {'boss':>8} {'bullets':>8}"
+              f" {'count':>6} {'enemy#':>7} {'score':>8}")
+        reference = None
+        for hz in args.rates:
+            samples, ms = record_trajectory(scenario, args.seed, hz, args.seconds)
+            if reference is None:
+                reference = samples
+                print(f"  {hz:>4}Hz {ms:>8.3f} {'-':>8} {'-':>8} {'-':>8} {'-':>8} {'-':>6} {'-':>7}"
+                      f" {samples[-1]['score']:>8}")
+                continue
+            worst, enemy_mismatches, count_diff = compare(samples, reference)
+            print(f"  {hz:>4}Hz {ms:>8.3f} {worst['player']:>8.2f} {worst['enemies']:>8.2f} {worst['boss']:>8.2f}"
+                  f" {worst['bullets']:>8.2f} {count_diff:>6} {enemy_mismatches:>7} {samples[-1]['score']:>8}")
+            if max(worst.values()) > args.tolerance:
+                ok = False
+    print("PASS" if ok else f"FAIL: trajectories differ by more than {args.tolerance} px")
+    return 0 if ok else 1
+
+# ============== COLLISIONS ==============
+
+class CollisionProbe(game.Simulation):
+    """Plays with the mask hit tests and runs the old circle tests beside them on the same state"""
+    def __init__(self, seed, bullet_cancel=True, stage=None):
+        super().__init__(seed, bullet_cancel, stage)
+        self.stats = {}
+
+    def tally(self, name, circle, mask, circle_time, mask_time):
+        stats = self.stats.setdefault(name, dict(calls=0, circle=0, mask=0, both=0, circle_only=0,
+                                                 mask_only=0, circle_time=0.0, mask_time=0.0))
+        circle = set(zip(*(rows.tolist() for rows in circle)))
+        mask = set(zip(*(rows.tolist() for rows in mask)))
+        stats['calls'] += 1
+        stats['circle'] += len(circle)
+        stats['mask'] += len(mask)
+        stats['both'] += len(circle & mask)
+        stats['circle_only'] += len(circle - mask)
+        stats['mask_only'] += len(mask - circle)
+        stats['circle_time'] += circle_time
+        stats['mask_time'] += mask_time
+
+    def find_enemy_hits(self, bullets, live, kind, table):
+        start = time.perf_counter()
+        hits = super().find_enemy_hits(bullets, live, kind, table)
+        middle = time.perf_counter()
+        circle = game.circle_hits(bullets, live, table['x'], table['y'], game.ENEMY_HIT_RADIUS)
+        end = time.perf_counter()
+        self.tally(kind.name, circle, hits, end - middle, middle - start)
+        return hits
+
+    def find_boss_hits(self, bullets, live, boss):
+        # The boss is hit per part now; compare which bullets land, whatever part they hit
+        start = time.perf_counter()
+        hits, parts = super().find_boss_hits(bullets, live, boss)
+        middle = time.perf_counter()
+        circle = game.circle_hits(bullets, live, np.array([boss.x]), np.array([boss.y]), game.BOSS_HIT_RADIUS)
+        end = time.perf_counter()
+        self.tally('boss', circle, (hits, np.zeros_like(hits)), end - middle, middle - start)
+        return hits, parts
+
+def replay_run(path):
+    with open(path) as f:
+        recording = json.load(f)
+    stage = None
+    if recording.get('stage'):
+        stage = load_stage(recording['stage'], list(game.ENEMY_KIND_BY_NAME))
+    sim = CollisionProbe(recording['seed'], recording.get('bullet_cancel', True), stage)
+    for dx, dy, shooting, focused, bomb, dt in recording['frames']:
+        sim.step(game.Controls(dx, dy, shooting, focused, bomb), dt)
+        sim.sounds.clear()
+    return sim, len(recording['frames'])
+
+def bot_run(seed, seconds):
+    sim = CollisionProbe(seed)
+    sim.player.invincible = float('inf')
+    frames = seconds * game.FRAME_RATE
+    for frame in range(frames):
+        sim.step(bot_controls(sim, frame / game.FRAME_RATE))
+        sim.sounds.clear()
+        if sim.state == game.GameState.VICTORY:
+            return sim, frame + 1
+    return sim, frames
+
+def run_collisions(args):
+    runs = [(path, *replay_run(path)) for path in args.replay]
+    if not runs:
+        runs = [(f"bot seed {seed}", *bot_run(seed, args.seconds)) for seed in args.seeds]
+
+    for label, sim, frames in runs:
+        print(f"{label}: {frames} frames, reached wave {sim.wave}, {sim.state.name.lower()}")
+        print(f"  {'target':<8} {'tests':>6} {'circle':>7} {'mask':>6} {'agree':>6} {'circle':>7} {'mask':>6}"
+              f" {'circle':>10} {'mask':>10}")
+        print(f"  {'':<8} {'':>6} {'hits':>7} {'hits':>6} {'':>6} {'only':>7} {'only':>6}"
+              f" {'ms/frame':>10} {'ms/frame':>10}")
+        for name, stats in sim.stats.items():
+            union = stats['both'] + stats['circle_only'] + stats['mask_only']
+            agree = f"{100 * stats['both'] / union:.0f}%" if union else "-"
+            print(f"  {name:<8} {stats['calls']:>6} {stats['circle']:>7} {stats['mask']:>6} {agree:>6}"
+                  f" {stats['circle_only']:>7} {stats['mask_only']:>6}"
+                  f" {1000 * stats['circle_time'] / frames:>10.4f} {1000 * stats['mask_time'] / frames:>10.4f}")
+    print("circle only: the old circle test hits where no sprite pixels touch the bullet")
+    print("mask only: sprite pixels touch the bullet outside the old circle (orbiters, corners)")
+    print("boss: the mask columns are its part hitboxes")
+    return 0
+
+# ============== FRAME TIME ==============
+
+class FrameRenderer:
+    """The game's world drawing without the window: queues flushed into the compositor layers"""
+    def __init__(self):
+        self.queue = RenderQueue()
+        self.bullet_queue = RenderQueue()
+        self.compositor = game.Compositor((game.SCREEN_WIDTH, game.SCREEN_HEIGHT))
+
+    def draw(self, sim):
+        compositor = self.compositor
+        compositor.begin()
+        sim.draw(self.queue, self.bullet_queue)
+        self.queue.flush(compositor.world)
+        self.bullet_queue.flush(compositor.bullets)
+        sim.particles.draw(compositor.world)
+        self.queue.end_frame()
+        self.bullet_queue.end_frame()
+
+def timing_summary(samples):
+    ms = np.array(samples) * 1000
+    return f"mean {ms.mean():6.3f}  p95 {np.percentile(ms, 95):6.3f}  max {ms.max():6.3f} ms"
+
+def run_boss(args):
+    sim = boss_scenario(args.seed)
+    sim.player.power = 4.0
+    renderer = FrameRenderer()
+    update_times, draw_times = [], []
+    bullets = 0
+    for frame in range(args.seconds * game.FRAME_RATE):
+        start = time.perf_counter()
+        sim.step(bot_controls(sim, frame / game.FRAME_RATE))
+        sim.sounds.clear()
+        middle = time.perf_counter()
+        renderer.draw(sim)
+        end = time.perf_counter()
+        update_times.append(middle - start)
+        draw_times.append(end - middle)
+        bullets = max(bullets, len(sim.enemy_bullets) + len(sim.player_bullets))
+        if sim.state == game.GameState.VICTORY:
+            break
+
+    boss = sim.boss
+    print(f"boss fight at power 4.0, seed {args.seed}: {len(update_times)} frames, "
+          f"{sim.state.name.lower()}, core health {max(0, boss.health)}/{boss.max_health}, peak {bullets} bullets")
+    print(f"  update  {timing_summary(update_times)}")
+    print(f"  draw    {timing_summary(draw_times)}")
+    print(f"  frame   {timing_summary(np.add(update_times, draw_times))}")
+    return 0
+
+# ============== STEERING BULLETS ==============
+
+# Start speed and behavior columns for each steering bullet type in the stress test
+STEERING_KINDS = [
+    ('homing', 1.5, dict(behavior=game.HOMING | game.ACCELERATE, turn=0.04, accel=0.05, speed_limit=4, trigger=90)),
+    ('accelerate', 0.5, dict(behavior=game.ACCELERATE, accel=0.08, speed_limit=6)),
+    ('redirect', 4, dict(behavior=game.ACCELERATE | game.REDIRECT, accel=-0.1, speed_limit=0.2,
+                         trigger=45, next_speed=3)),
+    ('split', 2, dict(behavior=game.SPLIT, trigger=60, shards=6, next_speed=2.5)),
+]
+
+def top_up(bullets, count, rng):
+    # Fire an even mix of steering types from the top of the screen until count are live
+    missing = count - len(bullets)
+    if missing <= 0:
+        return
+    kind = rng.integers(len(STEERING_KINDS), size=missing)
+    x = rng.uniform(100, game.SCREEN_WIDTH - 100, missing)
+    y = rng.uniform(50, 250, missing)
+    angle = rng.uniform(0, 2 * math.pi, missing)
+    for i, (name, speed, behavior) in enumerate(STEERING_KINDS):
+        pick = kind == i
+        game.fire_many(bullets, x[pick], y[pick], np.cos(angle[pick]) * speed, np.sin(angle[pick]) * speed,
+                       game.MAGENTA, 5, **behavior)
+
+def run_steering(args):
+    rng = np.random.default_rng(args.seed)
+    renderer = FrameRenderer()
+    budget = 1000 / game.FRAME_RATE
+    print(f"steering bullets: {args.seconds}s at 60 fps, an even mix of "
+          f"{', '.join(name for name, speed, behavior in STEERING_KINDS)}; frame budget {budget:.1f} ms")
+    for count in args.counts:
+        bullets = game.make_bullet_table('stress')
+        update_times, draw_times, live = [], [], []
+        for frame in range(args.seconds * game.FRAME_RATE):
+            t = frame / game.FRAME_RATE
+            target_x = game.SCREEN_WIDTH / 2 + math.sin(t * 1.3) * 300
+            target_y = game.SCREEN_HEIGHT - 100
+            top_up(bullets, count, rng)
+            start = time.perf_counter()
+            game.move_bullets(bullets)
+            game.steer_bullets(bullets, target_x, target_y)
+            game.cull_bullets(bullets)
+            middle = time.perf_counter()
+            renderer.compositor.begin()
+            game.draw_bullets(bullets, renderer.bullet_queue, game.LAYER_ENEMY_BULLETS)
+            renderer.bullet_queue.flush(renderer.compositor.bullets)
+            renderer.bullet_queue.end_frame()
+            end = time.perf_counter()
+            update_times.append(middle - start)
+            draw_times.append(end - middle)
+            live.append(len(bullets))
+        frame_times = np.add(update_times, draw_times)
+        print(f"  {count:>6} bullets (mean {np.mean(live):.0f} live)")
+        print(f"    update  {timing_summary(update_times)}")
+        print(f"    draw    {timing_summary(draw_times)}")
+        print(f"    both    {timing_summary(frame_times)}")
+        # The rest of a frame (the world, compositing and bloom) needs some of the budget too
+        over = np.count_nonzero(frame_times * 1000 > budget)
+        print(f"    {budget - np.mean(frame_times) * 1000:.1f} ms of the budget left on average; "
+              f"{over} of {len(frame_times)} frames over it on bullets alone")
+    return 0
+
+# ============== SCORE ITEMS ==============
+
+def flood_boss_bullets(sim, count, rng):
+    # Slow boss bullets scattered over the upper two thirds of the screen
+    x = rng.uniform(0, game.SCREEN_WIDTH, count)
+    y = rng.uniform(0, game.SCREEN_HEIGHT * 2 / 3, count)
+    angle = rng.uniform(0, 2 * math.pi, count)
+    game.fire_many(sim.enemy_bullets, x, y, np.cos(angle), np.sin(angle), game.MAGENTA, 5, owner=game.BOSS_OWNER)
+
+def run_items(args):
+    rng = np.random.default_rng(args.seed)
+    print(f"score items: boss seed {args.seed}, bullets cancelled by a phase change and pulled to a still player")
+    for count in args.counts:
+        sim = boss_scenario(args.seed)
+        renderer = FrameRenderer()
+        while sim.boss.entering:
+            sim.step(game.Controls())
+        sim.sounds.clear()
+        flood_boss_bullets(sim, count, rng)
+        sim.boss.health = int(sim.boss.max_health * 0.74)  # Phase 1 starts on the next step
+
+        update_times, draw_times = [], []
+        score = sim.score
+        peak = 0
+        for frame in range(args.seconds * game.FRAME_RATE):
+            start = time.perf_counter()
+            sim.step(game.Controls())
+            sim.sounds.clear()
+            middle = time.perf_counter()
+            renderer.draw(sim)
+            end = time.perf_counter()
+            update_times.append(middle - start)
+            draw_times.append(end - middle)
+            peak = max(peak, len(sim.items))
+            if not len(sim.items):
+                break
+
+        collected = (sim.score - score) // game.ITEM_POINTS
+        print(f"  {count:>6} bullets: {peak} items, {collected} collected in {len(update_times)} frames")
+        print(f"    cancel  {update_times[0] * 1000:6.3f} ms")
+        print(f"    update  {timing_summary(update_times)}")
+        print(f"    draw    {timing_summary(draw_times)}")
+    return 0
+
+# ============== REWIND ==============
+
+def run_rewind(args):
+    rng = np.random.default_rng(args.seed)
+    frames = args.seconds * game.FRAME_RATE
+    print(f"rewind: boss seed {args.seed}, {args.seconds}s recorded with the bullets kept topped up, "
+          f"then scrubbed all the way back; ring of {game.REWIND_MEMORY // 2 ** 20} MB")
+    for count in args.counts:
+        sim = boss_scenario(args.seed)
+        rewind = RewindBuffer(frames, game.REWIND_MEMORY)
+        snapshot_times, push_times, checksums, sizes = [], [], [], []
+        for frame in range(frames):
+            top_up(sim.enemy_bullets, count, rng)
+            start = time.perf_counter()
+            snapshot = sim.snapshot()
+            middle = time.perf_counter()
+            rewind.push(snapshot)
+            end = time.perf_counter()
+            snapshot_times.append(middle - start)
+            push_times.append(end - middle)
+            checksums.append(zlib.crc32(snapshot))
+            sizes.append(len(snapshot))
+            sim.step(bot_controls(sim, frame / game.FRAME_RATE))
+            sim.sounds.clear()
+        held = len(rewind)
+        memory = rewind.memory_used()
+
+        pop_times, restore_times = [], []
+        exact = True
+        while len(rewind):
+            start = time.perf_counter()
+            snapshot = rewind.pop()
+            middle = time.perf_counter()
+            sim.restore(snapshot)
+            end = time.perf_counter()
+            pop_times.append(middle - start)
+            restore_times.append(end - middle)
+            # The state it restored must snapshot back to the same bytes
+            exact = exact and zlib.crc32(sim.snapshot()) == checksums[frames - len(pop_times)]
+
+        print(f"  {count:>6} bullets: {np.mean(sizes) / 1024:.0f} KB snapshots, "
+              f"{(memory - sizes[-1]) / max(1, held - 1) / 1024:.1f} KB per delta, "
+              f"{held} frames ({held / game.FRAME_RATE:.1f}s) held, round trip {'exact' if exact else 'MISMATCH'}")
+        print(f"    snapshot  {timing_summary(snapshot_times)}")
+        print(f"    delta     {timing_summary(push_times)}")
+        print(f"    undelta   {timing_summary(pop_times)}")
+        print(f"    restore   {timing_summary(restore_times)}")
+        print(f"    capture   {timing_summary(np.add(snapshot_times, push_times))}   (snapshot + delta)")
+        print(f"    step back {timing_summary(np.add(pop_times, restore_times))}   (undelta + restore)")
+    return 0
+
+# ============== ROLLBACK ==============
+
+def run_rollback(args):
+    rng = np.random.default_rng(args.seed)
+    budget = 1000 / game.FRAME_RATE
+    depth = args.depth
+    print(f"rollback: co-op boss seed {args.seed}, bullets kept topped up, the last {depth} frames "
+          f"restored and re-simulated every {depth} frames; frame budget {budget:.1f} ms")
+    for count in args.counts:
+        sim = game.Simulation(args.seed, players=2)
+        for player in sim.players:
+            player.invincible = float('inf')
+        sim.boss = game.Boss(sim.rng)
+        sim.boss_spawned = True
+        history = []  # (snapshot, controls) for the frames a rollback would redo
+        step_times, rollback_times = [], []
+        exact = True
+        for frame in range(args.seconds * game.FRAME_RATE):
+            if frame % depth == 0:
+                top_up(sim.enemy_bullets, count, rng)  # Only at the first frame a rollback goes back to
+            pads = (bot_controls(sim, frame / game.FRAME_RATE), game.Controls(dx=math.sin(frame / 40), shooting=True))
+            history.append((sim.snapshot(), pads))
+            del history[:-depth]
+            start = time.perf_counter()
+            sim.step(pads[0], 1.0, pads[1])
+            step_times.append(time.perf_counter() - start)
+            if len(history) == depth and frame % depth == depth - 1:
+                expected = zlib.crc32(sim.snapshot())
+                # As the session does it: snapshots are taken again on the way back up
+                start = time.perf_counter()
+                sim.restore(history[0][0])
+                for i, (snapshot, (pad, partner)) in enumerate(history):
+                    history[i] = (sim.snapshot(), (pad, partner))
+                    sim.step(pad, 1.0, partner)
+                rollback_times.append(time.perf_counter() - start)
+                exact = exact and zlib.crc32(sim.snapshot()) == expected
+            sim.sounds.clear()
+        ms = np.array(rollback_times) * 1000
+        print(f"  {count:>6} bullets: {depth}-frame rollback {timing_summary(rollback_times)}, "
+              f"{np.mean(ms <= budget):.0%} within budget, {'exact' if exact else 'MISMATCH'}")
+        print(f"    step      {timing_summary(step_times)}")
+        print(f"    resim     {depth * len(rollback_times) / sum(rollback_times):,.0f} frames/s")
+    return 0
+
+# ============== COMMAND LINE ==============
+
+def main():
+    parser = argparse.ArgumentParser(description="Headless NOVA STORM benchmarks")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    determinism = commands.add_parser('determinism', help="compare delta-time trajectories across frame rates")
+    determinism.add_argument('--seconds', type=int, default=30)
+    determinism.add_argument('--seed', type=int, default=1)
+    determinism.add_argument('--rates', type=int, nargs='+', default=[60, 120, 144])
+    determinism.add_argument('--scenarios', nargs='+', choices=list(SCENARIOS), default=list(SCENARIOS))
+    determinism.add_argument('--tolerance', type=float, default=4.0,
+                             help="largest allowed position difference in pixels")
+    determinism.set_defaults(run=run_determinism)
+
+    collisions = commands.add_parser('collisions', help="compare mask and circle hit tests on the same runs")
+    collisions.add_argument('--replay', nargs='*', default=[], metavar='FILE',
+                            help="runs saved with bullet_hell.py --record (default: bot runs)")
+    collisions.add_argument('--seeds', type=int, nargs='+', default=[1, 2, 3])
+    collisions.add_argument('--seconds', type=int, default=300, help="length of each bot run")
+    collisions.set_defaults(run=run_collisions)
+
+    boss = commands.add_parser('boss', help="boss fight frame time with the player at power 4.0")
+    boss.add_argument('--seconds', type=int, default=90)
+    boss.add_argument('--seed', type=int, default=1)
+    boss.set_defaults(run=run_boss)
+
+    steering = commands.add_parser('steering', help="update and draw time for thousands of steering bullets")
+    steering.add_argument('--counts', type=int, nargs='+', default=[1000, 2000, 5000])
+    steering.add_argument('--seconds', type=int, default=10)
+    steering.add_argument('--seed', type=int, default=1)
+    steering.set_defaults(run=run_steering)
+
+    items = commands.add_parser('items', help="cancel thousands of boss bullets into score items and collect them")
+    items.add_argument('--counts', type=int, nargs='+', default=[1000, 3000, 10000])
+    items.add_argument('--seconds', type=int, default=10, help="longest wait for the items to be collected")
+    items.add_argument('--seed', type=int, default=1)
+    items.set_defaults(run=run_items)
+
+    rewind = commands.add_parser('rewind', help="snapshot, delta and restore cost with thousands of bullets")
+    rewind.add_argument('--counts', type=int, nargs='+', default=[500, 5000])
+    rewind.add_argument('--seconds', type=int, default=10)
+    rewind.add_argument('--seed', type=int, default=1)
+    rewind.set_defaults(run=run_rewind)
+
+    rollback = commands.add_parser('rollback', help="restore and re-simulate the deepest netplay rollback")
+    rollback.add_argument('--counts', type=int, nargs='+', default=[500, 2000, 5000])
+    rollback.add_argument('--depth', type=int, default=MAX_ROLLBACK)
+    rollback.add_argument('--seconds', type=int, default=10)
+    rollback.add_argument('--seed', type=int, default=1)
+    rollback.set_defaults(run=run_rollback)
+
+    args = parser.parse_args()
+    sys.exit(args.run(args))
+
+if __name__ == "__main__":
+    main()
@@ -8,6 +8,7 @@ import pygame
 import random
 import math
 import sys
+from render_queue import RenderQueue
 
 # Initialize Pygame
 pygame.init()
@@ -34,6 +35,10 @@ BUBBLE_COLORS = [
     ((255, 105, 180), 5),    # Pink - 5 points (rare)
 ]
 
+# Render layers, back to front
+LAYER_CLOUDS = 0
+LAYER_BUBBLES = 1
+
 class Particle:
     """Sparkle effect when catching bubbles"""
     def __init__(self, x, y, color):
@@ -72,27 +77,36 @@ class Bubble:
         self.wobble_speed = random.uniform(0.03, 0.06)
         self.time = 0
         self.highlight_color = tuple(min(255, c + 60) for c in self.color)
+        self.sprite = self.make_sprite()
 
-    def update(self):
-        self.y += self.speed
-        self.time += 1
-        self.x += math.sin(self.time * self.wobble_speed + self.wobble_offset) * 1.5
-
-    def draw(self, surface):
+    def make_sprite(self):
+        """Draw the bubble and its number once; after that it's just blitted"""
+        size = self.radius * 2 + 2
+        c = self.radius + 1
+        sprite = pygame.Surface((size, size), pygame.SRCALPHA)
         # Main bubble
-        pygame.draw.circle(surface, self.color, (int(self.x), int(self.y)), self.radius)
+        pygame.draw.circle(sprite, self.color, (c, c), self.radius)
         # Highlight
-        highlight_x = int(self.x - self.radius * 0.3)
-        highlight_y = int(self.y - self.radius * 0.3)
-        pygame.draw.circle(surface, self.highlight_color, (highlight_x, highlight_y), int(self.radius * 0.3))
+        highlight_x = int(c - self.radius * 0.3)
+        highlight_y = int(c - self.radius * 0.3)
+        pygame.draw.circle(sprite, self.highlight_color, (highlight_x, highlight_y), int(self.radius * 0.3))
         # Small shine
-        pygame.draw.circle(surface, WHITE, (int(self.x - self.radius * 0.15), int(self.y - self.radius * 0.5)), int(self.radius * 0.12))
+        pygame.draw.circle(sprite, WHITE, (int(c - self.radius * 0.15), int(c - self.radius * 0.5)), int(self.radius * 0.12))
         # Point indicator
         if self.points > 1:
             font = pygame.font.Font(None, int(self.radius * 0.8))
             text = font.render(str(self.points), True, WHITE)
-            text_rect = text.get_rect(center=(int(self.x), int(self.y)))
-            surface.blit(text, text_rect)
+            text_rect = text.get_rect(center=(c, c))
+            sprite.blit(text, text_rect)
+        return sprite.convert_alpha()
+
+    def update(self):
+        self.y += self.speed
+        self.time += 1
+        self.x += math.sin(self.time * self.wobble_speed + self.wobble_offset) * 1.5
+
+    def draw(self, queue):
+        queue.submit_centered(self.sprite, self.x, self.y, layer=LAYER_BUBBLES)
 
     def is_off_screen(self):
         return self.y > SCREEN_HEIGHT + self.radius
@@ -104,6 +118,19 @@ class Cloud:
         self.y = random.randint(30, 180)
         self.speed = random.uniform(0.2, 0.5)
         self.size = random.uniform(0.6, 1.2)
+        self.sprite = self.make_sprite()
+
+    def make_sprite(self):
+        size = int(35 * self.size)
+        # Puffs reach 1.35 sizes left/right and 0.7 sizes + 8 below the center
+        cx = int(size * 1.35) + 1
+        cy = size + 1
+        sprite = pygame.Surface((cx * 2, cy + int(size * 0.7) + 10), pygame.SRCALPHA)
+        pygame.draw.circle(sprite, WHITE, (cx, cy), size)
+        pygame.draw.circle(sprite, WHITE, (int(cx - size * 0.6), cy + 8), int(size * 0.7))
+        pygame.draw.circle(sprite, WHITE, (int(cx + size * 0.6), cy + 5), int(size * 0.75))
+        self.sprite_offset = (cx, cy)
+        return sprite.convert_alpha()
 
     def update(self):
         self.x += self.speed
@@ -111,11 +138,9 @@ class Cloud:
             self.x = -150
             self.y = random.randint(30, 180)
 
-    def draw(self, surface):
-        size = int(35 * self.size)
-        pygame.draw.circle(surface, WHITE, (int(self.x), int(self.y)), size)
-        pygame.draw.circle(surface, WHITE, (int(self.x - size * 0.6), int(self.y + 8)), int(size * 0.7))
-        pygame.draw.circle(surface, WHITE, (int(self.x + size * 0.6), int(self.y + 5)), int(size * 0.75))
+    def draw(self, queue):
+        ox, oy = self.sprite_offset
+        queue.submit(self.sprite, (int(self.x) - ox, int(self.y) - oy), layer=LAYER_CLOUDS)
 
 class Bunny:
     """The player's bunny with basket"""
@@ -298,6 +323,8 @@ def main():
     pygame.mouse.set_visible(False)
     running = True
     game_over = False
+    render_queue = RenderQueue()
+    show_stats = False
 
     while running:
         for event in pygame.event.get():
@@ -306,6 +333,8 @@ def main():
             elif event.type == pygame.KEYDOWN:
                 if event.key == pygame.K_ESCAPE:
                     running = False
+                elif event.key == pygame.K_F3:
+                    show_stats = not show_stats
                 elif event.key == pygame.K_SPACE and game_over:
                     # Restart
                     score = 0
@@ -426,11 +455,13 @@ def main():
 
         # Clouds
         for cloud in clouds:
-            cloud.draw(screen)
+            cloud.draw(render_queue)
 
         # Bubbles
         for bubble in bubbles:
-            bubble.draw(screen)
+            bubble.draw(render_queue)
+
+        render_queue.flush(screen)
 
         # Bunny
         bunny.draw(screen)
@@ -452,6 +483,12 @@ def main():
         hint_text = small_font.render("ESC to exit | Arrow Keys or Left Stick to move", True, (80, 80, 80))
         screen.blit(hint_text, (SCREEN_WIDTH - 420, SCREEN_HEIGHT - 35))
 
+        # Batching stats (F3, for grown-ups)
+        render_queue.end_frame()
+        if show_stats:
+            stats_text = small_font.render(render_queue.stats_text(), True, (80, 80, 80))
+            screen.blit(stats_text, (20, 130))
+
         # Game over screen
         if game_over:
             overlay = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT), pygame.SRCALPHA)
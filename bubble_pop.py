@@ -8,6 +8,7 @@ import pygame
 import random
 import math
 import sys
+from render_queue import RenderQueue
 
 # Initialize Pygame
 pygame.init()
@@ -79,27 +80,37 @@ class Bubble:
         self.wobble_speed = random.uniform(0.02, 0.05)
         self.time = 0
         self.highlight_color = tuple(min(255, c + 60) for c in self.color)
+        self.sprite = self.make_sprite()
 
-    def update(self):
-        self.y -= self.speed
-        self.time += 1
-        # Gentle side-to-side wobble
-        self.x += math.sin(self.time * self.wobble_speed + self.wobble_offset) * 0.5
+    def make_sprite(self):
+        """Draw the bubble once; after that it's just blitted"""
+        size = self.radius * 2 + 2
+        c = self.radius + 1
+        sprite = pygame.Surface((size, size), pygame.SRCALPHA)
 
-    def draw(self, surface):
         # Main bubble
-        pygame.draw.circle(surface, self.color, (int(self.x), int(self.y)), self.radius)
+        pygame.draw.circle(sprite, self.color, (c, c), self.radius)
 
         # Highlight (makes it look 3D and shiny)
-        highlight_x = int(self.x - self.radius * 0.3)
-        highlight_y = int(self.y - self.radius * 0.3)
+        highlight_x = int(c - self.radius * 0.3)
+        highlight_y = int(c - self.radius * 0.3)
         highlight_radius = int(self.radius * 0.3)
-        pygame.draw.circle(surface, self.highlight_color, (highlight_x, highlight_y), highlight_radius)
+        pygame.draw.circle(sprite, self.highlight_color, (highlight_x, highlight_y), highlight_radius)
 
         # Small extra shine
-        small_highlight_x = int(self.x - self.radius * 0.15)
-        small_highlight_y = int(self.y - self.radius * 0.5)
-        pygame.draw.circle(surface, (255, 255, 255), (small_highlight_x, small_highlight_y), int(self.radius * 0.1))
+        small_highlight_x = int(c - self.radius * 0.15)
+        small_highlight_y = int(c - self.radius * 0.5)
+        pygame.draw.circle(sprite, (255, 255, 255), (small_highlight_x, small_highlight_y), int(self.radius * 0.1))
+        return sprite.convert_alpha()
+
+    def update(self):
+        self.y -= self.speed
+        self.time += 1
+        # Gentle side-to-side wobble
+        self.x += math.sin(self.time * self.wobble_speed + self.wobble_offset) * 0.5
+
+    def draw(self, queue):
+        queue.submit_centered(self.sprite, self.x, self.y)
 
     def contains_point(self, x, y):
         distance = math.sqrt((self.x - x) ** 2 + (self.y - y) ** 2)
@@ -184,6 +195,8 @@ def main():
 
     running = True
     a_button_pressed = False  # Track button state to avoid repeat triggers
+    render_queue = RenderQueue()
+    show_stats = False
 
     # Hide system cursor - we draw our own
     pygame.mouse.set_visible(False)
@@ -202,6 +215,8 @@ def main():
             elif event.type == pygame.KEYDOWN:
                 if event.key == pygame.K_ESCAPE:
                     running = False
+                elif event.key == pygame.K_F3:
+                    show_stats = not show_stats
             elif event.type == pygame.MOUSEBUTTONDOWN:
                 mouse_x, mouse_y = event.pos
                 # Update cursor position to mouse position
@@ -286,7 +301,8 @@ def main():
 
         # Draw bubbles
         for bubble in bubbles:
-            bubble.draw(screen)
+            bubble.draw(render_queue)
+        render_queue.flush(screen)
 
         # Draw particles
         for particle in particles:
@@ -317,6 +333,12 @@ def main():
         hint_text = small_font.render("Press ESC to exit | Controller: Left Stick + A Button", True, (100, 100, 100))
         screen.blit(hint_text, (SCREEN_WIDTH - 380, SCREEN_HEIGHT - 30))
 
+        # Batching stats (F3, for grown-ups)
+        render_queue.end_frame()
+        if show_stats:
+            stats_text = small_font.render(render_queue.stats_text(), True, (100, 100, 100))
+            screen.blit(stats_text, (20, 100))
+
         pygame.display.flip()
         clock.tick(60)
 
@@ -5,11 +5,22 @@ For teens and adults who want a challenge!
 """
 
 import pygame
+import numpy as np
 import random
 import math
 import sys
+import argparse
+import json
+import struct
+from time import perf_counter
 from enum import Enum
 from dataclasses import dataclass
+from render_queue import RenderQueue
+from ecs import Archetype
+from stage import load_stage, StageCursor, StageError, BOSS
+from rewind import StateLayout, RewindBuffer, pack_state, unpack_state
+from netplay import RollbackSession, parse_address
+from heatmap import HeatmapRecorder
 
 # Initialize Pygame
 pygame.init()
@@ -43,6 +54,38 @@ BULLET_SPEED = 12
 GRAZE_DISTANCE = 25
 GRAZE_POINTS = 50
 INVINCIBILITY_FRAMES = 180
+PLAYER_TRAIL = 10     # Trail points kept behind the ship
+CO_OP_SPACING = 100   # Each co-op ship starts this far either side of the middle
+
+# Timing: everything is tuned in 60 fps frames; delta-time mode scales by real frame time
+FRAME_RATE = 60
+MAX_FRAME_STEP = 3    # Longest step in frames, so a hitch can't teleport bullets through the player
+STEP_EPSILON = 1e-3   # Slack for timers and positions built from fractional steps, which don't sum exactly
+
+# Rewind: how far back holding R can scrub, and the memory its history may use.
+# Very busy scenes fit fewer seconds into the memory
+REWIND_SECONDS = 10
+REWIND_MEMORY = 64 * 2 ** 20
+
+# Turbo (F6): simulation ticks per rendered frame, 0 for as many as fit in TURBO_SLICE
+TURBO_SPEEDS = [1, 2, 4, 8, 0]
+TURBO_SLICE = 1 / 30
+
+# Render layers, back to front
+LAYER_STARS = 0
+LAYER_POWERUPS = 1
+LAYER_ENEMY_BULLET_GLOW = 2
+LAYER_ENEMY_BULLETS = 3
+LAYER_PLAYER_BULLET_GLOW = 4
+LAYER_PLAYER_BULLETS = 5
+LAYER_ENEMIES = 6
+LAYER_BOSS = 7
+LAYER_PLAYER = 8
+
+# Post-processing
+BLOOM_SCALE = 4       # Bloom runs at 1/4 width and height
+BLOOM_RADIUS = 2      # 5x5 box blur in downsampled pixels
+BLOOM_SHIFT = 5       # Divide the 25-pixel sum by 32, about 0.8x the box average
 
 class GameState(Enum):
     MENU = 1
@@ -67,13 +110,13 @@ class Particle:
         self.gravity = gravity
         self.fade = fade
 
-    def update(self):
-        self.x += self.vel_x
-        self.y += self.vel_y
-        self.vel_y += self.gravity
-        self.life -= 1
+    def update(self, dt=1.0):
+        self.x += self.vel_x * dt
+        self.y += self.vel_y * dt
+        self.vel_y += self.gravity * dt
+        self.life -= dt
         if self.fade:
-            self.size = max(0.5, self.size * 0.95)
+            self.size = max(0.5, self.size * 0.95 ** dt)
 
     def draw(self, surface):
         if self.life > 0:
@@ -84,11 +127,14 @@ class Particle:
 class ParticleSystem:
     def __init__(self):
         self.particles = []
+        self.muted = False  # Turbo's unseen ticks neither make nor move particles
 
     def add(self, particle):
         self.particles.append(particle)
 
     def explosion(self, x, y, color, count=20, speed=5, size=4, life=25):
+        if self.muted:
+            return
         for _ in range(count):
             angle = random.uniform(0, 2 * math.pi)
             spd = random.uniform(1, speed)
@@ -102,6 +148,8 @@ class ParticleSystem:
             ))
 
     def spark(self, x, y, color, direction=None, count=5):
+        if self.muted:
+            return
         for _ in range(count):
             if direction is None:
                 angle = random.uniform(0, 2 * math.pi)
@@ -117,6 +165,8 @@ class ParticleSystem:
             ))
 
     def trail(self, x, y, color, size=3):
+        if self.muted:
+            return
         self.add(Particle(
             x + random.uniform(-3, 3),
             y + random.uniform(-3, 3),
@@ -124,9 +174,11 @@ class ParticleSystem:
             size, random.randint(15, 25)
         ))
 
-    def update(self):
+    def update(self, dt=1.0):
+        if self.muted:
+            return
         for p in self.particles[:]:
-            p.update()
+            p.update(dt)
             if p.life <= 0:
                 self.particles.remove(p)
 
@@ -134,50 +186,520 @@ class ParticleSystem:
         for p in self.particles:
             p.draw(surface)
 
-# ============== BULLETS ==============
+# ============== SPRITE ATLAS ==============
 
-class Bullet:
-    def __init__(self, x, y, vel_x, vel_y, color, radius=4, damage=1, is_player=False):
-        self.x = x
-        self.y = y
-        self.vel_x = vel_x
-        self.vel_y = vel_y
-        self.color = color
-        self.radius = radius
-        self.damage = damage
-        self.is_player = is_player
-        self.grazed = False
-        self.trail_timer = 0
+class SpriteAtlas:
+    """Shapes baked once into rotation frames, so drawing is a lookup plus a blit"""
+    def __init__(self):
+        self.sprites = {}
+        self.masks = {}
+        self.cache = {}
+
+    def bake(self, name, size, draw_shape, frames=1, period=2 * math.pi, flash=True):
+        # draw_shape(surface, cx, cy, angle, flashing) draws one frame centered on (cx, cy).
+        # Frames cover one period of the shape's symmetry, e.g. 2*pi/3 for three orbiters.
+        width, height = size
+        variants = []
+        for flashing in ((False, True) if flash else (False,)):
+            frame_list = []
+            for i in range(frames):
+                surf = pygame.Surface((width, height), pygame.SRCALPHA)
+                draw_shape(surf, width // 2, height // 2, period * i / frames, flashing)
+                frame_list.append(surf.convert_alpha())
+            variants.append(frame_list)
+        self.sprites[name] = (variants, frames / period)
+
+        # Collision masks from the unflashed frames, plus the farthest solid pixel from
+        # the center as a radius for a cheap circle test before the mask test
+        masks = [pygame.mask.from_surface(frame) for frame in variants[0]]
+        reach = max((math.hypot(px - width // 2, py - height // 2)
+                     for mask in masks for px, py in mask.outline()), default=0)
+        self.masks[name] = (masks, math.ceil(reach))
+
+    def frame_index(self, name, angle):
+        variants, frames_per_radian = self.sprites[name]
+        return int(angle * frames_per_radian + 0.5) % len(variants[0])
+
+    def get(self, name, angle=0.0, flashing=False):
+        variants, frames_per_radian = self.sprites[name]
+        frame_list = variants[1] if flashing and len(variants) > 1 else variants[0]
+        return frame_list[self.frame_index(name, angle)]
+
+    def mask(self, name, angle=0.0):
+        return self.masks[name][0][self.frame_index(name, angle)]
+
+    def reach(self, name):
+        return self.masks[name][1]
+
+    def submit(self, queue, layer, name, x, y, angle=0.0, flashing=False):
+        queue.submit_centered(self.get(name, angle, flashing), x, y, layer=layer)
+
+    def cached(self, key, build):
+        # Lazily built sprites for shapes with too many variants to bake up front
+        sprite = self.cache.get(key)
+        if sprite is None:
+            sprite = self.cache[key] = build().convert_alpha()
+        return sprite
+
+atlas = SpriteAtlas()
+
+def make_player_shape(color, cockpit):
+    # Player one flies the cyan ship, a co-op partner the pink one
+    def draw_player_shape(surface, x, y, angle, flashing):
+        # Ship body
+        ship_points = [
+            (x, y - 25),
+            (x - 20, y + 15),
+            (x - 8, y + 5),
+            (x, y + 20),
+            (x + 8, y + 5),
+            (x + 20, y + 15),
+        ]
+        pygame.draw.polygon(surface, color, ship_points)
+        pygame.draw.polygon(surface, WHITE, ship_points, 2)
 
-    def update(self):
-        self.x += self.vel_x
-        self.y += self.vel_y
-        self.trail_timer += 1
+        # Cockpit
+        pygame.draw.ellipse(surface, cockpit, (x - 6, y - 10, 12, 15))
 
-    def draw(self, surface):
-        # Glow effect
-        glow_surf = pygame.Surface((self.radius * 6, self.radius * 6), pygame.SRCALPHA)
-        for i in range(3):
-            alpha = 60 - i * 20
-            r = self.radius * (3 - i)
-            color = (*self.color, alpha)
-            pygame.draw.circle(glow_surf, color, (self.radius * 3, self.radius * 3), r)
-        surface.blit(glow_surf, (int(self.x - self.radius * 3), int(self.y - self.radius * 3)), special_flags=pygame.BLEND_ADD)
+        # Engine glow
+        glow_size = 8 + math.sin(angle * 2) * 2
+        pygame.draw.circle(surface, ORANGE, (x, y + 18), int(glow_size))
+        pygame.draw.circle(surface, YELLOW, (x, y + 18), int(glow_size * 0.5))
+    return draw_player_shape
+
+def draw_focus_shape(surface, x, y, angle, flashing):
+    # Hitbox indicator
+    pygame.draw.circle(surface, WHITE, (x, y), 5, 1)
+    pygame.draw.circle(surface, RED, (x, y), 3)
+
+    # Graze circle
+    pygame.draw.circle(surface, (50, 50, 80), (x, y), GRAZE_DISTANCE, 1)
+
+def draw_basic_enemy_shape(surface, x, y, angle, flashing):
+    color = WHITE if flashing else PURPLE
+    # Diamond shape
+    points = [
+        (x, y - 20),
+        (x + 15, y),
+        (x, y + 20),
+        (x - 15, y),
+    ]
+    pygame.draw.polygon(surface, color, points)
+    pygame.draw.polygon(surface, WHITE, points, 2)
+
+def draw_spiral_enemy_shape(surface, x, y, angle, flashing):
+    color = WHITE if flashing else ORANGE
+    # Spinning triangle
+    for i in range(3):
+        a = angle + i * (2 * math.pi / 3)
+        px = x + math.cos(a) * 20
+        py = y + math.sin(a) * 20
+        pygame.draw.circle(surface, color, (int(px), int(py)), 8)
+    pygame.draw.circle(surface, WHITE, (x, y), 12)
+
+def draw_burst_enemy_shape(surface, x, y, angle, flashing):
+    color = WHITE if flashing else PINK
+    pygame.draw.circle(surface, color, (x, y), 22)
+    pygame.draw.circle(surface, WHITE, (x, y), 22, 2)
+    # Inner pattern
+    for i in range(6):
+        a = angle + i * math.pi / 3
+        px = x + math.cos(a) * 12
+        py = y + math.sin(a) * 12
+        pygame.draw.circle(surface, WHITE, (int(px), int(py)), 4)
+
+def draw_laser_enemy_shape(surface, x, y, angle, flashing):
+    color = WHITE if flashing else BLUE
+    # Hexagonal hull around a lens
+    points = [(x + math.cos(i * math.pi / 3) * 20, y + math.sin(i * math.pi / 3) * 20) for i in range(6)]
+    pygame.draw.polygon(surface, color, points)
+    pygame.draw.polygon(surface, WHITE, points, 2)
+    pygame.draw.circle(surface, WHITE, (x, y + 4), 8)
+    pygame.draw.circle(surface, BLUE, (x, y + 6), 4)
+
+def make_boss_shape(phase):
+    core_color = [RED, ORANGE, YELLOW, WHITE][phase]
+
+    def draw_boss_shape(surface, x, y, angle, flashing):
+        color = WHITE if flashing else PURPLE
+
+        # Main body
+        pygame.draw.circle(surface, color, (x, y), 60)
+        pygame.draw.circle(surface, WHITE, (x, y), 60, 3)
 
         # Core
-        pygame.draw.circle(surface, self.color, (int(self.x), int(self.y)), self.radius)
-        pygame.draw.circle(surface, WHITE, (int(self.x), int(self.y)), self.radius // 2)
+        pygame.draw.circle(surface, core_color, (x, y), 25)
+
+    return draw_boss_shape
+
+def draw_boss_orbiter_shape(surface, x, y, angle, flashing):
+    color = WHITE if flashing else PURPLE
+    pygame.draw.circle(surface, color, (x, y), 15)
+    pygame.draw.circle(surface, WHITE, (x, y), 15, 2)
+
+def bake_sprites():
+    """Render every entity shape into the atlas (needs the display mode set for convert_alpha)"""
+    atlas.bake('player', (44, 60), make_player_shape(CYAN, (150, 220, 255)), frames=16, period=math.pi, flash=False)
+    atlas.bake('partner', (44, 60), make_player_shape(PINK, (255, 190, 230)), frames=16, period=math.pi, flash=False)
+    atlas.bake('focus', (GRAZE_DISTANCE * 2 + 2, GRAZE_DISTANCE * 2 + 2), draw_focus_shape, flash=False)
+    atlas.bake('basic', (36, 46), draw_basic_enemy_shape)
+    atlas.bake('spiral', (60, 60), draw_spiral_enemy_shape, frames=24, period=2 * math.pi / 3)
+    atlas.bake('burst', (48, 48), draw_burst_enemy_shape, frames=24, period=math.pi / 3)
+    atlas.bake('laser', (44, 44), draw_laser_enemy_shape)
+    for phase in range(4):
+        atlas.bake(f'boss{phase}', (124, 124), make_boss_shape(phase))
+    atlas.bake('boss_orbiter', (32, 32), draw_boss_orbiter_shape)
 
-    def is_off_screen(self):
-        margin = 50
-        return (self.x < -margin or self.x > SCREEN_WIDTH + margin or
-                self.y < -margin or self.y > SCREEN_HEIGHT + margin)
+# ============== BULLETS ==============
+
+# Bullets store their color as an index into this palette
+BULLET_COLORS = [CYAN, GREEN, YELLOW, MAGENTA, ORANGE, PINK, RED, WHITE, BLUE]
+COLOR_INDEX = {color: i for i, color in enumerate(BULLET_COLORS)}
+
+# Behavior flags. Steering bullets are plain rows with flags set, updated in bulk by steer_bullets
+HOMING = 1      # Turn toward the target by at most `turn` radians a frame, until `trigger`
+ACCELERATE = 2  # Change speed by `accel` a frame until reaching `speed_limit`
+REDIRECT = 4    # At `trigger`, aim at the target and fly straight at `next_speed`
+SPLIT = 8       # At `trigger`, burst into a ring of `shards` bullets at `next_speed`
+
+# Who fired a bullet or beam: an enemy's serial (from 1), BOSS_OWNER, or 0 for nobody in particular.
+# Killing the owner can cancel everything it still has on screen
+BOSS_OWNER = -1
+
+def make_bullet_table(name):
+    return Archetype(name, capacity=256,
+                     x=np.float32, y=np.float32, vel_x=np.float32, vel_y=np.float32,
+                     radius=np.uint8, color=np.uint8, damage=np.int16, grazed=np.bool_, owner=np.int32,
+                     age=np.float64, steered=np.float64, behavior=np.uint8, turn=np.float32, accel=np.float32,
+                     speed_limit=np.float32, trigger=np.float32, next_speed=np.float32, shards=np.uint8)
+
+# age is how many frames ago the shot was due; the bullet starts that far along its path,
+# so cadences land between frames the same way at any frame rate.
+# Extra keywords set behavior columns, e.g. behavior=HOMING | ACCELERATE, turn=0.04, trigger=90
+
+def fire(bullets, x, y, vel_x, vel_y, color, radius=4, damage=1, age=0, owner=0, **behavior):
+    bullets.spawn(x=x + vel_x * age, y=y + vel_y * age, vel_x=vel_x, vel_y=vel_y,
+                  radius=radius, color=COLOR_INDEX[color], damage=damage, age=age, owner=owner, **behavior)
+
+def fire_many(bullets, x, y, vel_x, vel_y, color, radius=4, damage=1, age=0, owner=0, **behavior):
+    # Any argument may be an array; scalars are shared by every bullet
+    x, y, vel_x, vel_y, age, owner = np.broadcast_arrays(x, y, vel_x, vel_y, age, owner)
+    x = x + vel_x * age
+    y = y + vel_y * age
+    bullets.spawn_many(x.size, x=x.ravel(), y=y.ravel(), vel_x=vel_x.ravel(), vel_y=vel_y.ravel(),
+                       radius=radius, color=COLOR_INDEX[color], damage=damage, age=age.ravel(),
+                       owner=owner.ravel(), **behavior)
+
+def due(timer, delay):
+    return timer >= delay - STEP_EPSILON
+
+def overdue(timer, delay):
+    # How long ago a shot on this cadence fell due; restart cleanly if the timer ran
+    # past a whole period (descending into position)
+    age = max(0, timer - delay)
+    return age if age < delay else 0
+
+def move_bullets(bullets, dt=1.0):
+    bullets['x'] += bullets['vel_x'] * dt
+    bullets['y'] += bullets['vel_y'] * dt
+    bullets['age'] += dt
+
+def steer_bullets(bullets, target_x, target_y):
+    """Apply every bullet's behavior flags after it moved: homing and acceleration
+    since the last steer, then the redirects and splits whose trigger age has passed"""
+    behavior = bullets['behavior']
+    if not behavior.any():
+        return
+    x, y, vel_x, vel_y = bullets['x'], bullets['y'], bullets['vel_x'], bullets['vel_y']
+
+    # Homing and acceleration, as one heading and speed update. The step runs from the
+    # last steer, which for a new bullet includes the part of its age it was fired with.
+    # The bullet already moved at its old velocity; moving it half the change further
+    # makes the step trapezoidal, so curves come out the same at any step length
+    rows = np.flatnonzero(behavior & (HOMING | ACCELERATE))
+    if rows.size:
+        age, steered = bullets['age'][rows], bullets['steered'][rows]
+        step = age - steered
+        bullets['steered'][rows] = age
+        vx, vy = vel_x[rows], vel_y[rows]
+        heading = np.arctan2(vy, vx)
+        speed = np.hypot(vx, vy)
+        homing = (behavior[rows] & HOMING) > 0
+        want = np.arctan2(target_y - y[rows], target_x - x[rows])
+        # Only turn for the part of the step before homing runs out
+        limit = bullets['turn'][rows] * np.clip(bullets['trigger'][rows] - steered, 0, step)
+        heading += np.where(homing, np.clip((want - heading + np.pi) % (2 * np.pi) - np.pi, -limit, limit), 0)
+        accel = np.where(behavior[rows] & ACCELERATE, bullets['accel'][rows], 0)
+        speed_limit = bullets['speed_limit'][rows]
+        speed = np.where(accel > 0, np.minimum(speed + accel * step, speed_limit),
+                         np.where(accel < 0, np.maximum(speed + accel * step, speed_limit), speed))
+        vel_x[rows] = np.cos(heading) * speed
+        vel_y[rows] = np.sin(heading) * speed
+        x[rows] += (vel_x[rows] - vx) * (step / 2)
+        y[rows] += (vel_y[rows] - vy) * (step / 2)
+
+    # Timed behaviors. over is how far past the trigger this step ran; undoing that much of
+    # the old path before applying the new one keeps the turn point the same at any rate
+    rows = np.flatnonzero((behavior & (HOMING | REDIRECT | SPLIT)) > 0)
+    if not rows.size:
+        return
+    over = bullets['age'][rows] - bullets['trigger'][rows]
+    fired = over >= -STEP_EPSILON
+    rows, over = rows[fired], np.maximum(over[fired], 0)
+    if not rows.size:
+        return
+    flags = behavior[rows]
+    behavior[rows] = flags & ~np.uint8(HOMING)
+
+    redirect = (flags & REDIRECT) > 0
+    if redirect.any():
+        turning, late = rows[redirect], over[redirect]
+        origin_x = x[turning] - vel_x[turning] * late
+        origin_y = y[turning] - vel_y[turning] * late
+        aim = np.arctan2(target_y - origin_y, target_x - origin_x)
+        speed = bullets['next_speed'][turning]
+        vel_x[turning] = np.cos(aim) * speed
+        vel_y[turning] = np.sin(aim) * speed
+        x[turning] = origin_x + vel_x[turning] * late
+        y[turning] = origin_y + vel_y[turning] * late
+        behavior[turning] = 0
+
+    split = (flags & SPLIT) > 0
+    if split.any():
+        parents, late = rows[split], over[split]
+        counts = bullets['shards'][parents].astype(np.intp)
+        first = np.cumsum(counts) - counts
+        parent = np.repeat(np.arange(parents.size), counts)
+        shard = np.arange(counts.sum()) - first[parent]
+        heading = np.arctan2(vel_y[parents], vel_x[parents])
+        angle = heading[parent] + 2 * np.pi * shard / counts[parent]
+        speed = bullets['next_speed'][parents][parent]
+        late = late[parent]
+        shard_vx, shard_vy = np.cos(angle) * speed, np.sin(angle) * speed
+        origin_x = (x[parents] - vel_x[parents] * over[split])[parent]
+        origin_y = (y[parents] - vel_y[parents] * over[split])[parent]
+        killed = np.zeros(len(bullets), np.bool_)
+        killed[parents] = True
+        values = dict(x=origin_x + shard_vx * late, y=origin_y + shard_vy * late, vel_x=shard_vx, vel_y=shard_vy,
+                      radius=np.maximum(bullets['radius'][parents].astype(np.intp) - 3, 3)[parent],
+                      color=bullets['color'][parents][parent], damage=bullets['damage'][parents][parent],
+                      owner=bullets['owner'][parents][parent], age=late)
+        bullets.kill_where(killed)
+        bullets.spawn_many(parent.size, **values)
+
+def cull_bullets(bullets, margin=50):
+    x, y = bullets['x'], bullets['y']
+    bullets.kill_where((x < -margin) | (x > SCREEN_WIDTH + margin) |
+                       (y < -margin) | (y > SCREEN_HEIGHT + margin))
+
+def draw_bullets(bullets, queue, layer):
+    # One sprite lookup per color and size; each group's positions are worked out at once
+    if not len(bullets):
+        return
+    x = bullets['x'].astype(np.intp)
+    y = bullets['y'].astype(np.intp)
+    style = bullets['color'].astype(np.intp) * 256 + bullets['radius']
+    for key in np.unique(style).tolist():
+        rows = style == key
+        glow, core = bullet_sprites(BULLET_COLORS[key >> 8], key & 255)
+        gx, gy = x[rows], y[rows]
+        offset = glow.get_width() // 2
+        queue.submit_many(glow, np.stack((gx - offset, gy - offset), 1).tolist(), pygame.BLEND_ADD, layer - 1)
+        offset = core.get_width() // 2
+        queue.submit_many(core, np.stack((gx - offset, gy - offset), 1).tolist(), layer=layer)
+
+def bullet_sprites(color, radius):
+    def build_glow():
+        glow_surf = pygame.Surface((radius * 6, radius * 6), pygame.SRCALPHA)
+        for i in range(3):
+            alpha = 60 - i * 20
+            r = radius * (3 - i)
+            pygame.draw.circle(glow_surf, (*color, alpha), (radius * 3, radius * 3), r)
+        return glow_surf
+
+    def build_core():
+        core_surf = pygame.Surface((radius * 2 + 2, radius * 2 + 2), pygame.SRCALPHA)
+        pygame.draw.circle(core_surf, color, (radius + 1, radius + 1), radius)
+        pygame.draw.circle(core_surf, WHITE, (radius + 1, radius + 1), radius // 2)
+        return core_surf
+
+    return (atlas.cached(('bullet_glow', color, radius), build_glow),
+            atlas.cached(('bullet_core', color, radius), build_core))
+
+# ============== COLLISION ==============
+
+bullet_masks = {}
+
+def bullet_mask(radius):
+    mask = bullet_masks.get(radius)
+    if mask is None:
+        surf = pygame.Surface((radius * 2 + 1, radius * 2 + 1), pygame.SRCALPHA)
+        pygame.draw.circle(surf, WHITE, (radius, radius), radius)
+        mask = bullet_masks[radius] = pygame.mask.from_surface(surf)
+    return mask
+
+def circle_hits(bullets, live, tx, ty, radius):
+    """Bullet centers within radius of a target's center; first target per bullet.
+    Returns (bullet rows, target rows)"""
+    dx = bullets['x'][:, None] - tx[None, :]
+    dy = bullets['y'][:, None] - ty[None, :]
+    touching = (dx * dx + dy * dy < radius * radius) & live[:, None]
+    hits = np.flatnonzero(touching.any(axis=1))
+    return hits, touching[hits].argmax(axis=1)
+
+def mask_hits(bullets, live, tx, ty, name, angles):
+    """Pixel-perfect hits against the sprite mask for each target's current rotation frame.
+    A circle broadphase picks the candidates; first target per bullet.
+    Returns (bullet rows, target rows)"""
+    bx, by, radius = bullets['x'], bullets['y'], bullets['radius']
+    reach = radius.astype(np.float32) + atlas.reach(name)
+    dx = bx[:, None] - tx[None, :]
+    dy = by[:, None] - ty[None, :]
+    near = (dx * dx + dy * dy < (reach * reach)[:, None]) & live[:, None]
+    hit_bullets, hit_targets = [], []
+    last = -1
+    for b, t in zip(*(rows.tolist() for rows in np.nonzero(near))):
+        if b == last:
+            continue  # Pairs come sorted by bullet, and a bullet only hits once
+        mask = atlas.mask(name, angles[t])
+        width, height = mask.get_size()
+        r = int(radius[b])
+        offset = (int(bx[b]) - r - (int(tx[t]) - width // 2), int(by[b]) - r - (int(ty[t]) - height // 2))
+        if mask.overlap(bullet_mask(r), offset):
+            hit_bullets.append(b)
+            hit_targets.append(t)
+            last = b
+    return np.array(hit_bullets, np.intp), np.array(hit_targets, np.intp)
+
+def part_hits(bullets, live, px, py, radius, alive):
+    """Hits against every hitbox of a multi-part target in one bullets x parts test.
+    Earlier parts are drawn on top, so a bullet touching several hits the first.
+    Returns (bullet rows, part indices)"""
+    dx = bullets['x'][:, None] - px[None, :]
+    dy = bullets['y'][:, None] - py[None, :]
+    reach = bullets['radius'].astype(np.float32)[:, None] + radius[None, :]
+    touching = (dx * dx + dy * dy < reach * reach) & live[:, None] & alive[None, :]
+    hits = np.flatnonzero(touching.any(axis=1))
+    return hits, touching[hits].argmax(axis=1)
+
+def segment_distances(x0, y0, x1, y1, px, py):
+    """Distance from the point (px, py) to every segment (x0, y0)-(x1, y1) at once"""
+    dx, dy = x1 - x0, y1 - y0
+    t = ((px - x0) * dx + (py - y0) * dy) / np.maximum(dx * dx + dy * dy, 1e-9)
+    t = np.clip(t, 0, 1)
+    return np.hypot(x0 + t * dx - px, y0 + t * dy - py)
+
+# ============== LASERS ==============
+
+# A laser shows a thin telegraph line first, then a beam that sweeps through an angle.
+# Everything about a beam is a function of its age, so sweeps land alike at any frame rate.
+LASER_WARMUP = 8      # Frames for a beam to widen at the start and narrow at the end
+LASER_MARGIN = 40     # Beams run this far past the screen edge
+
+def make_laser_table():
+    # owner is the serial of the enemy firing the beam, so its beams go when it dies
+    return Archetype('lasers', capacity=16,
+                     x=np.float64, y=np.float64, angle=np.float64, sweep=np.float64, width=np.float32,
+                     telegraph=np.float32, duration=np.float32, age=np.float64, color=np.uint8,
+                     owner=np.int32, grazed=np.bool_)
+
+def fire_lasers(lasers, x, y, angle, sweep, color, width=16, telegraph=45, duration=90, age=0, owner=0):
+    # angle is where the beam starts, sweep the turn per frame once it fires.
+    # Any argument may be an array, as with fire_many
+    x, y, angle, sweep, age, owner = np.broadcast_arrays(x, y, angle, sweep, age, owner)
+    lasers.spawn_many(x.size, x=x.ravel(), y=y.ravel(), angle=angle.ravel(), sweep=sweep.ravel(),
+                      width=width, telegraph=telegraph, duration=duration, age=age.ravel(),
+                      color=COLOR_INDEX[color], owner=owner.ravel())
+
+def update_lasers(lasers, dt=1.0):
+    lasers['age'] += dt
+    lasers.kill_where(lasers['age'] >= lasers['telegraph'] + lasers['duration'])
+
+def anchor_lasers(lasers, owner, x, y):
+    # Keep an owner's beams coming out of it as it moves
+    following = lasers['owner'] == owner
+    lasers['x'][following] = x
+    lasers['y'][following] = y
+
+def cancel_lasers(lasers, owners):
+    if len(lasers) and len(owners):
+        lasers.kill_where(np.isin(lasers['owner'], owners))
+
+def beam_lengths(x, y, cos, sin):
+    # Distance from each origin to where its beam leaves the screen, plus a margin
+    cos = np.where(np.abs(cos) < 1e-9, 1e-9, cos)
+    sin = np.where(np.abs(sin) < 1e-9, 1e-9, sin)
+    exit_x = np.maximum(-x / cos, (SCREEN_WIDTH - x) / cos)
+    exit_y = np.maximum(-y / sin, (SCREEN_HEIGHT - y) / sin)
+    return np.maximum(np.minimum(exit_x, exit_y) + LASER_MARGIN, 0)
+
+def laser_beams(lasers):
+    """Every laser's current angle, far end and half width. The half width is 0 while
+    telegraphing and ramps over LASER_WARMUP at both ends of the beam"""
+    age, telegraph, duration = lasers['age'], lasers['telegraph'], lasers['duration']
+    firing = age - telegraph
+    angle = lasers['angle'] + lasers['sweep'] * np.clip(firing, 0, duration)
+    cos, sin = np.cos(angle), np.sin(angle)
+    x, y = lasers['x'], lasers['y']
+    length = beam_lengths(x, y, cos, sin)
+    warm = np.clip(np.minimum(firing, duration - firing) / LASER_WARMUP, 0, 1)
+    return angle, x + cos * length, y + sin * length, lasers['width'] * 0.5 * warm
+
+def draw_lasers(lasers, queue):
+    # The beam texture is a short strip stretched to the beam's length and rotated onto it
+    if not len(lasers):
+        return
+    angle, end_x, end_y, half_width = laser_beams(lasers)
+    for x, y, x1, y1, a, half, width, age, color in zip(
+            lasers['x'].tolist(), lasers['y'].tolist(), end_x.tolist(), end_y.tolist(), angle.tolist(),
+            half_width.tolist(), lasers['width'].tolist(), lasers['age'].tolist(), lasers['color'].tolist()):
+        length = int(math.hypot(x1 - x, y1 - y))
+        if length < 2:
+            continue
+        color = BULLET_COLORS[color]
+        if half > 0:
+            texture = beam_texture(color, int(width))
+            height = max(2, int(texture.get_height() * half * 2 / width))
+        else:
+            texture = telegraph_texture(color, int(age // 6) % 2)
+            height = texture.get_height()
+        beam = pygame.transform.rotate(pygame.transform.scale(texture, (length, height)), -math.degrees(a))
+        queue.submit_centered(beam, (x + x1) / 2, (y + y1) / 2, pygame.BLEND_ADD, LAYER_ENEMY_BULLET_GLOW)
+
+def beam_texture(color, width):
+    # A strip across the beam: white-hot core fading through the color into a soft glow
+    def build():
+        glow = width // 2
+        height = width + glow * 2
+        strip = pygame.Surface((8, height), pygame.SRCALPHA)
+        center = (height - 1) / 2
+        for row in range(height):
+            edge = abs(row - center) / (height / 2)
+            core = max(0.0, 1 - abs(row - center) / (width / 4))
+            level = max(0.0, 1 - edge) ** 1.5
+            shade = tuple(min(255, int(c * level + 255 * core * 0.8)) for c in color)
+            pygame.draw.line(strip, (*shade, 255), (0, row), (7, row))
+        return strip
+    return atlas.cached(('laser_beam', color, width), build)
+
+def telegraph_texture(color, blink):
+    def build():
+        strip = pygame.Surface((8, 3), pygame.SRCALPHA)
+        level = 0.6 if blink else 0.35
+        shade = tuple(int(c * level) for c in color)
+        strip.fill((*shade, 255))
+        strip.fill((*(int(c * level * 0.4) for c in color), 255), (0, 0, 8, 1))
+        strip.fill((*(int(c * level * 0.4) for c in color), 255), (0, 2, 8, 1))
+        return strip
+    return atlas.cached(('laser_telegraph', color, blink), build)
 
 # ============== PLAYER ==============
 
 class Player:
-    def __init__(self):
-        self.x = SCREEN_WIDTH // 2
+    def __init__(self, home_x=None, sprite='player'):
+        self.home_x = SCREEN_WIDTH // 2 if home_x is None else home_x  # Where it starts and respawns
+        self.sprite = sprite
+        self.x = self.home_x
         self.y = SCREEN_HEIGHT - 150
         self.hitbox_radius = 3  # Tiny hitbox for bullet hell
         self.graze_radius = GRAZE_DISTANCE
@@ -194,11 +716,14 @@ class Player:
 
         # Visual
         self.trail_positions = []
+        self.trail_time = 0
         self.angle = 0
 
-    def update(self, dx, dy, focused, particles):
+    def update(self, dx, dy, focused, particles, dt=1.0):
         if self.dead:
-            self.respawn_timer -= 1
+            if self.lives <= 0:
+                return  # Out for good; in co-op the partner plays on
+            self.respawn_timer -= dt
             if self.respawn_timer <= 0:
                 self.respawn()
             return
@@ -211,55 +736,55 @@ class Player:
             dx *= 0.707
             dy *= 0.707
 
-        self.x += dx * speed
-        self.y += dy * speed
+        self.x += dx * speed * dt
+        self.y += dy * speed * dt
 
         # Keep on screen
         margin = 20
         self.x = max(margin, min(SCREEN_WIDTH - margin, self.x))
         self.y = max(margin, min(SCREEN_HEIGHT - margin, self.y))
 
-        # Trail
-        self.trail_positions.append((self.x, self.y))
-        if len(self.trail_positions) > 10:
-            self.trail_positions.pop(0)
+        # Trail, sampled once per 60 fps frame so it keeps its length at any frame rate
+        self.trail_time += dt
+        if self.trail_time >= 1:
+            self.trail_time %= 1
+            self.trail_positions.append((self.x, self.y))
+            if len(self.trail_positions) > PLAYER_TRAIL:
+                self.trail_positions.pop(0)
 
         # Engine particles
-        if random.random() < 0.3:
+        if random.random() < 0.3 * dt:
             particles.trail(self.x, self.y + 20, CYAN, 2)
 
         # Invincibility countdown
         if self.invincible > 0:
-            self.invincible -= 1
+            self.invincible -= dt
 
-        self.shoot_timer += 1
-        self.angle += 0.1
+        self.shoot_timer += dt
+        self.angle += 0.1 * dt
 
-    def shoot(self):
-        if self.dead:
-            return []
-
-        bullets = []
-        if self.shoot_timer >= self.shoot_delay:
-            self.shoot_timer = 0
+    def shoot(self, bullets):
+        if self.dead or not due(self.shoot_timer, self.shoot_delay):
+            return False
+        age = self.shoot_timer = overdue(self.shoot_timer, self.shoot_delay)
 
-            # Base shot
-            bullets.append(Bullet(self.x, self.y - 20, 0, -BULLET_SPEED, CYAN, 5, 1, True))
+        # Base shot
+        fire(bullets, self.x, self.y - 20, 0, -BULLET_SPEED, CYAN, 5, age=age)
 
-            # Power level shots
-            if self.power >= 1.5:
-                bullets.append(Bullet(self.x - 15, self.y - 10, -0.5, -BULLET_SPEED, CYAN, 4, 1, True))
-                bullets.append(Bullet(self.x + 15, self.y - 10, 0.5, -BULLET_SPEED, CYAN, 4, 1, True))
+        # Power level shots
+        if self.power >= 1.5:
+            fire(bullets, self.x - 15, self.y - 10, -0.5, -BULLET_SPEED, CYAN, 4, age=age)
+            fire(bullets, self.x + 15, self.y - 10, 0.5, -BULLET_SPEED, CYAN, 4, age=age)
 
-            if self.power >= 2.5:
-                bullets.append(Bullet(self.x - 30, self.y, -1, -BULLET_SPEED * 0.9, GREEN, 4, 1, True))
-                bullets.append(Bullet(self.x + 30, self.y, 1, -BULLET_SPEED * 0.9, GREEN, 4, 1, True))
+        if self.power >= 2.5:
+            fire(bullets, self.x - 30, self.y, -1, -BULLET_SPEED * 0.9, GREEN, 4, age=age)
+            fire(bullets, self.x + 30, self.y, 1, -BULLET_SPEED * 0.9, GREEN, 4, age=age)
 
-            if self.power >= 3.5:
-                bullets.append(Bullet(self.x - 10, self.y - 15, 0, -BULLET_SPEED * 1.1, YELLOW, 3, 1, True))
-                bullets.append(Bullet(self.x + 10, self.y - 15, 0, -BULLET_SPEED * 1.1, YELLOW, 3, 1, True))
+        if self.power >= 3.5:
+            fire(bullets, self.x - 10, self.y - 15, 0, -BULLET_SPEED * 1.1, YELLOW, 3, age=age)
+            fire(bullets, self.x + 10, self.y - 15, 0, -BULLET_SPEED * 1.1, YELLOW, 3, age=age)
 
-        return bullets
+        return True
 
     def hit(self, particles):
         if self.invincible > 0 or self.dead:
@@ -280,7 +805,7 @@ class Player:
 
     def respawn(self):
         self.dead = False
-        self.x = SCREEN_WIDTH // 2
+        self.x = self.home_x
         self.y = SCREEN_HEIGHT - 150
         self.invincible = INVINCIBILITY_FRAMES
 
@@ -290,15 +815,16 @@ class Player:
             self.invincible = 120
 
             # Clear bullets with explosion
-            for bullet in enemy_bullets:
-                particles.explosion(bullet.x, bullet.y, bullet.color, 5, 3, 3, 15)
+            for x, y, color in zip(enemy_bullets['x'].tolist(), enemy_bullets['y'].tolist(),
+                                   enemy_bullets['color'].tolist()):
+                particles.explosion(x, y, BULLET_COLORS[color], 5, 3, 3, 15)
             enemy_bullets.clear()
 
             # Screen flash effect
             return True
         return False
 
-    def draw(self, surface):
+    def draw(self, queue):
         if self.dead:
             return
 
@@ -307,198 +833,231 @@ class Player:
             return
 
         # Trail
+        count = len(self.trail_positions)
         for i, (tx, ty) in enumerate(self.trail_positions):
-            alpha = i / len(self.trail_positions)
-            size = int(3 + alpha * 5)
-            color = (int(80 * alpha), int(230 * alpha), int(255 * alpha))
-            pygame.draw.circle(surface, color, (int(tx), int(ty)), size)
-
-        # Ship body
-        ship_points = [
-            (self.x, self.y - 25),
-            (self.x - 20, self.y + 15),
-            (self.x - 8, self.y + 5),
-            (self.x, self.y + 20),
-            (self.x + 8, self.y + 5),
-            (self.x + 20, self.y + 15),
-        ]
-        pygame.draw.polygon(surface, CYAN, ship_points)
-        pygame.draw.polygon(surface, WHITE, ship_points, 2)
-
-        # Cockpit
-        pygame.draw.ellipse(surface, (150, 220, 255), (self.x - 6, self.y - 10, 12, 15))
+            queue.submit_centered(trail_sprite(i, count), tx, ty, layer=LAYER_PLAYER)
 
-        # Engine glow
-        glow_size = 8 + math.sin(self.angle * 2) * 2
-        pygame.draw.circle(surface, ORANGE, (int(self.x), int(self.y + 18)), int(glow_size))
-        pygame.draw.circle(surface, YELLOW, (int(self.x), int(self.y + 18)), int(glow_size * 0.5))
+        # Ship body, cockpit and engine glow
+        atlas.submit(queue, LAYER_PLAYER, self.sprite, self.x, self.y, self.angle)
 
-        # Focus mode hitbox indicator
+        # Focus mode hitbox indicator and graze circle
         if self.focused:
-            pygame.draw.circle(surface, WHITE, (int(self.x), int(self.y)), self.hitbox_radius + 2, 1)
-            pygame.draw.circle(surface, RED, (int(self.x), int(self.y)), self.hitbox_radius)
-
-            # Graze circle
-            pygame.draw.circle(surface, (50, 50, 80), (int(self.x), int(self.y)), self.graze_radius, 1)
+            atlas.submit(queue, LAYER_PLAYER, 'focus', self.x, self.y)
+
+def trail_sprite(i, count):
+    def build():
+        alpha = i / count
+        size = int(3 + alpha * 5)
+        color = (int(80 * alpha), int(230 * alpha), int(255 * alpha))
+        surf = pygame.Surface((size * 2 + 2, size * 2 + 2), pygame.SRCALPHA)
+        pygame.draw.circle(surf, color, (size + 1, size + 1), size)
+        return surf
+    return atlas.cached(('trail', i, count), build)
 
 # ============== ENEMIES ==============
 
-class Enemy:
-    def __init__(self, x, y, health, points, color):
-        self.x = x
-        self.y = y
-        self.health = health
-        self.max_health = health
-        self.points = points
-        self.color = color
-        self.time = 0
-        self.shoot_timer = 0
-        self.hit_flash = 0
-
-    def update(self):
-        self.time += 1
-        self.shoot_timer += 1
-        if self.hit_flash > 0:
-            self.hit_flash -= 1
-
-    def shoot(self):
-        return []
-
-    def hit(self, damage, particles):
-        self.health -= damage
-        self.hit_flash = 5
-        particles.spark(self.x, self.y, self.color)
-        return self.health <= 0
-
-    def draw(self, surface):
-        pass
-
-    def is_off_screen(self):
-        return self.y > SCREEN_HEIGHT + 100
-
-class BasicEnemy(Enemy):
-    def __init__(self, x, y):
-        super().__init__(x, y, 10, 100, PURPLE)
-        self.vel_y = 2
-        self.amplitude = random.uniform(50, 100)
-        self.frequency = random.uniform(0.02, 0.04)
-        self.start_x = x
-
-    def update(self):
-        super().update()
-        self.y += self.vel_y
-        self.x = self.start_x + math.sin(self.time * self.frequency) * self.amplitude
-
-    def shoot(self):
-        bullets = []
-        if self.shoot_timer >= 60:
-            self.shoot_timer = 0
-            # Aimed shot at player
-            bullets.append(Bullet(self.x, self.y, 0, 4, MAGENTA, 6))
-        return bullets
-
-    def draw(self, surface):
-        color = WHITE if self.hit_flash > 0 else self.color
-        # Diamond shape
-        points = [
-            (self.x, self.y - 20),
-            (self.x + 15, self.y),
-            (self.x, self.y + 20),
-            (self.x - 15, self.y),
-        ]
-        pygame.draw.polygon(surface, color, points)
-        pygame.draw.polygon(surface, WHITE, points, 2)
-
-class SpiralEnemy(Enemy):
-    def __init__(self, x, y):
-        super().__init__(x, y, 25, 250, ORANGE)
-        self.target_y = random.randint(100, 300)
-        self.angle = 0
-
-    def update(self):
-        super().update()
-        # Move to position then hover
-        if self.y < self.target_y:
-            self.y += 2
-        self.angle += 0.05
-
-    def shoot(self):
-        bullets = []
-        if self.y >= self.target_y and self.shoot_timer >= 8:
-            self.shoot_timer = 0
-            # Spiral pattern
-            angle = self.time * 0.15
-            speed = 3
-            bullets.append(Bullet(
-                self.x, self.y,
-                math.cos(angle) * speed,
-                math.sin(angle) * speed + 1,
-                ORANGE, 5
-            ))
-        return bullets
-
-    def draw(self, surface):
-        color = WHITE if self.hit_flash > 0 else self.color
-        # Spinning triangle
-        for i in range(3):
-            angle = self.angle + i * (2 * math.pi / 3)
-            px = self.x + math.cos(angle) * 20
-            py = self.y + math.sin(angle) * 20
-            pygame.draw.circle(surface, color, (int(px), int(py)), 8)
-        pygame.draw.circle(surface, WHITE, (int(self.x), int(self.y)), 12)
-
-class BurstEnemy(Enemy):
-    def __init__(self, x, y):
-        super().__init__(x, y, 35, 400, PINK)
-        self.target_y = random.randint(80, 200)
-        self.burst_count = 0
-
-    def update(self):
-        super().update()
-        if self.y < self.target_y:
-            self.y += 1.5
-        else:
-            # Slight hover movement
-            self.x += math.sin(self.time * 0.03) * 0.5
-
-    def shoot(self):
-        bullets = []
-        if self.y >= self.target_y and self.shoot_timer >= 90:
-            self.shoot_timer = 0
-            # Circular burst
-            count = 16
-            for i in range(count):
-                angle = (2 * math.pi * i / count) + self.burst_count * 0.2
-                speed = 3.5
-                bullets.append(Bullet(
-                    self.x, self.y,
-                    math.cos(angle) * speed,
-                    math.sin(angle) * speed,
-                    PINK, 6
-                ))
-            self.burst_count += 1
-        return bullets
-
-    def draw(self, surface):
-        color = WHITE if self.hit_flash > 0 else self.color
-        pygame.draw.circle(surface, color, (int(self.x), int(self.y)), 22)
-        pygame.draw.circle(surface, WHITE, (int(self.x), int(self.y)), 22, 2)
-        # Inner pattern
-        for i in range(6):
-            angle = self.time * 0.05 + i * math.pi / 3
-            px = self.x + math.cos(angle) * 12
-            py = self.y + math.sin(angle) * 12
-            pygame.draw.circle(surface, WHITE, (int(px), int(py)), 4)
+@dataclass
+class EnemyKind:
+    name: str
+    health: int
+    points: int
+    color: tuple
+    speed: float       # Descent per frame
+    fire_delay: int    # Frames between shots
+
+ENEMY_KINDS = [
+    EnemyKind('basic', 10, 100, PURPLE, 2, 60),
+    EnemyKind('spiral', 25, 250, ORANGE, 2, 8),
+    EnemyKind('burst', 35, 400, PINK, 1.5, 90),
+    EnemyKind('laser', 30, 350, BLUE, 1.5, 200),
+]
+ENEMY_WEIGHTS = [45, 27, 18, 10]  # Spawn odds per kind
+ENEMY_KIND_BY_NAME = {kind.name: kind for kind in ENEMY_KINDS}
+
+# The circle hit tests that came before the sprite masks, kept for comparison (benchmarks.py collisions)
+ENEMY_HIT_RADIUS = 25
+BOSS_HIT_RADIUS = 60
+
+def make_enemy_tables():
+    # One table per kind: shared columns plus whatever that kind's movement needs
+    def columns(**extra):
+        # Double precision: positions and timers are compared against targets after
+        # hundreds of fractional steps in delta-time mode
+        return dict(x=np.float64, y=np.float64, health=np.int16, time=np.float64,
+                    shoot_timer=np.float64, hit_flash=np.float32, serial=np.int32, **extra)
+    return {
+        'basic': Archetype('basic', capacity=16,
+                           **columns(start_x=np.float64, amplitude=np.float64, frequency=np.float64)),
+        'spiral': Archetype('spiral', capacity=16, **columns(target_y=np.float64, angle=np.float64)),
+        'burst': Archetype('burst', capacity=16, **columns(target_y=np.float64, burst_count=np.int16)),
+        'laser': Archetype('laser', capacity=16, **columns(target_y=np.float64, sweeps=np.int16)),
+    }
+
+def spawn_enemy(enemies, kind, x, y, serial, rng=random, age=0):
+    # age: frames since the spawn fell due, as with bullets. serial tags the shots it fires
+    common = dict(x=x, y=y + kind.speed * age, health=kind.health, time=age, shoot_timer=age, serial=serial)
+    if kind.name == 'basic':
+        enemies['basic'].spawn(start_x=x, amplitude=rng.uniform(50, 100), frequency=rng.uniform(0.02, 0.04),
+                               **common)
+    elif kind.name == 'spiral':
+        enemies['spiral'].spawn(target_y=rng.randint(100, 300), **common)
+    elif kind.name == 'burst':
+        enemies['burst'].spawn(target_y=rng.randint(80, 200), **common)
+    elif kind.name == 'laser':
+        enemies['laser'].spawn(target_y=rng.randint(60, 160), **common)
+
+def age_enemies(table, dt):
+    table['time'] += dt
+    table['shoot_timer'] += dt
+    flash = table['hit_flash']
+    flash[flash > 0] -= dt
+
+def descend_then_hover(table, kind, dt):
+    # Returns the rows that were already hovering at the start of the frame.
+    # Descent stops exactly on target_y so the hover height doesn't depend on the step size.
+    y = table['y']
+    target_y = table['target_y']
+    descending = np.flatnonzero(y < target_y)
+    target = target_y[descending]
+    moved = y[descending] + kind.speed * dt
+    arrived = moved >= target - STEP_EPSILON
+    y[descending] = np.where(arrived, target, moved)
+
+    # The shot held back during the descent falls due at the moment of arrival, part way through the step
+    rows = descending[arrived]
+    since_arrival = (moved[arrived] - target[arrived]) / kind.speed
+    timer = table['shoot_timer']
+    timer[rows] = np.minimum(timer[rows], kind.fire_delay + since_arrival)
+
+    hovering = np.ones(len(table), np.bool_)
+    hovering[descending] = False
+    return hovering
+
+def move_basic_enemies(table, kind, dt):
+    # Straight down with a sine drift around the spawn column
+    table['y'] += kind.speed * dt
+    table['x'] = table['start_x'] + np.sin(table['time'] * table['frequency']) * table['amplitude']
+
+def move_spiral_enemies(table, kind, dt):
+    descend_then_hover(table, kind, dt)
+    table['angle'] += 0.05 * dt
+
+def move_burst_enemies(table, kind, dt):
+    hovering = descend_then_hover(table, kind, dt)
+    # Slight hover movement
+    table['x'][hovering] += np.sin(table['time'][hovering] * 0.03) * 0.5 * dt
+
+def move_laser_enemies(table, kind, dt):
+    # Holds still once in place, so its beams come out of it
+    descend_then_hover(table, kind, dt)
+
+def ready_to_shoot(table, kind, need_hover=False):
+    # Returns the rows that fire this frame and how long ago each shot fell due
+    timer = table['shoot_timer']
+    delay = kind.fire_delay
+    ready = due(timer, delay)
+    if need_hover:
+        ready &= table['y'] >= table['target_y']
+    age = np.maximum(timer[ready] - delay, 0)
+    age[age >= delay] = 0
+    timer[ready] = age
+    return ready, age
+
+def basic_enemies_shoot(table, kind, bullets, lasers):
+    ready, age = ready_to_shoot(table, kind)
+    if ready.any():
+        fire_many(bullets, table['x'][ready], table['y'][ready], 0, 4, MAGENTA, 6, age=age,
+                  owner=table['serial'][ready])
+
+def spiral_enemies_shoot(table, kind, bullets, lasers):
+    ready, age = ready_to_shoot(table, kind, need_hover=True)
+    if ready.any():
+        angle = (table['time'][ready] - age) * 0.15
+        speed = 3
+        fire_many(bullets, table['x'][ready], table['y'][ready],
+                  np.cos(angle) * speed, np.sin(angle) * speed + 1, ORANGE, 5, age=age,
+                  owner=table['serial'][ready])
+
+BURST_ANGLES = 2 * np.pi * np.arange(16) / 16
+
+def burst_enemies_shoot(table, kind, bullets, lasers):
+    ready, age = ready_to_shoot(table, kind, need_hover=True)
+    if ready.any():
+        # Circular burst, rotated a little more on every volley
+        angle = BURST_ANGLES[None, :] + table['burst_count'][ready, None] * 0.2
+        speed = 3.5
+        fire_many(bullets, table['x'][ready, None], table['y'][ready, None],
+                  np.cos(angle) * speed, np.sin(angle) * speed, PINK, 6, age=age[:, None],
+                  owner=table['serial'][ready, None])
+        table['burst_count'][ready] += 1
+
+def laser_enemies_shoot(table, kind, bullets, lasers):
+    ready, age = ready_to_shoot(table, kind, need_hover=True)
+    if ready.any():
+        # A beam down the screen that sweeps across it, alternating sides every volley
+        side = np.where(table['sweeps'][ready] % 2 == 0, 1.0, -1.0)
+        fire_lasers(lasers, table['x'][ready], table['y'][ready] + 6, np.pi / 2 - 0.6 * side, 1.2 * side / 100,
+                    BLUE, 14, telegraph=50, duration=100, age=age, owner=table['serial'][ready])
+        table['sweeps'][ready] += 1
+
+ENEMY_SYSTEMS = {
+    'basic': (move_basic_enemies, basic_enemies_shoot),
+    'spiral': (move_spiral_enemies, spiral_enemies_shoot),
+    'burst': (move_burst_enemies, burst_enemies_shoot),
+    'laser': (move_laser_enemies, laser_enemies_shoot),
+}
+
+def update_enemies(enemies, bullets, lasers, dt=1.0):
+    for kind in ENEMY_KINDS:
+        table = enemies[kind.name]
+        if not len(table):
+            continue
+        move, shoot = ENEMY_SYSTEMS[kind.name]
+        age_enemies(table, dt)
+        move(table, kind, dt)
+        shoot(table, kind, bullets, lasers)
+        table.kill_where(table['y'] > SCREEN_HEIGHT + 100 + STEP_EPSILON)
+
+def enemy_angles(name, table):
+    # Rotation of each enemy's sprite, shared by drawing and the collision masks
+    if name == 'spiral':
+        return table['angle']
+    if name == 'burst':
+        return table['time'] * 0.05
+    return np.zeros(len(table))
+
+def draw_enemies(enemies, queue):
+    for kind in ENEMY_KINDS:
+        table = enemies[kind.name]
+        for x, y, angle, flash in zip(table['x'].tolist(), table['y'].tolist(),
+                                      enemy_angles(kind.name, table).tolist(), table['hit_flash'].tolist()):
+            atlas.submit(queue, LAYER_ENEMIES, kind.name, x, y, angle, flash > 0)
 
 # ============== BOSS ==============
 
+# Hitboxes are the six orbiters, then the core body. Orbiters come first because
+# they're drawn on top of the body
+BOSS_ORBITERS = 6
+BOSS_CORE = BOSS_ORBITERS
+BOSS_PART_RADIUS = np.array([15] * BOSS_ORBITERS + [60], np.float32)
+BOSS_ORBIT_OFFSETS = np.arange(BOSS_ORBITERS) * (math.pi / 3)
+BOSS_ORBITER_HEALTH = 150
+BOSS_ORBITER_POINTS = 1500
+
 class Boss:
-    def __init__(self):
+    def __init__(self, rng=random):
+        self.rng = rng
         self.x = SCREEN_WIDTH // 2
         self.y = -100
         self.target_y = 150
         self.health = 2000
         self.max_health = 2000
+        self.orbiter_health = np.full(BOSS_ORBITERS, BOSS_ORBITER_HEALTH, np.int32)
+        self.orbiter_flash = np.zeros(BOSS_ORBITERS)
+        # Hitbox centers, placed once per update and shared by drawing, shooting and collision
+        self.part_x = np.zeros(BOSS_CORE + 1)
+        self.part_y = np.zeros(BOSS_CORE + 1)
+        self.part_alive = np.ones(BOSS_CORE + 1, np.bool_)
         self.phase = 0
         self.time = 0
         self.shoot_timer = 0
@@ -508,30 +1067,45 @@ class Boss:
             self.pattern_spiral,
             self.pattern_aimed_burst,
             self.pattern_wall,
-            self.pattern_chaos
+            self.pattern_chaos,
+            self.pattern_homing,
+            self.pattern_freeze,
+            self.pattern_flower,
+            self.pattern_lasers
         ]
         self.pattern_timer = 0
         self.current_pattern = 0
         self.defeated = False
+        self.place_parts()
+
+    def place_parts(self):
+        angle = self.time * 0.03 + BOSS_ORBIT_OFFSETS
+        self.part_x[:BOSS_ORBITERS] = self.x + np.cos(angle) * 80
+        self.part_y[:BOSS_ORBITERS] = self.y + np.sin(angle) * 40
+        self.part_x[BOSS_CORE] = self.x
+        self.part_y[BOSS_CORE] = self.y
 
-    def update(self):
-        self.time += 1
-        self.shoot_timer += 1
-        self.pattern_timer += 1
+    def update(self, dt=1.0):
+        self.time += dt
+        self.shoot_timer += dt
+        self.pattern_timer += dt
 
         if self.hit_flash > 0:
-            self.hit_flash -= 1
+            self.hit_flash -= dt
+        self.orbiter_flash -= dt
 
         # Enter screen
         if self.entering:
-            self.y += 2
-            if self.y >= self.target_y:
+            self.y += 2 * dt
+            if self.y >= self.target_y - STEP_EPSILON:
+                self.y = self.target_y
                 self.entering = False
+            self.place_parts()
             return
 
         # Hover movement
-        self.x = SCREEN_WIDTH // 2 + math.sin(self.time * 0.01) * 200
-        self.y = self.target_y + math.sin(self.time * 0.02) * 30
+        self.x, self.y = self.hover_position(self.time)
+        self.place_parts()
 
         # Phase transitions
         health_percent = self.health / self.max_health
@@ -544,119 +1118,180 @@ class Boss:
         else:
             self.phase = 0
 
-        # Switch patterns periodically
-        if self.pattern_timer > 300:
-            self.pattern_timer = 0
+        # Switch patterns periodically (after 300 frames; the overshoot carries over).
+        # The new pattern's cadence starts at the switch, not at whichever step saw it
+        if due(self.pattern_timer, 301):
+            self.pattern_timer -= 301
+            self.shoot_timer = self.pattern_timer
             self.current_pattern = (self.current_pattern + 1) % len(self.patterns)
 
-    def shoot(self, player_x, player_y):
+    def shoot(self, bullets, lasers, player_x, player_y):
         if self.entering or self.defeated:
-            return []
-
-        return self.patterns[self.current_pattern](player_x, player_y)
+            return
 
-    def pattern_spiral(self, px, py):
-        bullets = []
-        if self.shoot_timer >= 3:
-            self.shoot_timer = 0
+        # Everything a pattern fires belongs to the boss, so it can be cancelled with it
+        first = len(bullets)
+        self.patterns[self.current_pattern](bullets, lasers, player_x, player_y)
+        bullets['owner'][first:] = BOSS_OWNER
+
+    def cadence(self, delay):
+        # How long ago the next shot fell due, or None if it isn't due yet
+        if not due(self.shoot_timer, delay):
+            return None
+        age = self.shoot_timer = overdue(self.shoot_timer, delay)
+        return age
+
+    def hover_position(self, time):
+        return SCREEN_WIDTH // 2 + math.sin(time * 0.01) * 200, self.target_y + math.sin(time * 0.02) * 30
+
+    def orbiter_positions(self, time):
+        # Where the orbiters were at an earlier time, for shots that fell due between frames
+        x, y = self.hover_position(time)
+        angle = time * 0.03 + BOSS_ORBIT_OFFSETS
+        return x + np.cos(angle) * 80, y + np.sin(angle) * 40
+
+    def rage(self):
+        # Every destroyed orbiter makes the core's own patterns harsher
+        return BOSS_CORE + 1 - int(np.count_nonzero(self.part_alive))
+
+    def pattern_spiral(self, bullets, lasers, px, py):
+        age = self.cadence(3)
+        if age is not None:
             arms = 4 + self.phase
-            for i in range(arms):
-                angle = self.time * 0.08 + (2 * math.pi * i / arms)
-                speed = 3 + self.phase * 0.5
-                bullets.append(Bullet(
-                    self.x, self.y,
-                    math.cos(angle) * speed,
-                    math.sin(angle) * speed,
-                    MAGENTA, 6
-                ))
-        return bullets
-
-    def pattern_aimed_burst(self, px, py):
-        bullets = []
-        if self.shoot_timer >= 30 - self.phase * 5:
-            self.shoot_timer = 0
+            spin = 0.08 + 0.015 * self.rage()
+            angle = (self.time - age) * spin + 2 * np.pi * np.arange(arms) / arms
+            speed = 3 + self.phase * 0.5
+            fire_many(bullets, self.x, self.y, np.cos(angle) * speed, np.sin(angle) * speed, MAGENTA, 6, age=age)
+
+    def pattern_aimed_burst(self, bullets, lasers, px, py):
+        age = self.cadence(30 - self.phase * 5)
+        if age is not None:
             # Aim at player
-            dx = px - self.x
-            dy = py - self.y
-            dist = math.sqrt(dx*dx + dy*dy)
-            if dist > 0:
-                dx /= dist
-                dy /= dist
-
+            aim = math.atan2(py - self.y, px - self.x)
             count = 8 + self.phase * 4
             spread = 0.8 + self.phase * 0.2
-            for i in range(count):
-                offset = (i - count/2) * spread / count
-                angle = math.atan2(dy, dx) + offset
-                speed = 4 + self.phase * 0.5
-                bullets.append(Bullet(
-                    self.x, self.y,
-                    math.cos(angle) * speed,
-                    math.sin(angle) * speed,
-                    RED, 7
-                ))
-        return bullets
-
-    def pattern_wall(self, px, py):
-        bullets = []
-        if self.shoot_timer >= 20 - self.phase * 3:
-            self.shoot_timer = 0
+            angle = aim + (np.arange(count) - count / 2) * spread / count
+            speed = 4 + self.phase * 0.5
+            fire_many(bullets, self.x, self.y, np.cos(angle) * speed, np.sin(angle) * speed, RED, 7, age=age)
+
+            # Each surviving orbiter adds its own aimed shot
+            alive = self.part_alive[:BOSS_ORBITERS]
+            ox, oy = self.orbiter_positions(self.time - age)
+            ox, oy = ox[alive], oy[alive]
+            aim = np.arctan2(py - oy, px - ox)
+            fire_many(bullets, ox, oy, np.cos(aim) * 3.5, np.sin(aim) * 3.5, ORANGE, 5, age=age)
+
+    def pattern_wall(self, bullets, lasers, px, py):
+        age = self.cadence(20 - self.phase * 3 - self.rage() // 2)
+        if age is not None:
             # Horizontal wall with gaps
             gap_pos = (self.time // 20) % 5
-            for i in range(12):
-                if i == gap_pos or i == gap_pos + 1:
-                    continue
-                x = self.x - 200 + i * 35
-                bullets.append(Bullet(x, self.y + 30, 0, 3 + self.phase * 0.5, YELLOW, 8))
-        return bullets
-
-    def pattern_chaos(self, px, py):
-        bullets = []
-        if self.shoot_timer >= 5 - self.phase:
-            self.shoot_timer = 0
-            # Random chaos
-            angle = random.uniform(0, 2 * math.pi)
-            speed = random.uniform(2, 5 + self.phase)
-            color = random.choice([RED, ORANGE, YELLOW, MAGENTA, PINK])
-            bullets.append(Bullet(
-                self.x + random.uniform(-50, 50),
-                self.y + random.uniform(-20, 40),
-                math.cos(angle) * speed,
-                math.sin(angle) * speed,
-                color, random.randint(4, 8)
-            ))
-        return bullets
-
-    def hit(self, damage, particles):
-        self.health -= damage
-        self.hit_flash = 3
-        particles.spark(self.x + random.uniform(-40, 40), self.y + random.uniform(-30, 30), WHITE)
-
-        if self.health <= 0:
-            self.defeated = True
-            return True
-        return False
-
-    def draw(self, surface):
-        color = WHITE if self.hit_flash > 0 else PURPLE
-
-        # Main body
-        pygame.draw.circle(surface, color, (int(self.x), int(self.y)), 60)
-        pygame.draw.circle(surface, WHITE, (int(self.x), int(self.y)), 60, 3)
-
-        # Core
-        core_color = [RED, ORANGE, YELLOW, WHITE][self.phase]
-        pygame.draw.circle(surface, core_color, (int(self.x), int(self.y)), 25)
-
-        # Orbiting parts
-        for i in range(6):
-            angle = self.time * 0.03 + i * math.pi / 3
-            ox = self.x + math.cos(angle) * 80
-            oy = self.y + math.sin(angle) * 40
-            pygame.draw.circle(surface, color, (int(ox), int(oy)), 15)
-            pygame.draw.circle(surface, WHITE, (int(ox), int(oy)), 15, 2)
-
-        # Health bar
+            columns = [i for i in range(12) if i != gap_pos and i != gap_pos + 1]
+            x = self.x - 200 + np.array(columns) * 35
+            fire_many(bullets, x, self.y + 30, 0, 3 + self.phase * 0.5, YELLOW, 8, age=age)
+
+    def pattern_chaos(self, bullets, lasers, px, py):
+        age = self.cadence(5 - self.phase)
+        if age is not None:
+            # Random chaos, sprayed from a surviving orbiter or the bare core
+            rng = self.rng
+            x, y = self.x, self.y
+            alive = np.flatnonzero(self.part_alive[:BOSS_ORBITERS]).tolist()
+            if alive:
+                i = rng.choice(alive)
+                x, y = float(self.part_x[i]), float(self.part_y[i])
+            angle = rng.uniform(0, 2 * math.pi)
+            speed = rng.uniform(2, 5 + self.phase)
+            color = rng.choice([RED, ORANGE, YELLOW, MAGENTA, PINK])
+            fire(bullets,
+                 x + rng.uniform(-50, 50),
+                 y + rng.uniform(-20, 40),
+                 math.cos(angle) * speed,
+                 math.sin(angle) * speed,
+                 color, rng.randint(4, 8), age=age)
+
+    def pattern_homing(self, bullets, lasers, px, py):
+        age = self.cadence(40 - self.phase * 6)
+        if age is not None:
+            # Missiles from each surviving orbiter (or the bare core) that speed up
+            # and chase the player for a second and a half, then fly straight
+            alive = self.part_alive[:BOSS_ORBITERS]
+            if alive.any():
+                x, y = self.orbiter_positions(self.time - age)
+                x, y = x[alive], y[alive]
+                angle = BOSS_ORBIT_OFFSETS[alive] + (self.time - age) * 0.03
+            else:
+                x, y = self.x, self.y
+                angle = np.pi / 2 + np.array([-1.0, 0.0, 1.0])
+            fire_many(bullets, x, y, np.cos(angle) * 1.5, np.sin(angle) * 1.5, PINK, 6, age=age,
+                      behavior=HOMING | ACCELERATE, turn=0.04, accel=0.06,
+                      speed_limit=4 + self.phase * 0.5, trigger=90)
+
+    def pattern_freeze(self, bullets, lasers, px, py):
+        age = self.cadence(45 - self.phase * 5)
+        if age is not None:
+            # Rings that brake almost to a stop, hang, then all turn on the player
+            count = 16 + self.phase * 4
+            angle = (self.time - age) * 0.05 + 2 * np.pi * np.arange(count) / count
+            fire_many(bullets, self.x, self.y, np.cos(angle) * 5, np.sin(angle) * 5, WHITE, 5, age=age,
+                      behavior=ACCELERATE | REDIRECT, accel=-0.12, speed_limit=0.2,
+                      trigger=60, next_speed=3.5 + self.phase * 0.5)
+
+    def pattern_flower(self, bullets, lasers, px, py):
+        age = self.cadence(50 - self.phase * 6)
+        if age is not None:
+            # Slow seeds that burst into rings of smaller bullets
+            count = 5 + self.phase
+            angle = (self.time - age) * 0.02 + 2 * np.pi * np.arange(count) / count
+            fire_many(bullets, self.x, self.y, np.cos(angle) * 2.5, np.sin(angle) * 2.5, RED, 9, age=age,
+                      behavior=SPLIT, trigger=70, shards=8 + self.phase * 2, next_speed=3)
+
+    def pattern_lasers(self, bullets, lasers, px, py):
+        age = self.cadence(150 - self.phase * 20)
+        if age is not None:
+            # Beams fanned around the player that sweep one way, then the other next volley
+            count = 2 + self.phase // 2
+            aim = math.atan2(py - self.y, px - self.x)
+            side = 1 if int(self.pattern_timer // 150) % 2 == 0 else -1
+            angle = aim + (np.arange(count) - (count - 1) / 2) * 0.6 - 0.5 * side
+            fire_lasers(lasers, self.x, self.y, angle, side * 1.0 / 110, RED, 20,
+                        telegraph=50, duration=110, age=age, owner=BOSS_OWNER)
+            # Light cover fire while the beams telegraph
+            spread = 2 * np.pi * np.arange(8) / 8 + self.time * 0.02
+            fire_many(bullets, self.x, self.y, np.cos(spread) * 2.5, np.sin(spread) * 2.5, MAGENTA, 5, age=age)
+
+    def hit(self, parts, damage, particles):
+        """Apply one frame's hits, damage[i] to part parts[i]. Returns the orbiters destroyed"""
+        px, py = self.part_x, self.part_y
+        for part in parts.tolist():
+            if part == BOSS_CORE:
+                particles.spark(self.x + random.uniform(-40, 40), self.y + random.uniform(-30, 30), WHITE)
+            else:
+                particles.spark(float(px[part]), float(py[part]), WHITE)
+
+        totals = np.bincount(parts, damage, minlength=BOSS_CORE + 1).astype(np.int32)
+        self.orbiter_health -= totals[:BOSS_ORBITERS]
+        self.orbiter_flash[totals[:BOSS_ORBITERS] > 0] = 3
+        destroyed = np.flatnonzero(self.part_alive[:BOSS_ORBITERS] & (self.orbiter_health <= 0))
+        self.part_alive[destroyed] = False
+        for i in destroyed.tolist():
+            particles.explosion(float(px[i]), float(py[i]), PURPLE, 20, 5, 4, 25)
+
+        if totals[BOSS_CORE]:
+            self.health -= int(totals[BOSS_CORE])
+            self.hit_flash = 3
+            if self.health <= 0:
+                self.defeated = True
+        return destroyed
+
+    def draw(self, queue):
+        # Body with its phase-colored core, then the surviving orbiters
+        atlas.submit(queue, LAYER_BOSS, f'boss{self.phase}', self.x, self.y, flashing=self.hit_flash > 0)
+        for i in np.flatnonzero(self.part_alive[:BOSS_ORBITERS]).tolist():
+            atlas.submit(queue, LAYER_BOSS, 'boss_orbiter', float(self.part_x[i]), float(self.part_y[i]),
+                         flashing=self.orbiter_flash[i] > 0)
+
+    def draw_health_bar(self, surface):
         bar_width = 400
         bar_height = 20
         bar_x = SCREEN_WIDTH // 2 - bar_width // 2
@@ -672,44 +1307,584 @@ class Boss:
             marker_x = bar_x + int(bar_width * (1 - i * 0.25))
             pygame.draw.line(surface, WHITE, (marker_x, bar_y - 5), (marker_x, bar_y + bar_height + 5), 2)
 
+        # Orbiter health pips
+        pip_width = bar_width // BOSS_ORBITERS
+        for i, health in enumerate(self.orbiter_health.tolist()):
+            pip_x = bar_x + i * pip_width
+            pygame.draw.rect(surface, (60, 20, 20), (pip_x + 2, bar_y + bar_height + 8, pip_width - 4, 5))
+            if health > 0:
+                filled = int((pip_width - 4) * health / BOSS_ORBITER_HEALTH)
+                pygame.draw.rect(surface, PURPLE, (pip_x + 2, bar_y + bar_height + 8, filled, 5))
+
 # ============== POWER-UPS ==============
 
-class PowerUp:
-    def __init__(self, x, y, type_name):
-        self.x = x
-        self.y = y
-        self.type = type_name  # 'power', 'bomb', 'life', 'points'
-        self.time = 0
-        self.collected = False
+POWERUP_TYPES = ['power', 'bomb', 'life', 'points']
+POWERUP_COLORS = [RED, GREEN, PINK, YELLOW]
 
-        self.colors = {
-            'power': RED,
-            'bomb': GREEN,
-            'life': PINK,
-            'points': YELLOW
-        }
+def make_powerup_table():
+    return Archetype('powerups', capacity=16, x=np.float32, y=np.float32, type=np.uint8, time=np.float32)
 
-    def update(self):
-        self.time += 1
-        self.y += 1.5
+def move_powerups(powerups, dt=1.0):
+    powerups['time'] += dt
+    powerups['y'] += 1.5 * dt
+    powerups.kill_where(powerups['y'] > SCREEN_HEIGHT + 30)
 
-    def draw(self, surface):
-        color = self.colors.get(self.type, WHITE)
-        bob = math.sin(self.time * 0.1) * 3
+def draw_powerups(powerups, queue):
+    for x, y, kind, time in zip(powerups['x'].tolist(), powerups['y'].tolist(),
+                                powerups['type'].tolist(), powerups['time'].tolist()):
+        bob = math.sin(time * 0.1) * 3
+        queue.submit_centered(powerup_sprite(kind), x, y + bob, layer=LAYER_POWERUPS)
+
+def powerup_sprite(kind):
+    def build():
+        color = POWERUP_COLORS[kind]
+        surf = pygame.Surface((36, 36), pygame.SRCALPHA)
 
         # Glow
-        pygame.draw.circle(surface, (*color, 100), (int(self.x), int(self.y + bob)), 18)
-        pygame.draw.circle(surface, color, (int(self.x), int(self.y + bob)), 12)
-        pygame.draw.circle(surface, WHITE, (int(self.x), int(self.y + bob)), 6)
+        pygame.draw.circle(surf, (*color, 100), (18, 18), 18)
+        pygame.draw.circle(surf, color, (18, 18), 12)
+        pygame.draw.circle(surf, WHITE, (18, 18), 6)
 
         # Letter indicator
         font = pygame.font.Font(None, 20)
-        letter = self.type[0].upper()
+        letter = POWERUP_TYPES[kind][0].upper()
         text = font.render(letter, True, BLACK)
-        surface.blit(text, (int(self.x - 5), int(self.y + bob - 7)))
+        surf.blit(text, (13, 11))
+        return surf
+    return atlas.cached(('powerup', kind), build)
+
+# ============== SCORE ITEMS ==============
+# Cancelled bullets turn into small score items. A big cancel makes thousands at once,
+# so they live in one table and the magnet and pickup run over all of them together.
+
+ITEM_POINTS = 10
+ITEM_DRIFT = 20          # Frames an item coasts to a stop before the magnet takes it
+ITEM_DRAG = 0.9          # Share of its velocity an item keeps each frame while coasting
+ITEM_PULL = 0.5          # Magnet speed gained per frame after the drift
+ITEM_MAX_SPEED = 18
+ITEM_COLLECT_RADIUS = 30
+
+def make_item_table():
+    return Archetype('score_items', capacity=256,
+                     x=np.float32, y=np.float32, vel_x=np.float32, vel_y=np.float32, age=np.float32)
+
+def cancel_bullets(bullets, owners, items):
+    """Turn every bullet fired by one of owners into a score item where it is"""
+    if not len(bullets):
+        return 0
+    cancelled = np.isin(bullets['owner'], owners)
+    count = int(np.count_nonzero(cancelled))
+    if count:
+        # Items carry a little of the bullet's momentum, so a cancelled pattern puffs outward
+        items.spawn_many(count, x=bullets['x'][cancelled], y=bullets['y'][cancelled],
+                         vel_x=bullets['vel_x'][cancelled] * 0.5, vel_y=bullets['vel_y'][cancelled] * 0.5)
+        bullets.kill_where(cancelled)
+    return count
+
+def move_items(items, target_x, target_y, dt=1.0):
+    # Coast, then fly straight at the target, faster the longer the item has been pulled.
+    # Pass a target of None when there is nobody to collect them and they fall away
+    if not len(items):
+        return
+    items['age'] += dt
+    x, y, age = items['x'], items['y'], items['age']
+    if target_x is None:
+        items['vel_y'] = np.minimum(items['vel_y'] + 0.1 * dt, 3)
+        items['x'] += items['vel_x'] * dt
+        items['y'] += items['vel_y'] * dt
+        items.kill_where(items['y'] > SCREEN_HEIGHT + 30)
+        return
+
+    drift = age <= ITEM_DRIFT
+    if drift.any():
+        drag = ITEM_DRAG ** dt
+        x[drift] += items['vel_x'][drift] * dt
+        y[drift] += items['vel_y'][drift] * dt
+        items['vel_x'][drift] *= drag
+        items['vel_y'][drift] *= drag
+
+    pulled = ~drift
+    if pulled.any():
+        dx = target_x - x[pulled]
+        dy = target_y - y[pulled]
+        distance = np.maximum(np.hypot(dx, dy), 1e-3)
+        speed = np.minimum(ITEM_PULL * (age[pulled] - ITEM_DRIFT), ITEM_MAX_SPEED)
+        # Never overshoot: an item that would pass the target lands on it
+        move = np.minimum(speed * dt, distance) / distance
+        x[pulled] += dx * move
+        y[pulled] += dy * move
+
+def collect_items(items, player_x, player_y):
+    """Remove the items the player touches and return how many there were"""
+    if not len(items):
+        return 0
+    dx = items['x'] - player_x
+    dy = items['y'] - player_y
+    collected = dx * dx + dy * dy < ITEM_COLLECT_RADIUS ** 2
+    count = int(np.count_nonzero(collected))
+    if count:
+        items.kill_where(collected)
+    return count
+
+def draw_items(items, queue):
+    if not len(items):
+        return
+    sprite = item_sprite()
+    offset = sprite.get_width() // 2
+    x = items['x'].astype(np.intp) - offset
+    y = items['y'].astype(np.intp) - offset
+    queue.submit_many(sprite, zip(x.tolist(), y.tolist()), layer=LAYER_POWERUPS)
+
+def item_sprite():
+    def build():
+        surf = pygame.Surface((10, 10), pygame.SRCALPHA)
+        pygame.draw.polygon(surf, YELLOW, [(5, 0), (10, 5), (5, 10), (0, 5)])
+        pygame.draw.polygon(surf, WHITE, [(5, 3), (7, 5), (5, 7), (3, 5)])
+        return surf
+    return atlas.cached(('score_item',), build)
+
+# ============== SIMULATION ==============
+
+@dataclass
+class Controls:
+    dx: float = 0
+    dy: float = 0
+    shooting: bool = False
+    focused: bool = False
+    bomb: bool = False
+
+# Snapshot layouts: which attributes of each object are world state, and how they're stored.
+# Particles and sounds are effects and aren't kept
+WORLD_STATE = StateLayout(
+    ('score', 'q'), ('graze_count', 'q'), ('wave', 'i'), ('wave_timer', 'd'), ('boss_spawned', '?'),
+    ('boss_warning_timer', 'd'), ('screen_shake', 'd'), ('bomb_flash', 'd'), ('stage_time', 'd'),
+    ('next_serial', 'q'))
+PLAYER_STATE = StateLayout(
+    ('x', 'd'), ('y', 'd'), ('focused', '?'), ('shoot_timer', 'd'), ('power', 'd'), ('lives', 'i'),
+    ('bombs', 'i'), ('invincible', 'd'), ('dead', '?'), ('respawn_timer', 'd'), ('trail_time', 'd'),
+    ('angle', 'd'))
+BOSS_STATE = StateLayout(
+    ('x', 'd'), ('y', 'd'), ('health', 'i'), ('phase', 'i'), ('time', 'd'), ('shoot_timer', 'd'),
+    ('hit_flash', 'd'), ('entering', '?'), ('pattern_timer', 'd'), ('current_pattern', 'i'), ('defeated', '?'),
+    ('orbiter_health', np.int32, BOSS_ORBITERS), ('orbiter_flash', np.float64, BOSS_ORBITERS),
+    ('part_x', np.float64, BOSS_CORE + 1), ('part_y', np.float64, BOSS_CORE + 1),
+    ('part_alive', np.bool_, BOSS_CORE + 1))
+# Game state, boss present, stage cursor, and the RNG's cached gaussian if it has one
+RUN_STATE = struct.Struct('<B?i?d')
+RNG_WORDS = 625
+TRAIL_LENGTH = struct.Struct('<B')
+PLAYER_SIZE = PLAYER_STATE.size + TRAIL_LENGTH.size + PLAYER_TRAIL * 16
+
+def snapshot_header(players):
+    return RUN_STATE.size + WORLD_STATE.size + BOSS_STATE.size + RNG_WORDS * 4 + players * PLAYER_SIZE
+
+def pack_player(player):
+    trail = np.zeros((PLAYER_TRAIL, 2))
+    if player.trail_positions:
+        trail[:len(player.trail_positions)] = player.trail_positions
+    return PLAYER_STATE.pack(player) + TRAIL_LENGTH.pack(len(player.trail_positions)) + trail.tobytes()
+
+def unpack_player(player, buffer, offset):
+    offset = PLAYER_STATE.unpack(player, buffer, offset)
+    count, = TRAIL_LENGTH.unpack_from(buffer, offset)
+    offset += TRAIL_LENGTH.size
+    trail = np.frombuffer(buffer, np.float64, PLAYER_TRAIL * 2, offset).reshape(PLAYER_TRAIL, 2)
+    player.trail_positions = [tuple(point) for point in trail[:count].tolist()]
+    return offset + PLAYER_TRAIL * 16
+
+class Simulation:
+    """All gameplay state for one run, advanced a frame at a time by step()"""
+    def __init__(self, seed=None, bullet_cancel=True, stage=None, players=1):
+        # Spawns, drops and boss chaos draw from their own generator so a seeded run
+        # plays out the same whatever the frame rate; particles use the global one
+        self.rng = random.Random(seed)
+        if not atlas.masks:
+            bake_sprites()  # Hit tests use the baked sprites' masks
+        if players == 1:
+            self.players = [Player()]
+        else:
+            self.players = [Player(SCREEN_WIDTH // 2 - CO_OP_SPACING),
+                            Player(SCREEN_WIDTH // 2 + CO_OP_SPACING, 'partner')]
+        self.player = self.players[0]
+        self.player_bullets = make_bullet_table('player_bullets')
+        self.enemy_bullets = make_bullet_table('enemy_bullets')
+        self.lasers = make_laser_table()
+        self.enemies = make_enemy_tables()
+        self.powerups = make_powerup_table()
+        self.items = make_item_table()
+        self.particles = ParticleSystem()
+        self.boss = None
+
+        self.state = GameState.PLAYING
+        self.score = 0
+        self.graze_count = 0
+        self.wave = 0
+        self.wave_timer = 0
+        self.boss_spawned = False
+        self.boss_warning_timer = 0
+        self.screen_shake = 0
+        self.bomb_flash = 0
+        self.sounds = []  # Names of sounds triggered since the caller last cleared this
+        # Turn a dead enemy's bullets, or the boss's on a phase change, into score items
+        self.bullet_cancel = bullet_cancel
+        # A scripted stage replaces the random waves
+        self.stage = stage
+        self.stage_cursor = StageCursor(stage) if stage else None
+        self.stage_time = 0
+        self.next_serial = 0
+
+    def tables(self):
+        return [self.player_bullets, self.enemy_bullets, self.lasers, *self.enemies.values(),
+                self.powerups, self.items]
+
+    def snapshot(self):
+        """The whole world as one compact byte buffer, for restore()"""
+        boss = self.boss
+        version, rng_words, gauss = self.rng.getstate()
+        header = b''.join([
+            RUN_STATE.pack(self.state.value, boss is not None, self.stage_cursor.position if self.stage else 0,
+                           gauss is not None, gauss or 0.0),
+            WORLD_STATE.pack(self),
+            BOSS_STATE.pack(boss) if boss else BOSS_STATE.blank(),
+            np.array(rng_words, np.uint32).tobytes(),
+            *[pack_player(player) for player in self.players],
+        ])
+        return pack_state(header, self.tables())
+
+    def restore(self, snapshot):
+        """Put the world back as it was when snapshot() made this buffer"""
+        header = unpack_state(snapshot, snapshot_header(len(self.players)), self.tables())
+        state, has_boss, position, has_gauss, gauss = RUN_STATE.unpack_from(header)
+        offset = WORLD_STATE.unpack(self, header, RUN_STATE.size)
+        if has_boss:
+            if self.boss is None:
+                self.boss = Boss(self.rng)
+            BOSS_STATE.unpack(self.boss, header, offset)
+        else:
+            self.boss = None
+        offset += BOSS_STATE.size
+        rng_words = np.frombuffer(header, np.uint32, RNG_WORDS, offset)
+        self.rng.setstate((3, tuple(rng_words.tolist()), gauss if has_gauss else None))
+        offset += RNG_WORDS * 4
+        for player in self.players:
+            offset = unpack_player(player, header, offset)
+        self.state = GameState(state)
+        if self.stage:
+            self.stage_cursor.position = position
+        self.particles.particles.clear()
+        self.sounds.clear()
+
+    def spawn_enemy(self, kind, x, y, age=0):
+        # Serials count from 1 per run, so a restored snapshot hands out the same ones again
+        self.next_serial += 1
+        spawn_enemy(self.enemies, kind, x, y, self.next_serial, self.rng, age)
+
+    def enemy_count(self):
+        return sum(len(table) for table in self.enemies.values())
+
+    def spawn_enemies(self, age=0):
+        self.wave += 1
+
+        if self.wave % 5 == 0:  # Boss wave
+            return True
+
+        # Normal waves
+        count = min(3 + self.wave // 2, 8)
+        for i in range(count):
+            x = self.rng.randint(100, SCREEN_WIDTH - 100)
+            y = self.rng.randint(-200, -50)
+            kind = self.rng.choices(ENEMY_KINDS, weights=ENEMY_WEIGHTS)[0]
+            self.spawn_enemy(kind, x, y, age)
+
+        return False
 
-    def is_off_screen(self):
-        return self.y > SCREEN_HEIGHT + 30
+    def advance_stage(self, dt):
+        # Only the spawns that fell due this step are touched; each starts as far
+        # along as it would have been had it spawned on its exact frame
+        self.stage_time += dt
+        for spawn in self.stage_cursor.due(self.stage_time, STEP_EPSILON):
+            age = max(0, self.stage_time - spawn.frame)
+            if spawn.kind == BOSS:
+                self.state = GameState.BOSS_WARNING
+                self.boss_warning_timer = 180
+                continue
+            x = spawn.x * SCREEN_WIDTH + spawn.offset
+            self.spawn_enemy(ENEMY_KIND_BY_NAME[spawn.kind], x, spawn.y, age)
+
+        # A stage without a boss is won once it has run out and the screen is clear
+        stage = self.stage
+        if stage.boss_frame is None and self.stage_cursor.finished() and self.enemy_count() == 0:
+            self.state = GameState.VICTORY
+
+    def target(self):
+        # The ship enemies aim at: the first one still flying, or player one
+        for player in self.players:
+            if not player.dead:
+                return player
+        return self.player
+
+    def step(self, controls, dt=1.0, partner=None):
+        # dt is the step length in 60 fps frames: always 1 at a fixed 60 fps,
+        # the measured frame time in delta-time mode. partner steers the second ship in co-op
+        if self.state == GameState.BOSS_WARNING:
+            self.boss_warning_timer -= dt
+            if self.boss_warning_timer <= 0:
+                self.boss = Boss(self.rng)
+                self.boss_spawned = True
+                self.state = GameState.PLAYING
+            return
+
+        particles = self.particles
+
+        # Update players
+        for player, pad in zip(self.players, (controls, partner or Controls())):
+            player.update(pad.dx, pad.dy, pad.focused, particles, dt)
+
+            if pad.shooting and player.shoot(self.player_bullets):
+                self.sounds.append('shoot')
+
+            if pad.bomb and player.bomb(self.enemy_bullets, particles):
+                self.lasers.clear()
+                self.bomb_flash = 30
+                self.screen_shake = 20
+                self.sounds.append('bomb')
+
+        # Bullets
+        target = self.target()
+        move_bullets(self.player_bullets, dt)
+        cull_bullets(self.player_bullets)
+        move_bullets(self.enemy_bullets, dt)
+        steer_bullets(self.enemy_bullets, target.x, target.y)
+        self.graze()
+
+        # Enemies, boss and powerups
+        update_lasers(self.lasers, dt)
+        update_enemies(self.enemies, self.enemy_bullets, self.lasers, dt)
+        boss = self.boss
+        if boss and not boss.defeated:
+            phase = boss.phase
+            boss.update(dt)
+            if boss.phase != phase:
+                self.cancel([BOSS_OWNER])
+            boss.shoot(self.enemy_bullets, self.lasers, target.x, target.y)
+            anchor_lasers(self.lasers, BOSS_OWNER, boss.x, boss.y)
+        move_powerups(self.powerups, dt)
+        if target.dead:
+            move_items(self.items, None, None, dt)
+        else:
+            move_items(self.items, target.x, target.y, dt)
+
+        # Culled after shooting, so shots fired from off screen go at any frame rate
+        cull_bullets(self.enemy_bullets)
+
+        # Collisions
+        self.collide_player_bullets()
+        self.collide_enemy_bullets()
+        self.collect_powerups()
+        self.collect_items()
+
+        # Wave spawning
+        if self.stage:
+            if not self.boss_spawned:
+                self.advance_stage(dt)
+        elif not self.boss_spawned:
+            self.wave_timer += dt
+            if self.enemy_count() == 0 and due(self.wave_timer, 121):  # After 120 frames
+                age = overdue(self.wave_timer, 121)
+                self.wave_timer = 0
+                if self.spawn_enemies(age):
+                    self.state = GameState.BOSS_WARNING
+                    self.boss_warning_timer = 180
+
+        particles.update(dt)
+
+        # Screen shake and bomb flash decay
+        if self.screen_shake > 0:
+            self.screen_shake = max(0, self.screen_shake - dt)
+        if self.bomb_flash > 0:
+            self.bomb_flash = max(0, self.bomb_flash - dt)
+
+    def graze(self):
+        for player in self.players:
+            if not player.dead:
+                self.graze_player(player)
+
+    def graze_player(self, player):
+        bullets = self.enemy_bullets
+        if len(bullets):
+            dx = bullets['x'] - player.x
+            dy = bullets['y'] - player.y
+            grazing = ~bullets['grazed'] & (dx * dx + dy * dy < player.graze_radius ** 2)
+            rows = np.flatnonzero(grazing)
+            bullets['grazed'][rows] = True
+            self.graze_count += rows.size
+            self.score += GRAZE_POINTS * rows.size
+            for x, y in zip(bullets['x'][rows].tolist(), bullets['y'][rows].tolist()):
+                self.particles.spark(x, y, WHITE, count=3)
+
+        # Each beam grazes once
+        lasers = self.lasers
+        if len(lasers):
+            rows = np.flatnonzero(~lasers['grazed'] & (self.beam_gaps(player) < player.graze_radius))
+            lasers['grazed'][rows] = True
+            self.graze_count += rows.size
+            self.score += GRAZE_POINTS * rows.size
+            for _ in range(rows.size):
+                self.particles.spark(player.x, player.y, WHITE, count=6)
+
+    def beam_gaps(self, player):
+        # Distance from the player's center to the edge of every beam; inf while telegraphing
+        lasers = self.lasers
+        angle, end_x, end_y, half_width = laser_beams(lasers)
+        distance = segment_distances(lasers['x'], lasers['y'], end_x, end_y, player.x, player.y)
+        return np.where(half_width > 0, distance - half_width, np.inf)
+
+    def collide_player_bullets(self):
+        bullets = self.player_bullets
+        if not len(bullets):
+            return
+        particles = self.particles
+        spent = np.zeros(len(bullets), np.bool_)
+
+        # Player bullets vs enemies
+        for kind in ENEMY_KINDS:
+            table = self.enemies[kind.name]
+            if not len(table):
+                continue
+            hits, targets = self.find_enemy_hits(bullets, ~spent, kind, table)
+            if not hits.size:
+                continue
+            spent[hits] = True
+            np.subtract.at(table['health'], targets, bullets['damage'][hits])
+            table['hit_flash'][targets] = 5
+
+            ex, ey, health = table['x'], table['y'], table['health']
+            for row in targets.tolist():
+                particles.spark(float(ex[row]), float(ey[row]), kind.color)
+                if health[row] > 0:
+                    self.sounds.append('hit')
+
+            dead = health <= 0
+            self.cancel(table['serial'][dead])
+            for x, y in zip(ex[dead].tolist(), ey[dead].tolist()):
+                self.score += kind.points
+                particles.explosion(x, y, kind.color, 25, 6, 5, 30)
+                self.sounds.append('explosion')
+                # Drop powerup
+                if self.rng.random() < 0.3:
+                    ptype = self.rng.choices(range(len(POWERUP_TYPES)), weights=[40, 15, 5, 40])[0]
+                    self.powerups.spawn(x=x, y=y, type=ptype)
+            table.kill_where(dead)
+
+        # Player bullets vs every boss part at once
+        boss = self.boss
+        if boss and not boss.defeated:
+            hits, parts = self.find_boss_hits(bullets, ~spent, boss)
+            if hits.size:
+                spent[hits] = True
+                destroyed = boss.hit(parts, bullets['damage'][hits], particles)
+                if destroyed.size:
+                    self.score += BOSS_ORBITER_POINTS * destroyed.size
+                    self.screen_shake = max(self.screen_shake, 12)
+                    self.sounds.append('explosion')
+                if boss.defeated:
+                    self.cancel([BOSS_OWNER])
+                    particles.explosion(boss.x, boss.y, PURPLE, 50, 10, 8, 50)
+                    particles.explosion(boss.x, boss.y, WHITE, 40, 8, 6, 40)
+                    self.screen_shake = 40
+                    self.score += 10000
+                    self.sounds.append('explosion')
+                    self.state = GameState.VICTORY
+                else:
+                    self.sounds.extend(['hit'] * hits.size)
+
+        bullets.kill_where(spent)
+
+    def find_enemy_hits(self, bullets, live, kind, table):
+        return mask_hits(bullets, live, table['x'], table['y'], kind.name, enemy_angles(kind.name, table))
+
+    def find_boss_hits(self, bullets, live, boss):
+        return part_hits(bullets, live, boss.part_x, boss.part_y, BOSS_PART_RADIUS, boss.part_alive)
+
+    def collide_enemy_bullets(self):
+        for player in self.players:
+            if not player.dead and player.invincible <= 0:
+                self.collide_player(player)
+
+    def collide_player(self, player):
+        bullets = self.enemy_bullets
+        hit = False
+        if len(bullets):
+            dx = bullets['x'] - player.x
+            dy = bullets['y'] - player.y
+            reach = bullets['radius'].astype(np.float32) + player.hitbox_radius
+            rows = np.flatnonzero(dx * dx + dy * dy < reach * reach)
+            if rows.size:
+                bullets.kill(rows[0])
+                hit = True
+        # Beams stay put; the invincibility after a hit carries the player out of them
+        if not hit and len(self.lasers):
+            hit = bool((self.beam_gaps(player) < player.hitbox_radius).any())
+        if hit:
+            out = player.hit(self.particles)
+            self.screen_shake = 25
+            self.sounds.append('explosion')
+            if out and all(other.lives <= 0 for other in self.players):
+                self.state = GameState.GAME_OVER
+
+    def cancel(self, owners):
+        # Beams always go with their owner; bullets only when cancelling is on
+        cancel_lasers(self.lasers, owners)
+        if self.bullet_cancel:
+            cancel_bullets(self.enemy_bullets, owners, self.items)
+
+    def collect_items(self):
+        for player in self.players:
+            if player.dead:
+                continue
+            count = collect_items(self.items, player.x, player.y)
+            if count:
+                self.score += ITEM_POINTS * count
+                self.sounds.append('item')
+
+    def collect_powerups(self):
+        for player in self.players:
+            self.collect_player_powerups(player)
+
+    def collect_player_powerups(self, player):
+        powerups = self.powerups
+        if not len(powerups):
+            return
+        dx = powerups['x'] - player.x
+        dy = powerups['y'] - player.y
+        collected = dx * dx + dy * dy < 900
+        for kind in powerups['type'][collected].tolist():
+            self.sounds.append('powerup')
+            ptype = POWERUP_TYPES[kind]
+            if ptype == 'power':
+                player.power = min(4.0, player.power + 0.25)
+                self.score += 100
+            elif ptype == 'bomb':
+                player.bombs = min(5, player.bombs + 1)
+                self.score += 200
+            elif ptype == 'life':
+                player.lives = min(5, player.lives + 1)
+                self.score += 500
+            elif ptype == 'points':
+                self.score += 1000
+        powerups.kill_where(collected)
+
+    def draw(self, queue, bullet_queue):
+        draw_powerups(self.powerups, queue)
+        draw_items(self.items, queue)
+        draw_lasers(self.lasers, bullet_queue)
+        draw_bullets(self.enemy_bullets, bullet_queue, LAYER_ENEMY_BULLETS)
+        draw_bullets(self.player_bullets, bullet_queue, LAYER_PLAYER_BULLETS)
+        draw_enemies(self.enemies, queue)
+        if self.boss and not self.boss.defeated:
+            self.boss.draw(queue)
+        for player in self.players:
+            player.draw(queue)
 
 # ============== STARS BACKGROUND ==============
 
@@ -721,15 +1896,94 @@ class Star:
         self.size = 1 if self.speed < 2 else (2 if self.speed < 3 else 3)
         self.brightness = min(255, int(100 + self.speed * 35))
 
-    def update(self):
-        self.y += self.speed
+    def update(self, dt=1.0):
+        self.y += self.speed * dt
         if self.y > SCREEN_HEIGHT:
             self.y = 0
             self.x = random.randint(0, SCREEN_WIDTH)
 
-    def draw(self, surface):
-        color = (self.brightness, self.brightness, self.brightness)
-        pygame.draw.circle(surface, color, (int(self.x), int(self.y)), self.size)
+    def draw(self, queue):
+        queue.submit_centered(star_sprite(self.size, self.brightness), self.x, self.y, layer=LAYER_STARS)
+
+def star_sprite(size, brightness):
+    def build():
+        surf = pygame.Surface((size * 2 + 2, size * 2 + 2), pygame.SRCALPHA)
+        color = (brightness, brightness, brightness)
+        pygame.draw.circle(surf, color, (size + 1, size + 1), size)
+        return surf
+    return atlas.cached(('star', size, brightness), build)
+
+# ============== POST-PROCESSING ==============
+
+class Compositor:
+    """Offscreen world and bullet layers, composited onto the display with shake, flash and bloom"""
+    def __init__(self, size):
+        width, height = size
+        self.size = size
+        self.world = pygame.Surface(size).convert()
+        self.bullets = pygame.Surface(size).convert()  # Black is empty; added on top of the world
+        self.tint_surf = pygame.Surface(size).convert()
+        self.tint_color = None
+        self.bloom = True
+
+        # Bloom buffers, reused every frame
+        self.small_size = (width // BLOOM_SCALE, height // BLOOM_SCALE)
+        self.half_size = (width // 2, height // 2)
+        self.bloom_small = pygame.Surface(self.small_size).convert()
+        self.bloom_half = pygame.Surface(self.half_size).convert()
+        self.bloom_full = pygame.Surface(size).convert()
+        sw, sh = self.small_size
+        r = BLOOM_RADIUS
+        # uint16 sums of 25 bytes can't overflow and are much cheaper than floats
+        self.blur_padded = np.zeros((sw + 2 * r, sh + 2 * r, 3), np.uint16)
+        self.blur_rows = np.zeros((sw, sh + 2 * r, 3), np.uint16)
+        self.blur_out = np.zeros((sw, sh, 3), np.uint16)
+
+    def begin(self):
+        self.world.fill(BLACK)
+        self.bullets.fill(BLACK)
+
+    def composite(self, display, offset=(0, 0), flash=0.0):
+        display.fill(BLACK)
+        display.blit(self.world, offset)
+        display.blit(self.bullets, offset, special_flags=pygame.BLEND_ADD)
+        if self.bloom:
+            self.apply_bloom(display, offset)
+        if flash > 0:
+            self.tint(display, WHITE, int(200 * flash))
+
+    def tint(self, display, color, alpha):
+        """Blend a flat color over the whole display (bomb flash, pause dimming)"""
+        if color != self.tint_color:
+            self.tint_surf.fill(color)
+            self.tint_color = color
+        self.tint_surf.set_alpha(alpha)
+        display.blit(self.tint_surf, (0, 0))
+
+    def apply_bloom(self, display, offset):
+        # Nearest-neighbour downsample is enough here: bullet glows are wider than BLOOM_SCALE
+        pygame.transform.scale(self.bullets, self.small_size, self.bloom_small)
+
+        # Separable box blur at quarter resolution
+        pixels = pygame.surfarray.pixels3d(self.bloom_small)
+        sw, sh = self.small_size
+        r = BLOOM_RADIUS
+        padded, rows, out = self.blur_padded, self.blur_rows, self.blur_out
+        padded[r:r + sw, r:r + sh] = pixels
+        np.copyto(rows, padded[0:sw])
+        for d in range(1, 2 * r + 1):
+            rows += padded[d:d + sw]
+        np.copyto(out, rows[:, 0:sh])
+        for d in range(1, 2 * r + 1):
+            out += rows[:, d:d + sh]
+        out >>= BLOOM_SHIFT
+        pixels[...] = out
+        del pixels  # Unlock the surface
+
+        # Filtered upscale to half size, then a cheap doubling to full size
+        pygame.transform.smoothscale(self.bloom_small, self.half_size, self.bloom_half)
+        pygame.transform.scale(self.bloom_half, self.size, self.bloom_full)
+        display.blit(self.bloom_full, offset, special_flags=pygame.BLEND_ADD)
 
 # ============== SOUND EFFECTS ==============
 
@@ -752,30 +2006,91 @@ def create_sound(freq_start, freq_end, duration, volume=0.2):
 
 # ============== MAIN GAME ==============
 
+def run_turbo(sim, controls, dt, ticks, recording=None):
+    """Step several ticks for one rendered frame; only the last makes particles and sounds.
+    ticks of 0 runs as many as fit in TURBO_SLICE, all of them silent. Returns (ticks run, seconds)"""
+    start = perf_counter()
+    run = 0
+    while sim.state in [GameState.PLAYING, GameState.BOSS_WARNING]:
+        last = ticks and run == ticks - 1
+        sim.particles.muted = not last
+        sim.step(controls, dt)
+        if not last:
+            sim.sounds.clear()
+        if recording is not None:
+            recording.append([controls.dx, controls.dy, bool(controls.shooting),
+                              bool(controls.focused), bool(controls.bomb), dt])
+        controls = Controls(controls.dx, controls.dy, controls.shooting, controls.focused)  # One bomb per press
+        run += 1
+        if run == ticks or (not ticks and perf_counter() - start >= TURBO_SLICE):
+            break
+    sim.particles.muted = False
+    return run, perf_counter() - start
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="NOVA STORM - A Bullet Hell Shooter")
+    parser.add_argument('--delta-time', action='store_true',
+                        help="scale movement and timers by real frame time instead of assuming 60 fps")
+    parser.add_argument('--fps', type=int, default=144,
+                        help="frame rate cap in --delta-time mode (default: 144)")
+    parser.add_argument('--record', metavar='FILE',
+                        help="save the seed and inputs of the last run, for replaying in benchmarks.py")
+    parser.add_argument('--no-bullet-cancel', dest='bullet_cancel', action='store_false',
+                        help="leave bullets on screen when their enemy dies or the boss changes phase")
+    parser.add_argument('--stage', metavar='FILE',
+                        help="play a scripted stage (see stages/) instead of random waves")
+    parser.add_argument('--heatmap', metavar='DIR',
+                        help="record enemy bullet heatmaps and a danger series, written to DIR on exit")
+    parser.add_argument('--netplay', metavar='HOST:PORT',
+                        help="two-player co-op with the game at HOST:PORT (or a relay, see netplay.py); "
+                             "both ends need the same --stage and bullet cancel setting")
+    parser.add_argument('--player', type=int, choices=[1, 2], default=1,
+                        help="which ship this end flies in --netplay; player 1 picks the seed")
+    parser.add_argument('--port', type=int,
+                        help="local UDP port for --netplay (default: 7100 + player)")
+    args = parser.parse_args()
+    if args.netplay:
+        args.delta_time = False  # Rollback needs both ends stepping the same fixed frames
+    return args
+
+def save_recording(path, seed, frames, bullet_cancel=True, stage=None):
+    with open(path, 'w') as f:
+        json.dump({'seed': seed, 'bullet_cancel': bullet_cancel, 'stage': stage, 'frames': frames}, f)
+
 def main():
+    args = parse_args()
     clock = pygame.time.Clock()
+    frame_rate = args.fps if args.delta_time else FRAME_RATE
+    dt = 1.0
+    bake_sprites()
+
+    # Stage, parsed once and replayed from its start on every run
+    stage = None
+    if args.stage:
+        try:
+            stage = load_stage(args.stage, list(ENEMY_KIND_BY_NAME))
+        except StageError as e:
+            sys.exit(f"error: {e}")
 
     # Game objects
-    player = Player()
-    player_bullets = []
-    enemy_bullets = []
-    enemies = []
-    powerups = []
-    particles = ParticleSystem()
+    sim = Simulation(bullet_cancel=args.bullet_cancel, stage=stage)
+    seed = None
+    recording = []  # [dx, dy, shooting, focused, bomb, dt] per step of the current run
+    rewind = RewindBuffer(REWIND_SECONDS * frame_rate, REWIND_MEMORY)  # A snapshot from before each step
+    quick_save = None  # (snapshot, recording length) from F5
+    session = None  # RollbackSession while playing --netplay
+    heatmap = HeatmapRecorder(SCREEN_WIDTH, SCREEN_HEIGHT) if args.heatmap else None
+    played_frames = 0
+    turbo = 0  # Index into TURBO_SPEEDS
+    turbo_ticks, turbo_time, ticks_per_second = 0, 0.0, 0.0
     stars = [Star() for _ in range(100)]
-    boss = None
+    render_queue = RenderQueue()
+    bullet_queue = RenderQueue()
+    compositor = Compositor((SCREEN_WIDTH, SCREEN_HEIGHT))
+    show_stats = False
 
     # Game state
     state = GameState.MENU
-    score = 0
-    graze_count = 0
-    wave = 0
-    wave_timer = 0
-    spawn_timer = 0
-    boss_spawned = False
-    screen_shake = 0
-    bomb_flash = 0
-    boss_warning_timer = 0
 
     # Controller
     joystick = None
@@ -784,11 +2099,14 @@ def main():
         joystick.init()
 
     # Sounds
-    shoot_sound = create_sound(800, 1000, 0.05, 0.1)
-    hit_sound = create_sound(300, 100, 0.1, 0.15)
-    explosion_sound = create_sound(150, 50, 0.2, 0.2)
-    powerup_sound = create_sound(400, 800, 0.15, 0.15)
-    bomb_sound = create_sound(100, 400, 0.3, 0.25)
+    sounds = {
+        'shoot': create_sound(800, 1000, 0.05, 0.1),
+        'hit': create_sound(300, 100, 0.1, 0.15),
+        'explosion': create_sound(150, 50, 0.2, 0.2),
+        'powerup': create_sound(400, 800, 0.15, 0.15),
+        'bomb': create_sound(100, 400, 0.3, 0.25),
+        'item': create_sound(1200, 1600, 0.03, 0.05),
+    }
 
     # Fonts
     try:
@@ -803,48 +2121,9 @@ def main():
     pygame.mouse.set_visible(False)
     running = True
 
-    def spawn_enemies():
-        nonlocal wave
-        wave += 1
-
-        if wave % 5 == 0:  # Boss wave
-            return True
-
-        # Normal waves
-        enemy_types = [BasicEnemy, SpiralEnemy, BurstEnemy]
-        count = min(3 + wave // 2, 8)
-
-        for i in range(count):
-            x = random.randint(100, SCREEN_WIDTH - 100)
-            y = random.randint(-200, -50)
-            enemy_type = random.choices(enemy_types, weights=[50, 30, 20])[0]
-            enemies.append(enemy_type(x, y))
-
-        return False
-
-    def reset_game():
-        nonlocal player, player_bullets, enemy_bullets, enemies, powerups, boss
-        nonlocal score, graze_count, wave, wave_timer, spawn_timer, boss_spawned
-
-        player = Player()
-        player_bullets = []
-        enemy_bullets = []
-        enemies = []
-        powerups = []
-        boss = None
-        score = 0
-        graze_count = 0
-        wave = 0
-        wave_timer = 0
-        spawn_timer = 0
-        boss_spawned = False
-
     while running:
         # Input
-        dx, dy = 0, 0
-        shooting = False
-        focused = False
-        bomb_pressed = False
+        controls = Controls()
 
         for event in pygame.event.get():
             if event.type == pygame.QUIT:
@@ -858,223 +2137,149 @@ def main():
                     elif state in [GameState.MENU, GameState.GAME_OVER, GameState.VICTORY]:
                         running = False
                 elif event.key == pygame.K_RETURN or event.key == pygame.K_z:
-                    if state == GameState.MENU:
-                        reset_game()
+                    if state == GameState.MENU and args.netplay:
+                        seed = random.randrange(2 ** 32)
+                        session = RollbackSession(
+                            args.player - 1, parse_address(args.netplay),
+                            lambda seed: Simulation(seed, args.bullet_cancel, stage, players=2), Controls,
+                            args.port or 7100 + args.player, seed)
+                        sim = Simulation(players=2)  # Stands in until the peer answers
+                        state = GameState.PLAYING
+                    elif state == GameState.MENU:
+                        seed = random.randrange(2 ** 32)
+                        sim = Simulation(seed, args.bullet_cancel, stage)
+                        recording = []
+                        rewind.clear()
+                        quick_save = None
                         state = GameState.PLAYING
                     elif state in [GameState.GAME_OVER, GameState.VICTORY]:
                         state = GameState.MENU
+                        if session:
+                            session.close()
+                            session = None
                 elif event.key == pygame.K_x and state == GameState.PLAYING:
-                    bomb_pressed = True
+                    controls.bomb = True
+                elif event.key == pygame.K_F5 and state == GameState.PLAYING and not session:
+                    quick_save = (sim.snapshot(), len(recording))
+                elif (event.key == pygame.K_F9 and quick_save and not session and
+                      state in [GameState.PLAYING, GameState.GAME_OVER]):
+                    # Loading jumps out of the rewind history, so it starts again from here
+                    sim.restore(quick_save[0])
+                    del recording[quick_save[1]:]
+                    rewind.clear()
+                    state = sim.state
+                elif event.key == pygame.K_F6 and not session:
+                    # Turbo skips ahead without keeping rewind history
+                    turbo = (turbo + 1) % len(TURBO_SPEEDS)
+                    turbo_ticks, turbo_time, ticks_per_second = 0, 0.0, 0.0
+                    rewind.clear()
+                elif event.key == pygame.K_F3:
+                    show_stats = not show_stats
+                elif event.key == pygame.K_F4:
+                    compositor.bloom = not compositor.bloom
+
+        keys = pygame.key.get_pressed()
+        rewinding = state in [GameState.PLAYING, GameState.BOSS_WARNING] and not session and (
+            keys[pygame.K_r] or (joystick and joystick.get_button(2)))
 
         if state == GameState.PLAYING:
-            keys = pygame.key.get_pressed()
             if keys[pygame.K_LEFT] or keys[pygame.K_a]:
-                dx -= 1
+                controls.dx -= 1
             if keys[pygame.K_RIGHT] or keys[pygame.K_d]:
-                dx += 1
+                controls.dx += 1
             if keys[pygame.K_UP] or keys[pygame.K_w]:
-                dy -= 1
+                controls.dy -= 1
             if keys[pygame.K_DOWN] or keys[pygame.K_s]:
-                dy += 1
-            shooting = keys[pygame.K_z] or keys[pygame.K_SPACE]
-            focused = keys[pygame.K_LSHIFT] or keys[pygame.K_RSHIFT]
+                controls.dy += 1
+            controls.shooting = keys[pygame.K_z] or keys[pygame.K_SPACE]
+            controls.focused = keys[pygame.K_LSHIFT] or keys[pygame.K_RSHIFT]
 
             # Controller
             if joystick:
                 axis_x = joystick.get_axis(0)
                 axis_y = joystick.get_axis(1)
                 if abs(axis_x) > 0.2:
-                    dx += axis_x
+                    controls.dx += axis_x
                 if abs(axis_y) > 0.2:
-                    dy += axis_y
+                    controls.dy += axis_y
 
-                shooting = shooting or joystick.get_button(0)
-                focused = focused or joystick.get_button(4) or joystick.get_button(5)
-                bomb_pressed = bomb_pressed or joystick.get_button(1)
+                controls.shooting = controls.shooting or joystick.get_button(0)
+                controls.focused = controls.focused or joystick.get_button(4) or joystick.get_button(5)
+                controls.bomb = controls.bomb or joystick.get_button(1)
 
         # Update based on state
         if state == GameState.MENU:
             for star in stars:
-                star.update()
+                star.update(dt)
 
-        elif state == GameState.BOSS_WARNING:
-            boss_warning_timer -= 1
-            for star in stars:
-                star.update()
-            if boss_warning_timer <= 0:
-                boss = Boss()
-                boss_spawned = True
-                state = GameState.PLAYING
-
-        elif state == GameState.PLAYING:
-            # Update player
-            player.update(dx, dy, focused, particles)
-
-            if shooting and not player.dead:
-                new_bullets = player.shoot()
-                if new_bullets and shoot_sound:
-                    shoot_sound.play()
-                player_bullets.extend(new_bullets)
-
-            if bomb_pressed:
-                if player.bomb(enemy_bullets, particles):
-                    bomb_flash = 30
-                    screen_shake = 20
-                    if bomb_sound:
-                        bomb_sound.play()
-
-            # Update stars
+        elif state in [GameState.PLAYING, GameState.BOSS_WARNING]:
             for star in stars:
-                star.update()
-
-            # Update player bullets
-            for bullet in player_bullets[:]:
-                bullet.update()
-                if bullet.is_off_screen():
-                    player_bullets.remove(bullet)
-
-            # Update enemy bullets + graze
-            for bullet in enemy_bullets[:]:
-                bullet.update()
-
-                # Graze detection
-                if not bullet.grazed and not player.dead:
-                    dist = math.sqrt((bullet.x - player.x)**2 + (bullet.y - player.y)**2)
-                    if dist < player.graze_radius:
-                        bullet.grazed = True
-                        graze_count += 1
-                        score += GRAZE_POINTS
-                        particles.spark(bullet.x, bullet.y, WHITE, count=3)
-
-                if bullet.is_off_screen():
-                    enemy_bullets.remove(bullet)
-
-            # Update enemies
-            for enemy in enemies[:]:
-                enemy.update()
-                new_bullets = enemy.shoot()
-                enemy_bullets.extend(new_bullets)
-
-                if enemy.is_off_screen():
-                    enemies.remove(enemy)
-
-            # Update boss
-            if boss and not boss.defeated:
-                boss.update()
-                new_bullets = boss.shoot(player.x, player.y)
-                enemy_bullets.extend(new_bullets)
-
-            # Update powerups
-            for powerup in powerups[:]:
-                powerup.update()
-                if powerup.is_off_screen():
-                    powerups.remove(powerup)
-
-            # Collision: player bullets vs enemies
-            for bullet in player_bullets[:]:
-                for enemy in enemies[:]:
-                    dist = math.sqrt((bullet.x - enemy.x)**2 + (bullet.y - enemy.y)**2)
-                    if dist < 25:
-                        if bullet in player_bullets:
-                            player_bullets.remove(bullet)
-                        if enemy.hit(bullet.damage, particles):
-                            enemies.remove(enemy)
-                            score += enemy.points
-                            particles.explosion(enemy.x, enemy.y, enemy.color, 25, 6, 5, 30)
-                            if explosion_sound:
-                                explosion_sound.play()
-                            # Drop powerup
-                            if random.random() < 0.3:
-                                ptype = random.choices(['power', 'points', 'bomb', 'life'], weights=[40, 40, 15, 5])[0]
-                                powerups.append(PowerUp(enemy.x, enemy.y, ptype))
-                        else:
-                            if hit_sound:
-                                hit_sound.play()
-                        break
-
-            # Collision: player bullets vs boss
-            if boss and not boss.defeated:
-                for bullet in player_bullets[:]:
-                    dist = math.sqrt((bullet.x - boss.x)**2 + (bullet.y - boss.y)**2)
-                    if dist < 60:
-                        if bullet in player_bullets:
-                            player_bullets.remove(bullet)
-                        if boss.hit(bullet.damage, particles):
-                            particles.explosion(boss.x, boss.y, PURPLE, 50, 10, 8, 50)
-                            particles.explosion(boss.x, boss.y, WHITE, 40, 8, 6, 40)
-                            screen_shake = 40
-                            score += 10000
-                            if explosion_sound:
-                                explosion_sound.play()
-                            state = GameState.VICTORY
-                        else:
-                            if hit_sound:
-                                hit_sound.play()
-
-            # Collision: enemy bullets vs player
-            if not player.dead and player.invincible <= 0:
-                for bullet in enemy_bullets[:]:
-                    dist = math.sqrt((bullet.x - player.x)**2 + (bullet.y - player.y)**2)
-                    if dist < player.hitbox_radius + bullet.radius:
-                        enemy_bullets.remove(bullet)
-                        game_over = player.hit(particles)
-                        screen_shake = 25
-                        if explosion_sound:
-                            explosion_sound.play()
-                        if game_over:
-                            state = GameState.GAME_OVER
-                        break
-
-            # Collision: powerups vs player
-            for powerup in powerups[:]:
-                dist = math.sqrt((powerup.x - player.x)**2 + (powerup.y - player.y)**2)
-                if dist < 30:
-                    powerups.remove(powerup)
-                    if powerup_sound:
-                        powerup_sound.play()
-                    if powerup.type == 'power':
-                        player.power = min(4.0, player.power + 0.25)
-                        score += 100
-                    elif powerup.type == 'bomb':
-                        player.bombs = min(5, player.bombs + 1)
-                        score += 200
-                    elif powerup.type == 'life':
-                        player.lives = min(5, player.lives + 1)
-                        score += 500
-                    elif powerup.type == 'points':
-                        score += 1000
-
-            # Wave spawning
-            if not boss_spawned:
-                wave_timer += 1
-                if len(enemies) == 0 and wave_timer > 120:
-                    wave_timer = 0
-                    is_boss_wave = spawn_enemies()
-                    if is_boss_wave:
-                        state = GameState.BOSS_WARNING
-                        boss_warning_timer = 180
-
-            # Update particles
-            particles.update()
-
-            # Screen shake decay
-            if screen_shake > 0:
-                screen_shake -= 1
-
-            # Bomb flash decay
-            if bomb_flash > 0:
-                bomb_flash -= 1
+                star.update(dt)
+
+            if session:
+                # Rolls back and re-simulates first whenever the peer's inputs prove a guess wrong
+                session.advance(controls)
+                sim = session.sim or sim
+            elif rewinding:
+                # One step back per frame; the inputs of undone steps leave the recording too
+                if len(rewind):
+                    sim.restore(rewind.pop())
+                    if recording:
+                        recording.pop()
+            elif TURBO_SPEEDS[turbo] != 1:
+                ticks, seconds = run_turbo(sim, controls, dt, TURBO_SPEEDS[turbo],
+                                           recording if args.record else None)
+                # Ticks per second of simulation time alone, averaged over about half a second
+                turbo_ticks += ticks
+                turbo_time += seconds
+                if turbo_time >= 0.5:
+                    ticks_per_second = turbo_ticks / turbo_time
+                    turbo_ticks, turbo_time = 0, 0.0
+            else:
+                rewind.push(sim.snapshot())
+                sim.step(controls, dt)
+                if args.record:
+                    recording.append([controls.dx, controls.dy, bool(controls.shooting),
+                                      bool(controls.focused), bool(controls.bomb), dt])
+            if heatmap and not rewinding and (not session or session.sim):
+                heatmap.record(sim, played_frames)  # Binned on the recorder's own thread
+                played_frames += 1
+            state = sim.state
+
+            for name in sim.sounds:
+                if sounds[name]:
+                    sounds[name].play()
+            sim.sounds.clear()
 
         # Draw
         # Apply screen shake
+        screen_shake = int(sim.screen_shake)
         shake_x = random.randint(-screen_shake, screen_shake) if screen_shake > 0 else 0
         shake_y = random.randint(-screen_shake, screen_shake) if screen_shake > 0 else 0
 
-        screen.fill(BLACK)
+        # World and bullet layers
+        compositor.begin()
+        waiting = session is not None and session.sim is None
+        in_game = state in [GameState.PLAYING, GameState.PAUSED] and not waiting
 
         # Stars
         for star in stars:
-            star.draw(screen)
+            star.draw(render_queue)
+
+        # Powerups, bullets, enemies, boss and player
+        if in_game:
+            sim.draw(render_queue, bullet_queue)
+
+        render_queue.flush(compositor.world)
+        bullet_queue.flush(compositor.bullets)
+
+        # Particles
+        if in_game:
+            sim.particles.draw(compositor.world)
+
+        # Composite with screen shake, bloom and bomb flash
+        flash = sim.bomb_flash / 30 if in_game else 0
+        compositor.composite(screen, (shake_x, shake_y), flash)
 
         if state == GameState.MENU:
             # Title
@@ -1086,7 +2291,8 @@ def main():
             sub_rect = subtitle.get_rect(center=(SCREEN_WIDTH//2, SCREEN_HEIGHT//3 + 70))
             screen.blit(subtitle, sub_rect)
 
-            start_text = font.render("Press ENTER or Z to Start", True, YELLOW)
+            start = f"Press ENTER to Play Co-op as Player {args.player}" if args.netplay else "Press ENTER or Z to Start"
+            start_text = font.render(start, True, YELLOW)
             start_rect = start_text.get_rect(center=(SCREEN_WIDTH//2, SCREEN_HEIGHT//2 + 50))
             screen.blit(start_text, start_rect)
 
@@ -1095,6 +2301,9 @@ def main():
                 "Z / A Button - Shoot",
                 "X / B Button - Bomb",
                 "Shift / LB/RB - Focus (slow + show hitbox)",
+                "R / X Button - Hold to rewind",
+                "F5 / F9 - Quick save / load",
+                "F6 - Turbo 2x / 4x / 8x / uncapped",
                 "ESC - Pause / Exit"
             ]
             for i, line in enumerate(controls):
@@ -1102,9 +2311,14 @@ def main():
                 rect = text.get_rect(center=(SCREEN_WIDTH//2, SCREEN_HEIGHT//2 + 150 + i * 30))
                 screen.blit(text, rect)
 
+        elif waiting:
+            other = 2 if args.player == 1 else 1
+            wait_text = font.render(f"WAITING FOR PLAYER {other} AT {args.netplay}", True, YELLOW)
+            screen.blit(wait_text, wait_text.get_rect(center=(SCREEN_WIDTH//2, SCREEN_HEIGHT//2)))
+
         elif state == GameState.BOSS_WARNING:
             # Dramatic boss warning
-            flash = (boss_warning_timer // 10) % 2
+            flash = (sim.boss_warning_timer // 10) % 2
             if flash:
                 warning = title_font.render("WARNING", True, RED)
             else:
@@ -1116,48 +2330,16 @@ def main():
             boss_rect = boss_text.get_rect(center=(SCREEN_WIDTH//2, SCREEN_HEIGHT//2 + 70))
             screen.blit(boss_text, boss_rect)
 
-        elif state in [GameState.PLAYING, GameState.PAUSED]:
-            # Game objects with shake offset
-            offset = (shake_x, shake_y)
-
-            # Powerups
-            for powerup in powerups:
-                powerup.draw(screen)
-
-            # Enemy bullets
-            for bullet in enemy_bullets:
-                bullet.draw(screen)
-
-            # Player bullets
-            for bullet in player_bullets:
-                bullet.draw(screen)
-
-            # Enemies
-            for enemy in enemies:
-                enemy.draw(screen)
-
-            # Boss
-            if boss and not boss.defeated:
-                boss.draw(screen)
-
-            # Player
-            player.draw(screen)
-
-            # Particles
-            particles.draw(screen)
-
-            # Bomb flash
-            if bomb_flash > 0:
-                flash_surf = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT), pygame.SRCALPHA)
-                alpha = int(200 * (bomb_flash / 30))
-                flash_surf.fill((255, 255, 255, alpha))
-                screen.blit(flash_surf, (0, 0))
-
+        elif in_game:
             # UI
-            score_text = font.render(f"SCORE: {score:,}", True, WHITE)
+            player = sim.player
+            if sim.boss and not sim.boss.defeated:
+                sim.boss.draw_health_bar(screen)
+
+            score_text = font.render(f"SCORE: {sim.score:,}", True, WHITE)
             screen.blit(score_text, (20, 20))
 
-            graze_text = small_font.render(f"GRAZE: {graze_count}", True, (150, 150, 150))
+            graze_text = small_font.render(f"GRAZE: {sim.graze_count}", True, (150, 150, 150))
             screen.blit(graze_text, (20, 60))
 
             # Lives
@@ -1172,29 +2354,42 @@ def main():
             power_text = small_font.render(f"POWER: {player.power:.2f}", True, RED)
             screen.blit(power_text, (SCREEN_WIDTH - 150, SCREEN_HEIGHT - 50))
 
-            # Wave
-            wave_text = small_font.render(f"WAVE: {wave}", True, CYAN)
+            # Co-op partner
+            for partner in sim.players[1:]:
+                partner_text = small_font.render(
+                    f"P2  LIVES: {'★ ' * partner.lives} BOMBS: {'● ' * partner.bombs} POWER: {partner.power:.2f}",
+                    True, PINK)
+                screen.blit(partner_text, partner_text.get_rect(bottomright=(SCREEN_WIDTH - 20, SCREEN_HEIGHT - 80)))
+
+            # Wave, or the stage being played
+            label = stage.name.upper() if stage else f"WAVE: {sim.wave}"
+            wave_text = small_font.render(label, True, CYAN)
             screen.blit(wave_text, (SCREEN_WIDTH - 150, 20))
 
+            if rewinding:
+                rewind_text = font.render(f"<< REWIND  {len(rewind) / frame_rate:.1f}s", True, YELLOW)
+                screen.blit(rewind_text, rewind_text.get_rect(center=(SCREEN_WIDTH//2, 90)))
+            elif TURBO_SPEEDS[turbo] != 1:
+                speed = f"{TURBO_SPEEDS[turbo]}x" if TURBO_SPEEDS[turbo] else "UNCAPPED"
+                meter = f"{ticks_per_second:,.0f} ticks/s simulated" if ticks_per_second else "measuring..."
+                turbo_text = font.render(f">> TURBO {speed}  {meter}", True, ORANGE)
+                screen.blit(turbo_text, turbo_text.get_rect(center=(SCREEN_WIDTH//2, 90)))
+
             if state == GameState.PAUSED:
-                overlay = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT), pygame.SRCALPHA)
-                overlay.fill((0, 0, 0, 150))
-                screen.blit(overlay, (0, 0))
+                compositor.tint(screen, BLACK, 150)
 
                 pause_text = title_font.render("PAUSED", True, WHITE)
                 pause_rect = pause_text.get_rect(center=(SCREEN_WIDTH//2, SCREEN_HEIGHT//2))
                 screen.blit(pause_text, pause_rect)
 
         elif state == GameState.GAME_OVER:
-            overlay = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT), pygame.SRCALPHA)
-            overlay.fill((0, 0, 0, 180))
-            screen.blit(overlay, (0, 0))
+            compositor.tint(screen, BLACK, 180)
 
             go_text = title_font.render("GAME OVER", True, RED)
             go_rect = go_text.get_rect(center=(SCREEN_WIDTH//2, SCREEN_HEIGHT//2 - 50))
             screen.blit(go_text, go_rect)
 
-            final_score = font.render(f"Final Score: {score:,}", True, WHITE)
+            final_score = font.render(f"Final Score: {sim.score:,}", True, WHITE)
             fs_rect = final_score.get_rect(center=(SCREEN_WIDTH//2, SCREEN_HEIGHT//2 + 30))
             screen.blit(final_score, fs_rect)
 
@@ -1203,19 +2398,17 @@ def main():
             screen.blit(retry_text, retry_rect)
 
         elif state == GameState.VICTORY:
-            overlay = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT), pygame.SRCALPHA)
-            overlay.fill((0, 0, 50, 180))
-            screen.blit(overlay, (0, 0))
+            compositor.tint(screen, (0, 0, 50), 180)
 
             win_text = title_font.render("VICTORY!", True, YELLOW)
             win_rect = win_text.get_rect(center=(SCREEN_WIDTH//2, SCREEN_HEIGHT//2 - 50))
             screen.blit(win_text, win_rect)
 
-            final_score = font.render(f"Final Score: {score:,}", True, WHITE)
+            final_score = font.render(f"Final Score: {sim.score:,}", True, WHITE)
             fs_rect = final_score.get_rect(center=(SCREEN_WIDTH//2, SCREEN_HEIGHT//2 + 30))
             screen.blit(final_score, fs_rect)
 
-            graze_final = small_font.render(f"Total Grazes: {graze_count}", True, CYAN)
+            graze_final = small_font.render(f"Total Grazes: {sim.graze_count}", True, CYAN)
             gf_rect = graze_final.get_rect(center=(SCREEN_WIDTH//2, SCREEN_HEIGHT//2 + 70))
             screen.blit(graze_final, gf_rect)
 
@@ -1228,8 +2421,30 @@ def main():
             hint = small_font.render("ESC to pause/exit", True, (80, 80, 80))
             screen.blit(hint, (SCREEN_WIDTH - 180, 20))
 
+        # Batching stats (F3)
+        render_queue.end_frame()
+        bullet_queue.end_frame()
+        if show_stats:
+            stats = small_font.render(f"world: {render_queue.stats_text()} | bullets: {bullet_queue.stats_text()}",
+                                      True, (150, 150, 150))
+            screen.blit(stats, (20, 100))
+            if session:
+                # Rollback cost and how deep the rollbacks go
+                for i, line in enumerate([session.stats_text(), session.histogram_text()]):
+                    screen.blit(small_font.render(line, True, (150, 150, 150)), (20, 130 + i * 30))
+
         pygame.display.flip()
-        clock.tick(60)
+        elapsed = clock.tick(frame_rate)
+        if args.delta_time:
+            dt = min(MAX_FRAME_STEP, elapsed * FRAME_RATE / 1000)
+
+    if session:
+        session.close()
+    if heatmap:
+        heatmap.close()
+        heatmap.write(args.heatmap)
+    if args.record and recording:
+        save_recording(args.record, seed, recording, args.bullet_cancel, args.stage)
 
     pygame.quit()
     sys.exit()
@@ -0,0 +1,197 @@
+"""
+Day Cycle
+Day, night and rain for the garden games.
+
+The time of day moves through a fixed number of steps, and the colors for
+each step and each level of rain are worked out once into lookup tables: the
+sky's color, an ambient color the whole scene is multiplied by, and a warm
+glow added at dawn and dusk. Nothing is recolored as it's drawn. Once the
+world is on the screen, tint() multiplies it (and adds the glow) in one
+full-screen pass, so the cached flower sprites, ground tiles and clouds stay
+as they are. The pass blits a screen-sized surface kept filled with the
+step's color: blend blits are vectorized where blend fills are not, and run
+about 30 times faster.
+
+Whether it's raining is a function of the tick and the seed, so a restored
+garden has the same weather. Raindrops live in a fixed pool of array rows
+and are drawn as one batch.
+"""
+
+import random
+
+import numpy as np
+import pygame
+
+from ecs import Archetype
+
+DAY_TICKS = 240 * 60   # A day is four minutes
+DAY_START = 0.3        # Games start in the morning: the fraction of a day already gone at tick 0
+DAY_STEPS = 96         # Time-of-day steps with their own colors; one every 2.5 seconds
+RAIN_LEVELS = 5        # Rain steps from none to a downpour
+WEATHER_TICKS = 45 * 60  # The weather can change this often
+RAIN_CHANCE = 0.3      # Chance of rain for each stretch of weather
+RAIN_FADE = 180        # Ticks rain takes to set in or clear
+RAIN_DROPS = 800       # Raindrop pool size
+DROPS_PER_TICK = 14    # In a downpour
+WIND = 0.25            # Sideways pixels per pixel of fall
+
+# (time of day, sky multiplier, ambient multiplier, glow added). 0 and 1 are midnight
+DAY_KEYS = [
+    (0.00, (40, 50, 110), (110, 115, 170), (0, 0, 0)),
+    (0.20, (40, 50, 110), (110, 115, 170), (0, 0, 0)),
+    (0.27, (255, 170, 150), (235, 200, 190), (20, 8, 0)),
+    (0.35, (255, 255, 255), (255, 255, 255), (0, 0, 0)),
+    (0.65, (255, 255, 255), (255, 255, 255), (0, 0, 0)),
+    (0.73, (255, 150, 110), (240, 190, 160), (25, 10, 0)),
+    (0.80, (40, 50, 110), (110, 115, 170), (0, 0, 0)),
+    (1.00, (40, 50, 110), (110, 115, 170), (0, 0, 0)),
+]
+RAIN_SKY = (150, 155, 170)       # What a downpour turns the sky multiplier to
+RAIN_AMBIENT = (200, 205, 220)   # and multiplies the ambient light by
+
+
+def day_tables():
+    """(sky, ambient, glow) multipliers for every time-of-day step, as float arrays of shape (DAY_STEPS, 3)"""
+    times = [key[0] for key in DAY_KEYS]
+    steps = (np.arange(DAY_STEPS) + 0.5) / DAY_STEPS
+    tables = []
+    for k in (1, 2, 3):
+        tables.append(np.stack([np.interp(steps, times, [key[k][channel] for key in DAY_KEYS])
+                                for channel in range(3)], axis=1))
+    return tables
+
+def color_rows(table):
+    # Rows of a color table as tuples pygame can fill with, indexed [rain level][step]
+    return [[tuple(int(c) for c in row) for row in level] for level in np.clip(np.rint(table), 0, 255)]
+
+
+class DayCycle:
+    """The time of day and weather. update() each tick, draw the world, then tint() it"""
+    def __init__(self, sky_color, width, height, seed=None, day_ticks=DAY_TICKS):
+        self.width = width
+        self.height = height
+        self.seed = random.randrange(1 << 30) if seed is None else seed
+        self.day_ticks = day_ticks
+
+        # The lookup tables, every rain level by every step
+        sky, ambient, glow = day_tables()
+        rain = np.linspace(0, 1, RAIN_LEVELS)[:, None, None]
+        sky = sky * (1 - rain) + np.array(RAIN_SKY) * rain
+        ambient = ambient * (1 - rain + rain * np.array(RAIN_AMBIENT) / 255)
+        glow = glow * (1 - rain)
+        self.sky_colors = color_rows(np.asarray(sky_color) * sky / 255)
+        self.sky_multipliers = color_rows(sky)
+        self.ambient = color_rows(ambient)
+        self.glow = color_rows(glow)
+        self.daylight = (ambient[0].mean(axis=1) / 255).tolist()  # 0 to 1 by step
+
+        self.step = 0
+        self.level = 0
+        self.wetness = 0.0  # 0 dry to 1 pouring, easing toward the weather
+        self.rain = RainEmitter(width, height, seed=self.seed)
+        self.gradient = None  # (key, surface) for the last sky gradient asked for
+        self.light = pygame.Surface((width, height)).convert()  # Filled with light_color, to multiply by
+        self.light_color = None
+        self.warmth = pygame.Surface((width, height)).convert()  # Filled with warmth_color, to add
+        self.warmth_color = None
+
+    def raining(self, tick):
+        """Whether the weather at tick is rain"""
+        return random.Random(f"{self.seed}:{tick // WEATHER_TICKS}").random() < RAIN_CHANCE
+
+    def update(self, tick):
+        self.step = int((tick / self.day_ticks + DAY_START) % 1 * DAY_STEPS)
+        target = 1.0 if self.raining(tick) else 0.0
+        self.wetness += max(-1 / RAIN_FADE, min(1 / RAIN_FADE, target - self.wetness))
+        self.level = int(round(self.wetness * (RAIN_LEVELS - 1)))
+        self.rain.update()
+        self.rain.spawn(int(self.wetness * DROPS_PER_TICK))
+
+    def is_day(self):
+        return self.daylight[self.step] > 0.7
+
+    def sky_color(self):
+        return self.sky_colors[self.level][self.step]
+
+    def sky_gradient(self, top, bottom, height):
+        """A full-width sky fading from top to bottom color, tinted for now. Cached until the step or rain changes"""
+        key = (self.level, self.step, top, bottom, height)
+        if self.gradient is None or self.gradient[0] != key:
+            multiplier = np.array(self.sky_multipliers[self.level][self.step]) / 255
+            ratio = np.arange(height)[:, None] / height
+            rows = (np.array(top) + (np.array(bottom) - np.array(top)) * ratio) * multiplier
+            column = pygame.Surface((1, height))
+            pygame.surfarray.blit_array(column, rows.astype(np.uint8)[None, :, :])
+            self.gradient = (key, pygame.transform.scale(column, (self.width, height)).convert())
+        return self.gradient[1]
+
+    def tint(self, surface):
+        """Light the finished scene for the time of day: one multiply, and at dawn and dusk one add"""
+        ambient = self.ambient[self.level][self.step]
+        if ambient != (255, 255, 255):
+            if ambient != self.light_color:
+                self.light.fill(ambient)
+                self.light_color = ambient
+            surface.blit(self.light, (0, 0), special_flags=pygame.BLEND_MULT)
+        glow = self.glow[self.level][self.step]
+        if glow != (0, 0, 0):
+            if glow != self.warmth_color:
+                self.warmth.fill(glow)
+                self.warmth_color = glow
+            surface.blit(self.warmth, (0, 0), special_flags=pygame.BLEND_ADD)
+
+    def draw_moon(self, surface, x, y):
+        pygame.draw.circle(surface, (235, 235, 250), (x, y), 40)
+        pygame.draw.circle(surface, (210, 210, 230), (x - 12, y - 8), 8)
+        pygame.draw.circle(surface, (210, 210, 230), (x + 10, y + 12), 6)
+
+    def stats_text(self):
+        hours = (self.step + 0.5) * 24 / DAY_STEPS
+        return (f"Time {int(hours):02d}:{int(hours % 1 * 60):02d}, step {self.step}/{DAY_STEPS}, "
+                f"rain {self.wetness:.2f}, {len(self.rain)} drops")
+
+
+class RainEmitter:
+    """Raindrops in a fixed pool of array rows. Landed drops are packed out and their rows reused,
+    so the pool never grows however long it rains"""
+    def __init__(self, width, height, capacity=RAIN_DROPS, seed=None):
+        self.width = width
+        self.height = height
+        self.capacity = capacity
+        self.drops = Archetype('raindrops', capacity, x=np.float32, y=np.float32, speed=np.float32,
+                               floor=np.float32)
+        self.rng = np.random.default_rng(seed)
+        fall = 12
+        self.sprite = pygame.Surface((int(fall * WIND) + 2, fall)).convert()
+        self.sprite.fill((0, 0, 0))
+        self.sprite.set_colorkey((0, 0, 0), pygame.RLEACCEL)
+        pygame.draw.line(self.sprite, (170, 200, 240), (0, 0), (int(fall * WIND), fall - 1), 2)
+
+    def __len__(self):
+        return len(self.drops)
+
+    def spawn(self, count):
+        # Drops start above the screen, anywhere the wind can blow them onto it, and land somewhere on the ground
+        count = min(count, self.capacity - len(self.drops))
+        if count <= 0:
+            return
+        rng = self.rng
+        self.drops.spawn_many(count, x=rng.uniform(-self.height * WIND, self.width, count),
+                              y=rng.uniform(-40, 0, count), speed=rng.uniform(12, 18, count),
+                              floor=rng.uniform(self.height * 0.45, self.height, count))
+
+    def update(self):
+        drops = self.drops
+        if not len(drops):
+            return
+        speed = drops['speed']
+        drops['x'] += speed * WIND
+        drops['y'] += speed
+        drops.kill_where(drops['y'] > drops['floor'])
+
+    def draw(self, queue, layer=0):
+        """Submit every drop to a render queue, which draws them in one batch"""
+        drops = self.drops
+        queue.submit_many(self.sprite, zip(drops['x'].astype(np.int32).tolist(),
+                                           drops['y'].astype(np.int32).tolist()), layer=layer)
+
@@ -0,0 +1,78 @@
+"""
+Entity Storage
+A small archetype-based entity store. Each entity kind is a table of typed
+NumPy columns with its live rows packed at the front, so a system can update
+every entity of that kind with a handful of array operations.
+"""
+
+import numpy as np
+
+
+class Archetype:
+    """Packed structure-of-arrays table for one entity kind"""
+    def __init__(self, name, capacity=64, **columns):
+        self.name = name
+        self.capacity = capacity
+        self.count = 0
+        self.columns = {key: np.zeros(capacity, dtype) for key, dtype in columns.items()}
+
+    def __len__(self):
+        return self.count
+
+    def __getitem__(self, key):
+        """View of one column's live rows. Spawning can reallocate, so fetch again after spawns"""
+        return self.columns[key][:self.count]
+
+    def __setitem__(self, key, value):
+        self.columns[key][:self.count] = value
+
+    def reserve(self, extra):
+        needed = self.count + extra
+        if needed <= self.capacity:
+            return
+        capacity = max(needed, self.capacity * 2)
+        for key, column in self.columns.items():
+            grown = np.zeros(capacity, column.dtype)
+            grown[:self.count] = column[:self.count]
+            self.columns[key] = grown
+        self.capacity = capacity
+
+    def spawn(self, **values):
+        """Add one entity and return its row. Columns not given start at zero"""
+        self.reserve(1)
+        row = self.count
+        for key, column in self.columns.items():
+            column[row] = values.get(key, 0)
+        self.count += 1
+        return row
+
+    def spawn_many(self, n, **values):
+        """Add n entities at once; values may be scalars or length-n arrays"""
+        if n <= 0:
+            return
+        self.reserve(n)
+        rows = slice(self.count, self.count + n)
+        for key, column in self.columns.items():
+            column[rows] = values.get(key, 0)
+        self.count += n
+
+    def kill(self, row):
+        """Remove one entity in O(1) by moving the last row into its slot"""
+        last = self.count - 1
+        if row != last:
+            for column in self.columns.values():
+                column[row] = column[last]
+        self.count = last
+
+    def kill_where(self, mask):
+        """Remove every row where mask is set, keeping the order of the rest"""
+        keep = ~mask
+        alive = int(np.count_nonzero(keep))
+        if alive == self.count:
+            return
+        for column in self.columns.values():
+            column[:alive] = column[:self.count][keep]
+        self.count = alive
+
+    def clear(self):
+        self.count = 0
@@ -0,0 +1,187 @@
+"""
+Flocking
+Boid butterflies: separation, alignment and cohesion with their neighbors,
+plus a pull toward the flower each one is heading for. The flock is one
+packed table of NumPy columns, re-sorted by grid cell every step.
+
+A butterfly's neighbors are the others in its own and the 8 surrounding
+cells. Cohesion and alignment only need their totals, which come from
+per-cell sums without ever listing pairs. Separation does look at pairs,
+but only on a grid as fine as the separation radius, where there are few.
+"""
+
+import numpy as np
+
+from ecs import Archetype
+
+NEIGHBOR_RADIUS = 60     # Neighbor cell size: butterflies within a cell or so flock together
+SEPARATION_RADIUS = 20   # and closer than this push apart
+COHESION = 0.001         # Steering weights, in pixels per frame per frame
+ALIGNMENT = 0.04
+SEPARATION = 2.0
+ATTRACTION = 0.05
+ARRIVE_RADIUS = 40       # Attraction fades inside this distance of the target, so they hover
+FLUTTER = 0.08           # Random wobble added to every butterfly each frame
+
+
+class Flock:
+    """Butterflies moved as boids. Rows are reordered by every step, so hold on to positions, not rows"""
+    def __init__(self, max_speed=2.0, bounds=None, seed=None, radius=NEIGHBOR_RADIUS):
+        self.table = Archetype('butterflies', x=np.float64, y=np.float64, vx=np.float64, vy=np.float64,
+                               target_x=np.float64, target_y=np.float64, has_target=np.bool_,
+                               time=np.float64, wing_speed=np.float64, color=np.uint8)
+        self.max_speed = max_speed
+        self.bounds = bounds  # (left, top, right, bottom) to keep the flock inside, or None
+        self.radius = radius
+        self.rng = np.random.default_rng(seed)
+        self.neighbors = 0.0  # Mean neighbors per butterfly in the last step
+        self.pairs = 0  # Pairs close enough to push apart in the last step
+
+    def __len__(self):
+        return len(self.table)
+
+    def add(self, x, y, color, wing_speed, time=0.0):
+        angle = self.rng.uniform(0, 2 * np.pi)
+        speed = self.max_speed * 0.5
+        self.table.spawn(x=x, y=y, vx=np.cos(angle) * speed, vy=np.sin(angle) * speed,
+                         target_x=x, target_y=y, time=time, wing_speed=wing_speed, color=color)
+
+    def add_many(self, x, y, color, wing_speed, time=0.0):
+        n = len(x)
+        angle = self.rng.uniform(0, 2 * np.pi, n)
+        speed = self.max_speed * 0.5
+        self.table.spawn_many(n, x=x, y=y, vx=np.cos(angle) * speed, vy=np.sin(angle) * speed,
+                              target_x=x, target_y=y, time=time, wing_speed=wing_speed, color=color)
+
+    def set_target(self, row, x, y):
+        table = self.table
+        table.columns['target_x'][row] = x
+        table.columns['target_y'][row] = y
+        table.columns['has_target'][row] = True
+
+    def retargeting(self, chance):
+        """Rows picked this frame to choose a new flower, each with the given chance"""
+        return np.flatnonzero(self.rng.random(len(self.table)) < chance)
+
+    def visible(self, left, top, right, bottom):
+        x, y = self.table['x'], self.table['y']
+        return np.flatnonzero((x > left) & (x < right) & (y > top) & (y < bottom))
+
+    def sort_by_cell(self):
+        # Reorder the rows by neighbor cell, so each cell's butterflies are consecutive rows
+        table = self.table
+        keys, width = cell_keys(table['x'], table['y'], self.radius)
+        order = np.argsort(keys, kind='stable')
+        for name, column in table.columns.items():
+            column[:table.count] = column[:table.count][order]
+        return keys[order], width
+
+    def step(self, dt=1.0):
+        table = self.table
+        n = table.count
+        if not n:
+            return
+        keys, width = self.sort_by_cell()
+        x, y, vx, vy = table['x'], table['y'], table['vx'], table['vy']
+
+        # Each butterfly's neighbors are the others in the 3 x 3 block of cells around it. Sum each
+        # cell once, then each block is three runs of cells, read from running totals of the cell sums
+        cells, first, per_cell = np.unique(keys, return_index=True, return_counts=True)
+        totals = []
+        for column in (per_cell, x, y, vx, vy):
+            sums = column if column is per_cell else np.add.reduceat(column, first)
+            totals.append(np.concatenate(([0], np.cumsum(sums))))
+        block = np.zeros((5, n))
+        for offset in (-width, 0, width):
+            lo = np.searchsorted(cells, keys + offset - 1, 'left')
+            hi = np.searchsorted(cells, keys + offset + 1, 'right')
+            for k, running in enumerate(totals):
+                block[k] += running[hi] - running[lo]
+        neighbors = block[0] - 1
+        count = np.maximum(neighbors, 1)
+        flocking = neighbors > 0
+        ax = np.where(flocking, ((block[1] - x) / count - x) * COHESION + ((block[3] - vx) / count - vx) * ALIGNMENT, 0)
+        ay = np.where(flocking, ((block[2] - y) / count - y) * COHESION + ((block[4] - vy) / count - vy) * ALIGNMENT, 0)
+        self.neighbors = float(neighbors.mean())
+
+        # Push apart from any closer than the separation radius, pair by pair on a finer grid
+        push_x, push_y = self.separation(x, y)
+        ax += push_x * SEPARATION
+        ay += push_y * SEPARATION
+
+        # Head for the flower, easing off on arrival
+        tx = table['target_x'] - x
+        ty = table['target_y'] - y
+        distance = np.maximum(np.hypot(tx, ty), 1e-6)
+        pull = np.where(table['has_target'], ATTRACTION * np.minimum(1, distance / ARRIVE_RADIUS) / distance, 0)
+        ax += tx * pull + self.rng.normal(0, FLUTTER, n)
+        ay += ty * pull + self.rng.normal(0, FLUTTER, n)
+
+        vx += ax * dt
+        vy += ay * dt
+        speed = np.hypot(vx, vy)
+        slow = np.minimum(1, self.max_speed / np.maximum(speed, 1e-6))
+        vx *= slow
+        vy *= slow
+
+        time = table['time']
+        x += vx * dt
+        y += (vy + np.sin(time * 0.1) * 0.5) * dt  # Flutter, like a lone butterfly
+        time += dt
+
+        if self.bounds:
+            left, top, right, bottom = self.bounds
+            np.clip(x, left, right, out=x)
+            np.clip(y, top, bottom, out=y)
+
+    def separation(self, x, y):
+        """Sum of (away / distance squared) from every other butterfly inside the separation radius"""
+        n = len(x)
+        keys, width = cell_keys(x, y, SEPARATION_RADIUS)
+        order = np.argsort(keys, kind='stable')
+        keys, sx, sy = keys[order], x[order], y[order]
+        push_x, push_y = np.zeros(n), np.zeros(n)
+        radius2 = SEPARATION_RADIUS ** 2
+        self.pairs = 0
+        for i, j in neighbor_pairs(keys, width):
+            dx = sx[i] - sx[j]
+            dy = sy[i] - sy[j]
+            d2 = dx * dx + dy * dy
+            close = np.flatnonzero((d2 < radius2) & (i != j))
+            i, push = i[close], 1 / np.maximum(d2[close], 1.0)
+            push_x += np.bincount(i, dx[close] * push, n)
+            push_y += np.bincount(i, dy[close] * push, n)
+            self.pairs += len(i)
+        # Back from the separation grid's order to the rows'
+        result_x, result_y = np.empty(n), np.empty(n)
+        result_x[order] = push_x
+        result_y[order] = push_y
+        return result_x, result_y
+
+
+def cell_keys(x, y, size):
+    """Each point's grid cell as one sortable key, and the grid width. The grid is a column wider
+    than the points, so the cell right of the last column is always empty"""
+    col = np.floor(x / size).astype(np.int64)
+    row = np.floor(y / size).astype(np.int64)
+    col -= col.min()
+    row -= row.min()
+    width = int(col.max()) + 2
+    return row * width + col, width
+
+def neighbor_pairs(keys, width):
+    """(i, j) index pairs between each point and every point in the 3 x 3 cells around it,
+    itself included. keys must be sorted"""
+    n = len(keys)
+    rows = np.arange(n)
+    for offset in (-width, 0, width):
+        # The three cells side by side in a grid row have consecutive keys: one range per row of cells
+        start = np.searchsorted(keys, keys + offset - 1, 'left')
+        end = np.searchsorted(keys, keys + offset + 1, 'right')
+        counts = end - start
+        total = int(counts.sum())
+        if not total:
+            continue
+        i = np.repeat(rows, counts)
+        j = np.arange(total) - np.repeat(np.cumsum(counts) - counts - start, counts)
+        yield i, j
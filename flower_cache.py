@@ -0,0 +1,98 @@
+"""
+Flower Cache
+Pre-rendered flower sprites shared by the garden games.
+A blossom's look at any moment is its petals, size and color plus how far its
+petals have turned, quantized to a few steps per petal. A stem's look is how
+far it sways, in whole pixels. Each is rendered the first time it comes up, so
+drawing a flower is a stem blit and a blossom blit. Past a fixed number of
+sprites the least recently used are dropped.
+
+Sprites are colorkeyed and RLE encoded rather than per-pixel alpha: the flowers
+have hard edges, and colorkey blits skip the transparent runs outright.
+"""
+
+import math
+from collections import OrderedDict
+
+import pygame
+
+ROTATION_STEPS = 8   # Turn positions per petal; a ring of petals looks the same after turning one petal
+SWAY_LIMIT = 3       # Stems sway up to this many pixels either way
+CACHE_SIZE = 1024    # Sprites kept; at most about 16 MB at the biggest blossom size
+TRANSPARENT = (255, 0, 255)  # Colorkey, a color no flower uses
+
+
+def phase(turn, petals, sway):
+    """(rotation step, whole pixels of sway) for petals turned by turn radians and a stem swayed sway pixels"""
+    period = 2 * math.pi / petals
+    return int(turn % period / period * ROTATION_STEPS), int(round(sway))
+
+def blossom_reach(size):
+    # How far the petals reach from the blossom's center
+    return size + size // 2 + 1
+
+def sprite_surface(width, height):
+    """A blank sprite, transparent where nothing gets drawn on it"""
+    surface = pygame.Surface((width, height)).convert()
+    surface.fill(TRANSPARENT)
+    surface.set_colorkey(TRANSPARENT, pygame.RLEACCEL)
+    return surface
+
+def draw_blossom(surface, x, y, petals, size, color, step, center_color):
+    """A ring of petals around (x, y), turned step / ROTATION_STEPS of a petal, and its center"""
+    period = 2 * math.pi / petals
+    turn = step * period / ROTATION_STEPS
+    for i in range(petals):
+        angle = i * period + turn
+        pygame.draw.circle(surface, color,
+                           (int(x + math.cos(angle) * size), int(y + math.sin(angle) * size)), size // 2)
+    pygame.draw.circle(surface, center_color, (int(x), int(y)), size // 3)
+
+def blossom_sprite(petals, size, color, step, center_color):
+    reach = blossom_reach(size)
+    sprite = sprite_surface(reach * 2, reach * 2)
+    draw_blossom(sprite, reach, reach, petals, size, color, step, center_color)
+    return sprite, (reach, reach)
+
+
+class FlowerCache:
+    """LRU cache of flower sprites. Each sprite is (surface, where the flower's anchor point is on it)"""
+    def __init__(self, capacity=CACHE_SIZE):
+        self.capacity = capacity
+        self.sprites = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self.sprites)
+
+    def get(self, key, render, *args):
+        """The sprite for key, rendered with render(*args) if it isn't cached"""
+        sprites = self.sprites
+        sprite = sprites.get(key)
+        if sprite is None:
+            self.misses += 1
+            sprite = sprites[key] = render(*args)
+            if len(sprites) > self.capacity:
+                sprites.popitem(last=False)
+        else:
+            self.hits += 1
+            sprites.move_to_end(key)
+        return sprite
+
+    def blossom(self, petals, size, color, step, center_color):
+        """The blossom sprite, anchored at its center"""
+        return self.get(('blossom', petals, size, color, step, center_color),
+                        blossom_sprite, petals, size, color, step, center_color)
+
+    def memory_used(self):
+        return sum(surface.get_width() * surface.get_height() * surface.get_bytesize()
+                   for surface, anchor in self.sprites.values())
+
+    def stats_text(self):
+        lookups = self.hits + self.misses
+        return (f"Flower sprites: {len(self.sprites)} cached ({self.memory_used() // 1024} KB), "
+                f"{self.hits * 100 // max(1, lookups)}% hits")
+
+
+flower_sprites = FlowerCache()  # One cache for every flower in the game
@@ -0,0 +1,646 @@
+"""
+Garden Grower Benchmarks
+Headless timings for the garden's bigger data structures.
+
+    python garden_benchmarks.py spots     # Nearest-spot lookups: linear scan vs the spot index
+    python garden_benchmarks.py large     # Walking a 100,000 plot garden: chunk streaming, update and draw
+    python garden_benchmarks.py butterflies   # Butterfly targeting: rebuilt flower list vs the flower set and index
+    python garden_benchmarks.py flock     # Boid butterfly step time at 100, 1,000 and 5,000 agents
+    python garden_benchmarks.py static    # Drawing the ground, fence and beds each frame vs the baked tiles
+    python garden_benchmarks.py flowers   # Drawing swaying flowers from primitives vs one cached sprite blit
+    python garden_benchmarks.py save      # Saving and restoring a fully planted 100,000 plot garden
+    python garden_benchmarks.py sprinklers    # Sprinkler and watering can cost: spot index vs scanning every spot
+    python garden_benchmarks.py daycycle  # Day/night tint, sky gradient and rain: per-frame drawing vs cached and pooled
+"""
+
+import os
+import sys
+import math
+import time
+import random
+import argparse
+import tempfile
+
+# No window or audio device needed
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+
+import numpy as np
+import pygame
+import garden_grower as garden
+from flocking import Flock
+from flower_cache import FlowerCache
+from garden_save import Autosaver, write_save, read_save
+from render_queue import RenderQueue
+import daycycle
+
+
+def timing_summary(samples):
+    us = np.array(samples) * 1e6
+    return f"mean {us.mean():8.2f}  p95 {np.percentile(us, 95):8.2f}  max {us.max():8.2f} us"
+
+def make_garden(count, rng):
+    # Spots laid out like the game's grid, as close to square as count allows
+    cols = max(1, int(count ** 0.5))
+    spots = []
+    for i in range(count):
+        row, col = divmod(i, cols)
+        spots.append(garden.PlantSpot(150 + col * 120 + rng.randint(-20, 20),
+                                      400 + row * 100 + rng.randint(-15, 15)))
+    return spots
+
+# ============== SPOT LOOKUPS ==============
+
+def linear_nearest(spots, x, y):
+    best, best_d2 = None, garden.SPOT_REACH ** 2
+    for spot in spots:
+        d2 = (spot.x - x) ** 2 + (spot.y - y) ** 2
+        if d2 < best_d2:
+            best, best_d2 = spot, d2
+    return best
+
+def run_spots(args):
+    rng = random.Random(args.seed)
+    print(f"{args.queries} nearest-spot lookups near random spots, reach {garden.SPOT_REACH}")
+    for count in args.counts:
+        spots = make_garden(count, rng)
+        start = time.perf_counter()
+        index = garden.SpotIndex()
+        for spot in spots:
+            index.add(spot)
+        build = time.perf_counter() - start
+
+        # Stand near a spot most of the time, like a player does, and in the open the rest
+        points = []
+        for _ in range(args.queries):
+            spot = rng.choice(spots)
+            points.append((spot.x + rng.uniform(-60, 60), spot.y + rng.uniform(-60, 60)))
+
+        linear_times, index_times = [], []
+        mismatches = 0
+        for x, y in points[:args.linear_queries]:
+            start = time.perf_counter()
+            expected = linear_nearest(spots, x, y)
+            linear_times.append(time.perf_counter() - start)
+            if index.nearest(x, y) is not expected:
+                mismatches += 1
+        for x, y in points:
+            start = time.perf_counter()
+            index.nearest(x, y)
+            index_times.append(time.perf_counter() - start)
+
+        print(f"{count:7d} spots  (index built in {build * 1000:.1f} ms, {len(index.cells)} cells)")
+        print(f"  linear  {timing_summary(linear_times)}")
+        print(f"  index   {timing_summary(index_times)}")
+        print(f"  {'agree' if not mismatches else f'{mismatches} MISMATCHES'} "
+              f"on {len(linear_times)} lookups")
+        if mismatches:
+            return 1
+    return 0
+
+# ============== LARGE GARDEN ==============
+
+def spot_state(spot):
+    return (spot.x, spot.y, spot.state, spot.watered_at,
+            spot.color, spot.sway_offset, spot.petals, spot.size)
+
+def wander(plots, frames, rng):
+    """Bunny and camera positions for a walk diagonally across the garden and back"""
+    width, height = garden.SCREEN_WIDTH, garden.SCREEN_HEIGHT
+    x, y = 600.0, 800.0
+    heading = 0.5
+    for tick in range(frames):
+        heading += rng.uniform(-0.05, 0.05)
+        speed = 5 if tick < frames // 2 else -5
+        x = max(50, min(plots.width(), x + math.cos(heading) * speed))
+        y = max(450, min(plots.height(), y + math.sin(heading) * speed))
+        yield tick, x, y, int(x - width // 2), int(y - height // 2)
+
+def run_large(args):
+    cols, rows = garden.LARGE_GARDEN
+    plots = garden.Garden(args.seed, cols, rows, 150, 400)
+    width, height = garden.SCREEN_WIDTH, garden.SCREEN_HEIGHT
+    surface = pygame.Surface((width, height))
+    rng = random.Random(args.seed)
+
+    # Plant and water whatever is in reach along the way
+    frames = args.seconds * 60
+    stream_times, update_times, draw_times = [], [], []
+    planted = 0
+    first_visit = {}
+    for tick, x, y, camera_x, camera_y in wander(plots, frames, rng):
+        start = time.perf_counter()
+        plots.stream(camera_x, camera_y, camera_x + width, camera_y + height)
+        middle = time.perf_counter()
+        plots.bloom(tick)
+        if garden.plant_near(plots, x, y, [], None) or garden.water_near(plots, x, y, tick, [], None):
+            planted += 1
+        updated = time.perf_counter()
+        surface.fill(garden.GRASS_GREEN)
+        for spot in plots.visible(camera_x - 50, camera_y - 50, camera_x + width + 50, camera_y + height + 50):
+            spot.draw(surface, camera_x, camera_y, tick)
+        end = time.perf_counter()
+        stream_times.append(middle - start)
+        update_times.append(updated - middle)
+        draw_times.append(end - updated)
+
+        # Remember some chunks as they were, to check them when they come back
+        for key in plots.chunks:
+            if key not in first_visit and len(first_visit) < 50:
+                first_visit[key] = tick
+
+    # Evict everything, then bring each remembered chunk back twice: both copies must match,
+    # and a copy made by an independent garden with the same seed must match its layout
+    for key in list(plots.chunks):
+        plots.evict(*key)
+    fresh = garden.Garden(args.seed, cols, rows, 150, 400)
+    mismatches = 0
+    for key in first_visit:
+        plots.load(*key)
+        once = [spot_state(spot) for spot in plots.chunks[key]]
+        plots.evict(*key)
+        plots.load(*key)
+        twice = [spot_state(spot) for spot in plots.chunks[key]]
+        layout = [spot_state(spot)[:2] + spot_state(spot)[4:] for spot in fresh.generate(*key)]
+        if once != twice or [state[:2] + state[4:] for state in once] != layout:
+            mismatches += 1
+
+    print(f"walked a {len(plots):,} plot garden for {frames} frames: {plots.loads} chunk loads, "
+          f"{planted} plantings, {plots.flowers} flowers, {len(plots.saved)} chunks saved while evicted")
+    print(f"  stream  {timing_summary(stream_times)}")
+    print(f"  update  {timing_summary(update_times)}")
+    print(f"  draw    {timing_summary(draw_times)}")
+    print(f"  {len(first_visit)} chunks restored {'exactly' if not mismatches else f'with {mismatches} MISMATCHES'}")
+    return 1 if mismatches else 0
+
+# ============== BUTTERFLIES ==============
+
+def bloom_everything(plots, tick=0):
+    # Plant and water every loaded spot, then let them all bloom
+    for spots in plots.chunks.values():
+        for spot in spots:
+            spot.plant_seed()
+            plots.water(spot, tick)
+    plots.bloom(tick + garden.BLOOM_STAGE * garden.GROWTH_TICKS)
+
+def run_butterflies(args):
+    rng = random.Random(args.seed)
+    plots = garden.Garden(args.seed, *garden.LARGE_GARDEN, 150, 400)
+    plots.stream(0, 0, garden.SCREEN_WIDTH * 2, garden.SCREEN_HEIGHT * 2)
+    bloom_everything(plots)
+    loaded = sum(len(spots) for spots in plots.chunks.values())
+    print(f"{args.frames} frames of butterflies over {loaded} loaded spots, {len(plots.flowering)} in flower")
+    for count in args.counts:
+        butterflies = [garden.Butterfly(rng.uniform(0, garden.SCREEN_WIDTH * 2), rng.uniform(400, 1500))
+                       for _ in range(count)]
+        rebuilt_times, indexed_times = [], []
+        for frame in range(args.frames):
+            # The old way: scan for flowers every frame, then pick one anywhere
+            start = time.perf_counter()
+            flower_spots = [spot for spots in plots.chunks.values() for spot in spots if spot.state == "flower"]
+            for butterfly in butterflies:
+                if random.random() < 0.01 and flower_spots:
+                    target = random.choice(flower_spots)
+                    butterfly.set_target(target.x, target.y - 50)
+            middle = time.perf_counter()
+            for butterfly in butterflies:
+                if random.random() < 0.01:
+                    target = plots.flower_for(butterfly.x, butterfly.y)
+                    if target:
+                        butterfly.set_target(target.x, target.y - 50)
+            end = time.perf_counter()
+            for butterfly in butterflies:
+                butterfly.update()
+            rebuilt_times.append(middle - start)
+            indexed_times.append(end - middle)
+        print(f"{count:6d} butterflies")
+        print(f"  rebuilt list   {timing_summary(rebuilt_times)}")
+        print(f"  flower index   {timing_summary(indexed_times)}")
+    return 0
+
+# ============== FLOCKING ==============
+
+def run_flock(args):
+    rng = np.random.default_rng(args.seed)
+    print(f"{args.frames} flock steps, {args.area} square pixels of garden per butterfly, "
+          f"one flower per {args.per_flower} butterflies")
+    for count in args.counts:
+        side = (count * args.area) ** 0.5
+        flock = Flock(max_speed=2.0, bounds=(0, 0, side, side), seed=args.seed)
+        flock.add_many(rng.uniform(0, side, count), rng.uniform(0, side, count),
+                       rng.integers(len(garden.BUTTERFLY_COLORS), size=count), rng.uniform(0.2, 0.35, count))
+        flowers = max(1, count // args.per_flower)
+        flower_x, flower_y = rng.uniform(0, side, flowers), rng.uniform(0, side, flowers)
+        step_times, neighbors, pairs = [], [], []
+        for frame in range(args.frames):
+            start = time.perf_counter()
+            rows = flock.retargeting(0.01)
+            pick = rng.integers(flowers, size=len(rows))
+            flock.set_target(rows, flower_x[pick], flower_y[pick])
+            flock.step()
+            step_times.append(time.perf_counter() - start)
+            neighbors.append(flock.neighbors)
+            pairs.append(flock.pairs)
+        ms = np.array(step_times) * 1000
+        print(f"{count:6d} butterflies  {np.mean(neighbors):5.1f} neighbors each, {np.mean(pairs):7.0f} pairs too close  "
+              f"step mean {ms.mean():6.2f}  p95 {np.percentile(ms, 95):6.2f}  max {ms.max():6.2f} ms  "
+              f"({'fits' if np.percentile(ms, 95) < 1000 / 60 else 'OVER'} a 60 fps frame)")
+    return 0
+
+# ============== STATIC LAYER ==============
+
+FENCE = (160, 120, 80)
+RAIL = (140, 100, 60)
+
+def draw_ground(surface, camera_x, camera_y, ground_y):
+    # The sky, ground and fence as the game drew them before the static layer
+    width, height = surface.get_size()
+    surface.fill(garden.SKY_BLUE)
+    surface.fill(garden.GRASS_GREEN, (0, ground_y - camera_y, width, height))
+    fence_y = ground_y + 50 - camera_y
+    for x in range(0, width + 50, 40):
+        pygame.draw.rect(surface, FENCE, (x, fence_y, 8, 40))
+        pygame.draw.polygon(surface, FENCE, [(x, fence_y), (x + 4, fence_y - 15), (x + 8, fence_y)])
+    pygame.draw.rect(surface, RAIL, (0, fence_y + 10, width, 6))
+    pygame.draw.rect(surface, RAIL, (0, fence_y + 30, width, 6))
+
+def run_static(args):
+    cols, rows = garden.LARGE_GARDEN
+    width, height = args.size or (garden.SCREEN_WIDTH, garden.SCREEN_HEIGHT)
+    ground_y = height // 2
+    plots = garden.Garden(args.seed, cols, rows, 150, ground_y + 100)
+    layer = garden.StaticLayer(plots, plots.width() + 100, plots.height() + 50, ground_y)
+    surface = pygame.Surface((width, height)).convert()
+    rng = random.Random(args.seed)
+
+    every_frame, baked = [], []
+    planted = 0
+    for tick, x, y, camera_x, camera_y in wander(plots, args.seconds * 60, rng):
+        plots.stream(camera_x, camera_y, camera_x + width, camera_y + height)
+        plots.bloom(tick)
+        if garden.plant_near(plots, x, y, [], None) or garden.water_near(plots, x, y, tick, [], None):
+            planted += 1
+        spots = list(plots.visible(camera_x - 50, camera_y - 50, camera_x + width + 50, camera_y + height + 50))
+
+        start = time.perf_counter()
+        draw_ground(surface, camera_x, camera_y, ground_y)
+        for spot in spots:
+            spot.draw(surface, camera_x, camera_y, tick)
+        middle = time.perf_counter()
+        surface.fill(garden.SKY_BLUE, (0, 0, width, ground_y - camera_y))
+        layer.draw(surface, camera_x, camera_y)
+        for spot in spots:
+            if spot.state == "growing" or spot.state == "flower":
+                spot.draw_plant(surface, spot.x - camera_x, spot.y - camera_y, tick)
+        end = time.perf_counter()
+        every_frame.append(middle - start)
+        baked.append(end - middle)
+
+    frames = len(baked)
+    print(f"drew {frames} frames of a walk through the {len(plots):,} plot garden at {width}x{height}, "
+          f"{planted} plantings")
+    print(f"  every frame  {timing_summary(every_frame)}")
+    print(f"  baked tiles  {timing_summary(baked)}")
+    print(f"  {layer.bakes} tile bakes, {layer.bakes / frames:.2f} a frame")
+    return 0
+
+# ============== FLOWER SPRITES ==============
+
+def draw_flower(surface, spot, screen_x, screen_y, time):
+    # A flower as the game drew it before the sprite cache: stem, leaves, petals and center each frame
+    sway = math.sin(time * 0.02 + spot.sway_offset) * 3
+    pygame.draw.line(surface, (80, 160, 80), (int(screen_x), int(screen_y - 5)),
+                     (int(screen_x + sway), int(screen_y - 60)), 4)
+    pygame.draw.ellipse(surface, (100, 180, 100), (int(screen_x - 15 + sway * 0.3), int(screen_y - 35), 15, 10))
+    pygame.draw.ellipse(surface, (100, 180, 100), (int(screen_x + sway * 0.3), int(screen_y - 45), 15, 10))
+    flower_x = screen_x + sway
+    flower_y = screen_y - 60
+    for i in range(spot.petals):
+        angle = (2 * math.pi * i / spot.petals) + time * 0.005
+        pygame.draw.circle(surface, spot.color, (int(flower_x + math.cos(angle) * spot.size),
+                                                 int(flower_y + math.sin(angle) * spot.size)), spot.size // 2)
+    pygame.draw.circle(surface, garden.SUN_YELLOW, (int(flower_x), int(flower_y)), spot.size // 3)
+
+def run_flowers(args):
+    width, height = garden.SCREEN_WIDTH, garden.SCREEN_HEIGHT
+    surface = pygame.Surface((width, height)).convert()
+    rng = random.Random(args.seed)
+
+    for count in args.counts:
+        spots = []
+        for i in range(count):
+            spot = garden.PlantSpot(rng.randint(20, width - 20), rng.randint(80, height), rng)
+            spot.state = "flower"
+            spots.append(spot)
+        # A fresh cache for each count, so its misses show up in the timings
+        garden.flower_sprites = FlowerCache()
+
+        primitives, cached = [], []
+        for tick in range(args.frames):
+            surface.fill(garden.GRASS_GREEN)
+            start = time.perf_counter()
+            for spot in spots:
+                draw_flower(surface, spot, spot.x, spot.y, tick)
+            middle = time.perf_counter()
+            for spot in spots:
+                spot.draw_plant(surface, spot.x, spot.y, tick)
+            end = time.perf_counter()
+            primitives.append(middle - start)
+            cached.append(end - middle)
+
+        sprites = garden.flower_sprites
+        print(f"{count:6,} flowers, {args.frames} frames")
+        print(f"  primitives  {timing_summary(primitives)}")
+        print(f"  cached      {timing_summary(cached)}")
+        print(f"  warm cache  {timing_summary(cached[len(cached) // 2:])}  (second half)")
+        print(f"  {sprites.stats_text()}, {sprites.misses} renders")
+    return 0
+
+# ============== SAVES ==============
+
+def plant_everything(plots, rng, tick):
+    # Every spot in the garden planted, watered or in flower, straight into the evicted chunks' saved states
+    for cy in range(plots.chunks_y):
+        for cx in range(plots.chunks_x):
+            spots = (min(plots.cols, (cx + 1) * garden.CHUNK_COLS) - cx * garden.CHUNK_COLS) * \
+                    (min(plots.rows, (cy + 1) * garden.CHUNK_ROWS) - cy * garden.CHUNK_ROWS)
+            changes = {}
+            for i in range(spots):
+                state = rng.choice(("seed", "growing", "flower"))
+                changes[i] = (state, None if state == "seed" else rng.randint(max(0, tick - 1000), tick))
+            plots.saved[cx, cy] = changes
+    plots.restore(plots.saved)
+
+def run_save(args):
+    cols, rows = garden.LARGE_GARDEN
+    rng = random.Random(args.seed)
+    tick = 10000
+    plots = garden.Garden(args.seed, cols, rows, 150, 400)
+    plant_everything(plots, rng, tick)
+    plots.stream(0, 0, garden.SCREEN_WIDTH, garden.SCREEN_HEIGHT)
+    flock = Flock(max_speed=2.0, seed=args.seed)
+    count = args.butterflies
+    flock.add_many(np.array([rng.uniform(0, plots.width()) for _ in range(count)]),
+                   np.array([rng.uniform(400, plots.height()) for _ in range(count)]),
+                   np.array([rng.randrange(len(garden.BUTTERFLY_COLORS)) for _ in range(count)]), 0.3)
+
+    class Bunny:
+        x, y = 600.0, 800.0
+
+    def snapshot(at):
+        return garden.snapshot(plots, at, Bunny, [], flock)
+
+    path = os.path.join(tempfile.mkdtemp(), 'garden.npz')
+    snapshot_times, write_times, restore_times = [], [], []
+    for repeat in range(args.repeats):
+        start = time.perf_counter()
+        saved = snapshot(tick)
+        middle = time.perf_counter()
+        write_save(path, saved)
+        end = time.perf_counter()
+        snapshot_times.append(middle - start)
+        write_times.append(end - middle)
+
+        start = time.perf_counter()
+        loaded = read_save(path)
+        restored = garden.Garden(loaded.seed, loaded.cols, loaded.rows, loaded.origin_x, loaded.origin_y)
+        restored.restore(loaded.spots)
+        butterflies = Flock(max_speed=2.0)
+        garden.restore_butterflies(loaded.butterflies, [], butterflies)
+        restore_times.append(time.perf_counter() - start)
+
+    exact = (loaded.spots == saved.spots and sorted(restored.blooms) == sorted(plots.blooms)
+             and restored.flowers == plots.flowers
+             and all(np.array_equal(butterflies.table[name], column) for name, column in saved.butterflies.items()))
+    planted = sum(len(changes) for changes in saved.spots.values())
+    print(f"{planted:,} planted spots and {count:,} butterflies, {os.path.getsize(path) / 1024:.0f} KB saved")
+    print(f"  snapshot (game thread)   {timing_summary(snapshot_times)}")
+    print(f"  write (autosave thread)  {timing_summary(write_times)}")
+    print(f"  read and restore         {timing_summary(restore_times)}  "
+          f"({'under' if max(restore_times) < 1 else 'OVER'} a second)")
+    print(f"  restored {'exactly' if exact else 'with MISMATCHES'}")
+
+    # Frame times walking the garden, then again autosaving every second of it
+    autosaver = Autosaver(path)
+    runs = {}
+    for saving in (False, True):
+        frame_times = []
+        for frame, x, y, camera_x, camera_y in wander(plots, args.frames, random.Random(args.seed)):
+            start = time.perf_counter()
+            plots.stream(camera_x, camera_y, camera_x + garden.SCREEN_WIDTH, camera_y + garden.SCREEN_HEIGHT)
+            plots.bloom(tick + frame)
+            flock.step()
+            if saving and frame % 60 == 0:
+                autosaver.save(snapshot(tick + frame))
+            frame_times.append(time.perf_counter() - start)
+        runs[saving] = frame_times
+    autosaver.close()
+    print(f"{args.frames} frames walking the garden with the flock")
+    print(f"  no autosave              {timing_summary(runs[False])}")
+    print(f"  autosave every second    {timing_summary(runs[True])}  ({autosaver.written} written)")
+    return 0 if exact else 1
+
+# ============== SPRINKLERS ==============
+
+def scan_circle(spots, x, y, radius):
+    # Every spot in range, the way a scan of the whole spot list finds them
+    r2 = radius * radius
+    return [spot for spot in spots if (spot.x - x) ** 2 + (spot.y - y) ** 2 < r2]
+
+def run_sprinklers(args):
+    rng = random.Random(args.seed)
+    interval = garden.SPRINKLER_TICKS
+    print(f"{interval * 2} frames, sprinklers every {interval} ticks, on a patch with about 4 spots per sprinkler")
+    for count in args.counts:
+        plots = garden.Garden(args.seed, *garden.LARGE_GARDEN, 150, 400)
+        side = (count * 4) ** 0.5
+        width, height = side * garden.SPOT_SPACING_X, side * garden.SPOT_SPACING_Y
+        for _ in range(count):
+            # Placed over one interval, so they take turns spraying
+            plots.add_sprinkler(rng.uniform(150, 150 + width), rng.uniform(400, 400 + height), rng.randrange(interval))
+        spots = [spot for chunk in plots.chunks.values() for spot in chunk]
+        for spot in spots:
+            spot.plant_seed()
+
+        # Two rounds: the first waters every seed, the second finds nothing left to water
+        frame_times, sprays = [], 0
+        for tick in range(interval * 2):
+            start = time.perf_counter()
+            sprays += len(plots.sprinkle(tick))
+            frame_times.append(time.perf_counter() - start)
+        per_spray = sum(frame_times) / max(1, sprays)
+        scan_times = []
+        for sprinkler in plots.sprinklers[:args.scans]:
+            start = time.perf_counter()
+            scan_circle(spots, sprinkler.x, sprinkler.y, sprinkler.radius)
+            scan_times.append(time.perf_counter() - start)
+
+        # The watering can from random spots in the patch, facing either way
+        cone_times, cone_scan_times, watered = [], [], 0
+        for _ in range(args.scans):
+            x, y = rng.uniform(150, 150 + width), rng.uniform(400, 400 + height)
+            angle = rng.choice((0.0, math.pi))
+            start = time.perf_counter()
+            watered += len(plots.water_cone(x, y, angle, interval * 2))
+            middle = time.perf_counter()
+            [spot for spot in scan_circle(spots, x, y, garden.CAN_REACH)
+             if abs((math.atan2(spot.y - y, spot.x - x) - angle + math.pi) % (2 * math.pi) - math.pi) <= garden.CAN_SPREAD]
+            end = time.perf_counter()
+            cone_times.append(middle - start)
+            cone_scan_times.append(end - middle)
+
+        print(f"{count:5d} sprinklers over {len(plots.pinned)} pinned chunks ({len(spots):,} spots), "
+              f"{sprays} sprays watered {sum(s.watered for s in plots.sprinklers):,} seeds")
+        print(f"  sprinkle per frame     {timing_summary(frame_times)}")
+        print(f"  per sprinkler tick     {per_spray * 1e6:8.2f} us indexed, "
+              f"{np.mean(scan_times) * 1e6:8.2f} us scanning every spot")
+        print(f"  watering can           {timing_summary(cone_times)}  ({watered} seeds)")
+        print(f"  watering can, scanning {timing_summary(cone_scan_times)}")
+    return 0
+
+# ============== DAY CYCLE ==============
+
+def draw_sky_lines(surface, height):
+    # walk_around's sky gradient as it drew it every frame, a line per row
+    width = surface.get_width()
+    for y in range(height):
+        ratio = y / height
+        pygame.draw.line(surface, (int(100 + 35 * ratio), int(180 + 26 * ratio), int(255 - 20 * ratio)),
+                         (0, y), (width, y))
+
+def run_daycycle(args):
+    width, height = garden.SCREEN_WIDTH, garden.SCREEN_HEIGHT
+    surface = pygame.Surface((width, height)).convert()
+    start = time.perf_counter()
+    day = daycycle.DayCycle(garden.SKY_BLUE, width, height, seed=args.seed, day_ticks=args.frames)
+    tables = time.perf_counter() - start
+    rain = daycycle.RainEmitter(width, height, seed=args.seed)
+    queue = RenderQueue()
+    rng = random.Random(args.seed)
+    drops = []  # [x, y, speed, floor] lists, the reference for the pooled emitter
+
+    times = {name: [] for name in ('fill', 'tint', 'lines', 'gradient', 'list', 'pool')}
+    tinted = 0
+    for tick in range(args.frames):
+        # A whole day over the run, so every step's colors come up
+        day.update(tick)
+        ambient = day.ambient[day.level][day.step]
+        glow = day.glow[day.level][day.step]
+        surface.fill(garden.GRASS_GREEN)
+
+        start = time.perf_counter()
+        if ambient != (255, 255, 255):
+            surface.fill(ambient, special_flags=pygame.BLEND_MULT)
+            tinted += 1
+        if glow != (0, 0, 0):
+            surface.fill(glow, special_flags=pygame.BLEND_ADD)
+        middle = time.perf_counter()
+        day.tint(surface)
+        end = time.perf_counter()
+        times['fill'].append(middle - start)
+        times['tint'].append(end - middle)
+
+        start = time.perf_counter()
+        draw_sky_lines(surface, height // 2)
+        middle = time.perf_counter()
+        surface.blit(day.sky_gradient((100, 180, 255), (135, 206, 235), height // 2), (0, 0))
+        end = time.perf_counter()
+        times['lines'].append(middle - start)
+        times['gradient'].append(end - middle)
+
+        # A downpour the whole time, both ways
+        start = time.perf_counter()
+        for drop in drops:
+            drop[0] += drop[2] * daycycle.WIND
+            drop[1] += drop[2]
+        drops = [drop for drop in drops if drop[1] <= drop[3]]
+        for _ in range(min(daycycle.DROPS_PER_TICK, daycycle.RAIN_DROPS - len(drops))):
+            drops.append([rng.uniform(-height * daycycle.WIND, width), rng.uniform(-40, 0), rng.uniform(12, 18),
+                          rng.uniform(height * 0.45, height)])
+        for x, y, speed, floor in drops:
+            pygame.draw.line(surface, (170, 200, 240), (int(x), int(y)), (int(x + 12 * daycycle.WIND), int(y + 11)), 2)
+        middle = time.perf_counter()
+        rain.update()
+        rain.spawn(daycycle.DROPS_PER_TICK)
+        rain.draw(queue)
+        queue.flush(surface)
+        end = time.perf_counter()
+        times['list'].append(middle - start)
+        times['pool'].append(end - middle)
+
+    print(f"{args.frames} frames at {width}x{height}, one whole day; lookup tables built in {tables * 1000:.1f} ms")
+    print(f"  tint, blend fill        {timing_summary(times['fill'])}  ({tinted} frames tinted)")
+    print(f"  tint, cached surface    {timing_summary(times['tint'])}")
+    print(f"  sky, line per row       {timing_summary(times['lines'])}")
+    print(f"  sky, cached gradient    {timing_summary(times['gradient'])}")
+    print(f"  rain, list of drops     {timing_summary(times['list'])}")
+    print(f"  rain, pooled emitter    {timing_summary(times['pool'])}  ({len(rain)} drops)")
+    return 0
+
+# ============== COMMAND LINE ==============
+
+def main():
+    parser = argparse.ArgumentParser(description="Headless Garden Grower benchmarks")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    spots = commands.add_parser('spots', help="nearest-spot lookup time as the garden grows")
+    spots.add_argument('--counts', type=int, nargs='+', default=[72, 1000, 10000, 100000])
+    spots.add_argument('--queries', type=int, default=20000)
+    spots.add_argument('--linear-queries', type=int, default=200, help="how many lookups to time the linear scan on")
+    spots.add_argument('--seed', type=int, default=1)
+    spots.set_defaults(run=run_spots)
+
+    large = commands.add_parser('large', help="chunk streaming, update and draw time walking the --large garden")
+    large.add_argument('--seconds', type=int, default=60)
+    large.add_argument('--seed', type=int, default=1)
+    large.set_defaults(run=run_large)
+
+    butterflies = commands.add_parser('butterflies', help="per-frame butterfly targeting cost with every spot in flower")
+    butterflies.add_argument('--counts', type=int, nargs='+', default=[100, 500, 2000])
+    butterflies.add_argument('--frames', type=int, default=600)
+    butterflies.add_argument('--seed', type=int, default=1)
+    butterflies.set_defaults(run=run_butterflies)
+
+    flock = commands.add_parser('flock', help="boid step time for growing flocks")
+    flock.add_argument('--counts', type=int, nargs='+', default=[100, 1000, 5000])
+    flock.add_argument('--frames', type=int, default=600)
+    flock.add_argument('--area', type=int, default=4000, help="square pixels of garden per butterfly")
+    flock.add_argument('--per-flower', type=int, default=10, help="butterflies per flower")
+    flock.add_argument('--seed', type=int, default=1)
+    flock.set_defaults(run=run_flock)
+
+    static = commands.add_parser('static', help="ground, fence and bed draw time, every frame vs baked tiles")
+    static.add_argument('--seconds', type=int, default=60)
+    static.add_argument('--size', type=int, nargs=2, metavar=('WIDTH', 'HEIGHT'), help="default: the screen size")
+    static.add_argument('--seed', type=int, default=1)
+    static.set_defaults(run=run_static)
+
+    flowers = commands.add_parser('flowers', help="flower draw time, primitives vs cached sprites")
+    flowers.add_argument('--counts', type=int, nargs='+', default=[72, 300, 1000])
+    flowers.add_argument('--frames', type=int, default=600)
+    flowers.add_argument('--seed', type=int, default=1)
+    flowers.set_defaults(run=run_flowers)
+
+    save = commands.add_parser('save', help="autosave and restore time for a fully planted --large garden")
+    save.add_argument('--butterflies', type=int, default=5000)
+    save.add_argument('--repeats', type=int, default=5)
+    save.add_argument('--frames', type=int, default=600)
+    save.add_argument('--seed', type=int, default=1)
+    save.set_defaults(run=run_save)
+
+    sprinklers = commands.add_parser('sprinklers', help="sprinkler tick and watering can cost as sprinklers are added")
+    sprinklers.add_argument('--counts', type=int, nargs='+', default=[10, 100, 300, 1000])
+    sprinklers.add_argument('--scans', type=int, default=200, help="how many sprays and cans to time the scan on")
+    sprinklers.add_argument('--seed', type=int, default=1)
+    sprinklers.set_defaults(run=run_sprinklers)
+
+    day = commands.add_parser('daycycle', help="day/night tint, sky and rain draw time")
+    day.add_argument('--frames', type=int, default=1200)
+    day.add_argument('--seed', type=int, default=1)
+    day.set_defaults(run=run_daycycle)
+
+    args = parser.parse_args()
+    sys.exit(args.run(args))
+
+if __name__ == "__main__":
+    main()
@@ -2,12 +2,26 @@
 Garden Grower Game
 Walk around your garden, plant seeds, water them, and watch flowers bloom!
 Butterflies visit your beautiful flowers. Designed for 5-6 year olds.
+
+    python garden_grower.py              # The backyard garden
+    python garden_grower.py --large      # A 100,000 plot garden to wander
+    python garden_grower.py --flock      # Butterflies fly together in flocks
+    python garden_grower.py --new        # Start over instead of carrying on the autosaved garden
 """
 
 import pygame
 import random
 import math
+import os
 import sys
+import heapq
+import argparse
+import numpy as np
+from render_queue import RenderQueue
+from flocking import Flock
+from flower_cache import flower_sprites, phase, sprite_surface
+from daycycle import DayCycle
+from garden_save import Snapshot, Autosaver, AUTOSAVE_SECONDS, BUTTERFLY_COLUMNS, default_path, read_save
 
 # Initialize Pygame
 pygame.init()
@@ -37,6 +51,36 @@ FLOWER_COLORS = [
     (150, 200, 255),   # Light Blue
 ]
 
+SPOT_REACH = 40   # How close the bunny has to stand to plant or water a spot
+SPOT_CELL = 80    # Spot index cell size; twice the reach, so a reach query reads at most 4 cells
+
+# Garden layout
+SPOT_SPACING_X = 120
+SPOT_SPACING_Y = 100
+CHUNK_COLS = 8    # Spots are generated and evicted a chunk of 8 x 8 at a time
+CHUNK_ROWS = 8
+CHUNK_MARGIN = 1  # Chunks kept loaded around the view; twice this far away they are evicted
+GROWTH_TICKS = 31 # Ticks per growth stage
+BLOOM_STAGE = 4   # A watered seed flowers after this many stages
+LARGE_GARDEN = (400, 250)  # Columns and rows for --large
+
+# Watering
+SPRINKLER_RADIUS = 150  # Sprinklers water every seed this close
+SPRINKLER_TICKS = 300   # once every 5 seconds
+SPRINKLER_GAP = 60      # No placing a sprinkler this close to another
+CAN_REACH = 250         # The watering can waters seeds this far in front of the bunny
+CAN_SPREAD = math.radians(30)  # and this far either side of straight ahead
+
+# Static layer
+TILE_SIZE = 256   # The ground, fence and dirt mounds are baked into tiles this big
+TILE_CACHE = 128  # Tiles kept baked; a couple of screens' worth
+
+# Butterflies
+BUTTERFLY_COLORS = [(255, 150, 200), (200, 150, 255), (255, 200, 100), (150, 200, 255)]
+FLOWER_SEARCH = 600  # How far a butterfly looks for flowers before settling for any flower at all
+FLOWER_CELL = 120    # Flower index cell size; about one flower per cell in a full garden
+FLOWER_CHOICES = 3   # Butterflies pick among this many nearest flowers, so they don't all crowd one
+
 class Particle:
     """Sparkle particles for planting/watering"""
     def __init__(self, x, y, color, going_up=True):
@@ -65,123 +109,610 @@ class Particle:
 
 class PlantSpot:
     """A spot where you can plant"""
-    def __init__(self, x, y):
+    def __init__(self, x, y, rng=random):
         self.x = x
         self.y = y
         self.state = "empty"  # empty, seed, growing, flower
-        self.color = random.choice(FLOWER_COLORS)
-        self.growth_timer = 0
-        self.growth_stage = 0
-        self.sway_offset = random.uniform(0, 2 * math.pi)
-        self.petals = random.randint(5, 8)
-        self.size = random.randint(15, 25)
+        self.color = rng.choice(FLOWER_COLORS)
+        self.watered_at = None  # Tick the seed was watered; growth is worked out from it
+        self.key = None  # (chunk x, chunk y, index in chunk), set by the garden
+        self.sway_offset = rng.uniform(0, 2 * math.pi)
+        self.petals = rng.randint(5, 8)
+        self.size = rng.randint(15, 25)
 
     def plant_seed(self):
         if self.state == "empty":
             self.state = "seed"
-            self.growth_timer = 0
             return True
         return False
 
-    def water(self):
+    def water(self, tick):
         if self.state == "seed":
             self.state = "growing"
-            self.growth_timer = 0
-            self.growth_stage = 0
+            self.watered_at = tick
             return True
         return False
 
-    def update(self):
-        if self.state == "growing":
-            self.growth_timer += 1
-            if self.growth_timer > 30:
-                self.growth_stage += 1
-                self.growth_timer = 0
-                if self.growth_stage >= 4:
-                    self.state = "flower"
+    def growth_stage(self, tick):
+        return min(BLOOM_STAGE, (tick - self.watered_at) // GROWTH_TICKS)
+
+    def bloom_tick(self):
+        return self.watered_at + BLOOM_STAGE * GROWTH_TICKS
 
     def draw(self, surface, camera_x, camera_y, time):
         screen_x = self.x - camera_x
         screen_y = self.y - camera_y
 
         if -50 < screen_x < SCREEN_WIDTH + 50 and -50 < screen_y < SCREEN_HEIGHT + 50:
-            # Dirt mound (always visible)
-            pygame.draw.ellipse(surface, DIRT_BROWN,
-                              (int(screen_x - 20), int(screen_y - 5), 40, 15))
-            pygame.draw.ellipse(surface, (160, 110, 80),
-                              (int(screen_x - 18), int(screen_y - 8), 36, 10))
-
-            if self.state == "empty":
-                # Show a little hole indicator
-                pygame.draw.ellipse(surface, (100, 60, 40),
-                                  (int(screen_x - 8), int(screen_y - 5), 16, 8))
-
-            elif self.state == "seed":
-                # Show seed
-                pygame.draw.ellipse(surface, (80, 50, 30),
-                                  (int(screen_x - 5), int(screen_y - 8), 10, 8))
-                # Water droplet indicator
-                pygame.draw.polygon(surface, (100, 180, 255), [
-                    (int(screen_x + 15), int(screen_y - 25)),
-                    (int(screen_x + 10), int(screen_y - 15)),
-                    (int(screen_x + 20), int(screen_y - 15)),
-                ])
+            self.draw_bed(surface, screen_x, screen_y)
+            self.draw_plant(surface, screen_x, screen_y, time)
+
+    def bed_rect(self):
+        # World rectangle draw_bed paints, mound, hole, seed and droplet
+        return self.x - 20, self.y - 25, self.x + 21, self.y + 10
+
+    def draw_bed(self, surface, screen_x, screen_y):
+        """The dirt mound and whatever sits in it: everything that only changes when the state does"""
+        # Dirt mound (always visible)
+        pygame.draw.ellipse(surface, DIRT_BROWN,
+                          (int(screen_x - 20), int(screen_y - 5), 40, 15))
+        pygame.draw.ellipse(surface, (160, 110, 80),
+                          (int(screen_x - 18), int(screen_y - 8), 36, 10))
 
-            elif self.state == "growing":
-                # Growing plant
-                stem_height = 10 + self.growth_stage * 15
-                pygame.draw.line(surface, (80, 160, 80),
-                               (int(screen_x), int(screen_y - 5)),
-                               (int(screen_x), int(screen_y - stem_height)), 3)
-                # Small leaves
-                if self.growth_stage >= 2:
-                    pygame.draw.ellipse(surface, (100, 180, 100),
-                                      (int(screen_x - 12), int(screen_y - stem_height + 10), 12, 8))
-                    pygame.draw.ellipse(surface, (100, 180, 100),
-                                      (int(screen_x), int(screen_y - stem_height + 15), 12, 8))
-                # Bud
-                if self.growth_stage >= 3:
-                    pygame.draw.circle(surface, self.color,
-                                     (int(screen_x), int(screen_y - stem_height)), 8)
-
-            elif self.state == "flower":
-                # Full flower with sway
-                sway = math.sin(time * 0.02 + self.sway_offset) * 3
-
-                # Stem
-                pygame.draw.line(surface, (80, 160, 80),
-                               (int(screen_x), int(screen_y - 5)),
-                               (int(screen_x + sway), int(screen_y - 60)), 4)
-
-                # Leaves
+        if self.state == "empty":
+            # Show a little hole indicator
+            pygame.draw.ellipse(surface, (100, 60, 40),
+                              (int(screen_x - 8), int(screen_y - 5), 16, 8))
+
+        elif self.state == "seed":
+            # Show seed
+            pygame.draw.ellipse(surface, (80, 50, 30),
+                              (int(screen_x - 5), int(screen_y - 8), 10, 8))
+            # Water droplet indicator
+            pygame.draw.polygon(surface, (100, 180, 255), [
+                (int(screen_x + 15), int(screen_y - 25)),
+                (int(screen_x + 10), int(screen_y - 15)),
+                (int(screen_x + 20), int(screen_y - 15)),
+            ])
+
+    def draw_plant(self, surface, screen_x, screen_y, time):
+        """The growing plant or swaying flower, which animate"""
+        if self.state == "growing":
+            # Growing plant
+            growth_stage = self.growth_stage(time)
+            stem_height = 10 + growth_stage * 15
+            pygame.draw.line(surface, (80, 160, 80),
+                           (int(screen_x), int(screen_y - 5)),
+                           (int(screen_x), int(screen_y - stem_height)), 3)
+            # Small leaves
+            if growth_stage >= 2:
                 pygame.draw.ellipse(surface, (100, 180, 100),
-                                  (int(screen_x - 15 + sway * 0.3), int(screen_y - 35), 15, 10))
+                                  (int(screen_x - 12), int(screen_y - stem_height + 10), 12, 8))
                 pygame.draw.ellipse(surface, (100, 180, 100),
-                                  (int(screen_x + sway * 0.3), int(screen_y - 45), 15, 10))
-
-                # Flower petals
-                flower_x = screen_x + sway
-                flower_y = screen_y - 60
-                for i in range(self.petals):
-                    angle = (2 * math.pi * i / self.petals) + time * 0.005
-                    petal_x = flower_x + math.cos(angle) * self.size
-                    petal_y = flower_y + math.sin(angle) * self.size
-                    pygame.draw.circle(surface, self.color,
-                                     (int(petal_x), int(petal_y)), self.size // 2)
-
-                # Center
-                pygame.draw.circle(surface, SUN_YELLOW,
-                                 (int(flower_x), int(flower_y)), self.size // 3)
-
-    def is_near(self, x, y, radius=40):
+                                  (int(screen_x), int(screen_y - stem_height + 15), 12, 8))
+            # Bud
+            if growth_stage >= 3:
+                pygame.draw.circle(surface, self.color,
+                                 (int(screen_x), int(screen_y - stem_height)), 8)
+
+        elif self.state == "flower":
+            # Full flower with sway: a stem sprite and a blossom sprite from the cache
+            sway = math.sin(time * 0.02 + self.sway_offset) * 3
+            step, sway = phase(time * 0.005, self.petals, sway)
+            x, y = int(screen_x), int(screen_y)
+            stem, (anchor_x, anchor_y) = flower_sprites.get(('garden stem', sway), stem_sprite, sway)
+            surface.blit(stem, (x - anchor_x, y - anchor_y))
+            blossom, (anchor_x, anchor_y) = flower_sprites.blossom(self.petals, self.size, self.color, step, SUN_YELLOW)
+            surface.blit(blossom, (x + sway - anchor_x, y - 60 - anchor_y))
+
+    def is_near(self, x, y, radius=SPOT_REACH):
         return math.sqrt((self.x - x) ** 2 + (self.y - y) ** 2) < radius
 
+def stem_sprite(sway):
+    """A blooming flower's stem and leaves, anchored at its spot"""
+    sprite = sprite_surface(36, 64)
+    x, y = 18, 64
+    pygame.draw.line(sprite, (80, 160, 80), (x, y - 5), (x + sway, y - 60), 4)
+    pygame.draw.ellipse(sprite, (100, 180, 100), (int(x - 15 + sway * 0.3), y - 35, 15, 10))
+    pygame.draw.ellipse(sprite, (100, 180, 100), (int(x + sway * 0.3), y - 45, 15, 10))
+    return sprite, (x, y)
+
+class Sprinkler:
+    """Waters every seed around it, every few seconds"""
+    def __init__(self, x, y, radius=SPRINKLER_RADIUS, interval=SPRINKLER_TICKS):
+        self.x = x
+        self.y = y
+        self.radius = radius
+        self.interval = interval
+        self.sprayed_at = None  # Tick of the last spray, for the spray animation
+        self.watered = 0
+
+    def draw(self, surface, screen_x, screen_y, time):
+        # Spray: a ring of droplets spreading out to the radius
+        if self.sprayed_at is not None and time - self.sprayed_at < 40:
+            spread = (time - self.sprayed_at) / 40
+            ring = int(self.radius * spread)
+            for i in range(16):
+                angle = i * math.pi / 8 + spread
+                pygame.draw.circle(surface, (100, 180, 255),
+                                   (int(screen_x + math.cos(angle) * ring),
+                                    int(screen_y + math.sin(angle) * ring)), 3)
+        # Post and head
+        pygame.draw.rect(surface, (120, 120, 130), (int(screen_x - 3), int(screen_y - 30), 6, 30))
+        pygame.draw.circle(surface, (100, 180, 255), (int(screen_x), int(screen_y - 32)), 7)
+        pygame.draw.circle(surface, WHITE, (int(screen_x - 2), int(screen_y - 34)), 2)
+
+class SpotIndex:
+    """Plant spots bucketed by grid cell, so finding the spots near a point
+    only looks at the few cells around it however big the garden is"""
+    def __init__(self, cell_size=SPOT_CELL):
+        self.cell_size = cell_size
+        self.cells = {}  # (col, row) -> spots in that cell
+        self.count = 0
+
+    def __len__(self):
+        return self.count
+
+    def cell(self, x, y):
+        return int(x // self.cell_size), int(y // self.cell_size)
+
+    def add(self, spot):
+        self.cells.setdefault(self.cell(spot.x, spot.y), []).append(spot)
+        self.count += 1
+
+    def remove(self, spot):
+        key = self.cell(spot.x, spot.y)
+        bucket = self.cells[key]
+        bucket.remove(spot)
+        if not bucket:
+            del self.cells[key]
+        self.count -= 1
+
+    def within(self, x, y, radius):
+        """Every spot closer than radius to (x, y), nearest first"""
+        size = self.cell_size
+        found = []
+        r2 = radius * radius
+        for col in range(int((x - radius) // size), int((x + radius) // size) + 1):
+            for row in range(int((y - radius) // size), int((y + radius) // size) + 1):
+                for spot in self.cells.get((col, row), ()):
+                    d2 = (spot.x - x) ** 2 + (spot.y - y) ** 2
+                    if d2 < r2:
+                        found.append((d2, spot))
+        found.sort(key=lambda pair: pair[0])
+        return [spot for d2, spot in found]
+
+    def in_rect(self, left, top, right, bottom):
+        """Every spot with its position inside a world rectangle"""
+        size = self.cell_size
+        for col in range(int(left // size), int(right // size) + 1):
+            for row in range(int(top // size), int(bottom // size) + 1):
+                for spot in self.cells.get((col, row), ()):
+                    if left <= spot.x < right and top <= spot.y < bottom:
+                        yield spot
+
+    def in_circle(self, x, y, radius):
+        """Every spot closer than radius to (x, y), in no particular order"""
+        size = self.cell_size
+        r2 = radius * radius
+        for col in range(int((x - radius) // size), int((x + radius) // size) + 1):
+            for row in range(int((y - radius) // size), int((y + radius) // size) + 1):
+                for spot in self.cells.get((col, row), ()):
+                    if (spot.x - x) ** 2 + (spot.y - y) ** 2 < r2:
+                        yield spot
+
+    def in_cone(self, x, y, angle, spread, radius):
+        """Every spot closer than radius to (x, y) and within spread radians of the direction angle"""
+        ax, ay = math.cos(angle), math.sin(angle)
+        cos_spread = math.cos(spread)
+        for spot in self.in_circle(x, y, radius):
+            dx, dy = spot.x - x, spot.y - y
+            # Inside the cone when the angle between (dx, dy) and the axis is under spread
+            along = dx * ax + dy * ay
+            if along > 0 and along * along >= cos_spread * cos_spread * (dx * dx + dy * dy):
+                yield spot
+
+    def nearest(self, x, y, radius=SPOT_REACH):
+        """The closest spot within radius, or None"""
+        spots = self.within(x, y, radius)
+        return spots[0] if spots else None
+
+    def nearest_few(self, x, y, count, radius):
+        """Up to count of the closest spots within radius, nearest first.
+        Searches outward a ring of cells at a time and stops once nothing farther out can be closer"""
+        col, row = self.cell(x, y)
+        cells = self.cells
+        r2 = radius * radius
+        found = []
+        ring = 0
+        while True:
+            if ring == 0:
+                keys = [(col, row)]
+            else:
+                keys = [(c, r) for c in range(col - ring, col + ring + 1) for r in (row - ring, row + ring)]
+                keys += [(c, r) for c in (col - ring, col + ring) for r in range(row - ring + 1, row + ring)]
+            for key in keys:
+                for spot in cells.get(key, ()):
+                    d2 = (spot.x - x) ** 2 + (spot.y - y) ** 2
+                    if d2 < r2:
+                        found.append((d2, spot))
+            # Every spot outside this ring is at least this far away
+            clear = ring * self.cell_size
+            if clear >= radius:
+                break
+            if len(found) >= count:
+                found.sort(key=lambda pair: pair[0])
+                if found[count - 1][0] <= clear * clear:
+                    break
+            ring += 1
+        found.sort(key=lambda pair: pair[0])
+        return [spot for d2, spot in found[:count]]
+
+class Garden:
+    """A grid of plant spots generated a chunk at a time from the seed as the bunny nears it.
+    Far-away chunks are evicted, keeping only the spots that were planted, and regenerate
+    exactly when they come back. Watered seeds wait on a heap of bloom times, so nothing
+    has to tick the plants every frame"""
+    def __init__(self, seed, cols, rows, origin_x, origin_y):
+        self.seed = seed
+        self.cols = cols
+        self.rows = rows
+        self.origin_x = origin_x
+        self.origin_y = origin_y
+        self.chunk_width = CHUNK_COLS * SPOT_SPACING_X
+        self.chunk_height = CHUNK_ROWS * SPOT_SPACING_Y
+        self.chunks_x = -(-cols // CHUNK_COLS)
+        self.chunks_y = -(-rows // CHUNK_ROWS)
+        self.chunks = {}  # (cx, cy) -> spots, for loaded chunks
+        self.saved = {}   # (cx, cy) -> {i: (state, watered at)} for evicted chunks with plants
+        self.blooms = []  # (bloom tick, spot key) for every growing plant, loaded or not
+        self.flowers = 0
+        self.index = SpotIndex()
+        self.flowering = SpotSet()  # Loaded flowers, for butterflies to visit
+        self.flower_index = SpotIndex(FLOWER_CELL)
+        self.changed = []  # World rectangles whose look changed, for the static layer to redraw
+        self.loads = 0
+        self.sprinklers = []
+        self.sprinkler_index = SpotIndex(SPRINKLER_RADIUS)
+        self.sprays = []  # (next spray tick, sprinkler number), so only the sprinklers due do anything
+        self.pinned = {}  # (cx, cy) -> sprinklers over it; kept loaded, so their seeds are in the index
+
+    def __len__(self):
+        return self.cols * self.rows
+
+    def width(self):
+        return self.origin_x + self.cols * SPOT_SPACING_X
+
+    def height(self):
+        return self.origin_y + self.rows * SPOT_SPACING_Y
+
+    def chunk_rect(self, cx, cy):
+        # Half a spacing either side of the spots, which covers their jitter
+        left = self.origin_x - SPOT_SPACING_X // 2 + cx * self.chunk_width
+        top = self.origin_y - SPOT_SPACING_Y // 2 + cy * self.chunk_height
+        return left, top, left + self.chunk_width, top + self.chunk_height
+
+    def chunk_range(self, left, top, right, bottom, margin=0):
+        # Chunks overlapping a world rectangle, plus margin chunks around it, clipped to the garden
+        x0 = self.origin_x - SPOT_SPACING_X // 2
+        y0 = self.origin_y - SPOT_SPACING_Y // 2
+        cx0 = max(0, int((left - x0) // self.chunk_width) - margin)
+        cx1 = min(self.chunks_x - 1, int((right - x0) // self.chunk_width) + margin)
+        cy0 = max(0, int((top - y0) // self.chunk_height) - margin)
+        cy1 = min(self.chunks_y - 1, int((bottom - y0) // self.chunk_height) + margin)
+        return cx0, cy0, cx1, cy1
+
+    def generate(self, cx, cy):
+        """The spots of a chunk as first planted; the same every time for the same seed"""
+        rng = random.Random(f"{self.seed}:{cx}:{cy}")
+        spots = []
+        for row in range(cy * CHUNK_ROWS, min(self.rows, (cy + 1) * CHUNK_ROWS)):
+            for col in range(cx * CHUNK_COLS, min(self.cols, (cx + 1) * CHUNK_COLS)):
+                x = self.origin_x + col * SPOT_SPACING_X + rng.randint(-20, 20)
+                y = self.origin_y + row * SPOT_SPACING_Y + rng.randint(-15, 15)
+                spot = PlantSpot(x, y, rng)
+                spot.key = (cx, cy, len(spots))
+                spots.append(spot)
+        return spots
+
+    def load(self, cx, cy):
+        spots = self.generate(cx, cy)
+        for i, (state, watered_at) in self.saved.pop((cx, cy), {}).items():
+            spots[i].state, spots[i].watered_at = state, watered_at
+        for spot in spots:
+            self.index.add(spot)
+            if spot.state == "flower":
+                self.add_flower(spot)
+        self.chunks[cx, cy] = spots
+        self.loads += 1
+
+    def evict(self, cx, cy):
+        spots = self.chunks.pop((cx, cy))
+        changes = {}
+        for i, spot in enumerate(spots):
+            self.index.remove(spot)
+            if spot in self.flowering:
+                self.remove_flower(spot)
+            if spot.state != "empty":
+                changes[i] = (spot.state, spot.watered_at)
+        if changes:
+            self.saved[cx, cy] = changes
+
+    def plant(self, spot):
+        if spot.plant_seed():
+            self.changed.append(spot.bed_rect())
+            return True
+        return False
+
+    def water(self, spot, tick):
+        if spot.water(tick):
+            heapq.heappush(self.blooms, (spot.bloom_tick(), spot.key))
+            self.changed.append(spot.bed_rect())
+            return True
+        return False
+
+    def bloom(self, tick):
+        """Turn every plant due by tick into a flower, loaded or not. Returns how many bloomed"""
+        bloomed = 0
+        while self.blooms and self.blooms[0][0] <= tick:
+            due, (cx, cy, i) = heapq.heappop(self.blooms)
+            spots = self.chunks.get((cx, cy))
+            if spots:
+                spots[i].state = "flower"
+                self.add_flower(spots[i])
+            else:
+                self.saved[cx, cy][i] = ("flower", self.saved[cx, cy][i][1])
+            bloomed += 1
+        self.flowers += bloomed
+        return bloomed
+
+    def add_sprinkler(self, x, y, tick):
+        """Place a sprinkler, which sprays at tick and every interval after. Its chunks stay loaded from now on"""
+        sprinkler = Sprinkler(x, y)
+        radius = sprinkler.radius
+        cx0, cy0, cx1, cy1 = self.chunk_range(x - radius, y - radius, x + radius, y + radius)
+        for cy in range(cy0, cy1 + 1):
+            for cx in range(cx0, cx1 + 1):
+                if (cx, cy) not in self.chunks:
+                    self.load(cx, cy)
+                self.pinned[cx, cy] = self.pinned.get((cx, cy), 0) + 1
+        heapq.heappush(self.sprays, (tick, len(self.sprinklers)))
+        self.sprinklers.append(sprinkler)
+        self.sprinkler_index.add(sprinkler)
+        return sprinkler
+
+    def sprinkle(self, tick):
+        """Spray every sprinkler due by tick. Returns the ones that sprayed"""
+        sprayed = []
+        while self.sprays and self.sprays[0][0] <= tick:
+            due, number = heapq.heappop(self.sprays)
+            sprinkler = self.sprinklers[number]
+            for spot in self.index.in_circle(sprinkler.x, sprinkler.y, sprinkler.radius):
+                if self.water(spot, due):
+                    sprinkler.watered += 1
+            sprinkler.sprayed_at = due
+            heapq.heappush(self.sprays, (due + sprinkler.interval, number))
+            sprayed.append(sprinkler)
+        return sprayed
+
+    def water_cone(self, x, y, angle, tick):
+        """Water every seed in the watering can's cone from (x, y) toward angle. Returns the spots watered"""
+        return [spot for spot in self.index.in_cone(x, y, angle, CAN_SPREAD, CAN_REACH) if self.water(spot, tick)]
+
+    def add_flower(self, spot):
+        self.flowering.add(spot)
+        self.flower_index.add(spot)
+
+    def remove_flower(self, spot):
+        # For flowers that go away: evicted now, wilted or picked one day
+        self.flowering.discard(spot)
+        self.flower_index.remove(spot)
+
+    def flower_for(self, x, y, rng=random):
+        """A flower for a butterfly at (x, y) to visit: one of the nearest few, or any flower if none are close"""
+        near = self.flower_index.nearest_few(x, y, FLOWER_CHOICES, FLOWER_SEARCH)
+        if near:
+            return rng.choice(near)
+        if self.flowering:
+            return self.flowering.choice(rng)
+        return None
+
+    def stream(self, left, top, right, bottom):
+        """Load the chunks around a view rectangle and evict the ones well away from it"""
+        cx0, cy0, cx1, cy1 = self.chunk_range(left, top, right, bottom, CHUNK_MARGIN)
+        for cy in range(cy0, cy1 + 1):
+            for cx in range(cx0, cx1 + 1):
+                if (cx, cy) not in self.chunks:
+                    self.load(cx, cy)
+        kx0, ky0, kx1, ky1 = self.chunk_range(left, top, right, bottom, CHUNK_MARGIN * 2)
+        for cx, cy in list(self.chunks):
+            if not (kx0 <= cx <= kx1 and ky0 <= cy <= ky1) and (cx, cy) not in self.pinned:
+                self.evict(cx, cy)
+
+    def visible(self, left, top, right, bottom):
+        # Loaded spots in chunks overlapping a world rectangle, top chunks first so nearer plants overlap farther ones
+        cx0, cy0, cx1, cy1 = self.chunk_range(left, top, right, bottom)
+        for cy in range(cy0, cy1 + 1):
+            for cx in range(cx0, cx1 + 1):
+                yield from self.chunks.get((cx, cy), ())
+
+    def snapshot(self):
+        """Every spot that isn't empty, as {(cx, cy): {i: (state, watered at)}}. A copy, so it can be
+        saved while the game carries on"""
+        spots = {chunk: dict(changes) for chunk, changes in self.saved.items()}
+        for chunk, chunk_spots in self.chunks.items():
+            changes = {i: (spot.state, spot.watered_at) for i, spot in enumerate(chunk_spots) if spot.state != "empty"}
+            if changes:
+                spots[chunk] = changes
+        return spots
+
+    def restore(self, spots):
+        """Plant the spots from a snapshot in a garden that has no chunks loaded yet"""
+        self.saved = spots
+        self.blooms = []
+        self.flowers = 0
+        for (cx, cy), changes in spots.items():
+            for i, (state, watered_at) in changes.items():
+                if state == "growing":
+                    self.blooms.append((watered_at + BLOOM_STAGE * GROWTH_TICKS, (cx, cy, i)))
+                elif state == "flower":
+                    self.flowers += 1
+        heapq.heapify(self.blooms)
+
+class SpotSet:
+    """Spots in a list with each one's position in a dict, for O(1) add, remove and random pick"""
+    def __init__(self):
+        self.items = []
+        self.positions = {}
+
+    def __len__(self):
+        return len(self.items)
+
+    def __contains__(self, spot):
+        return spot in self.positions
+
+    def __iter__(self):
+        return iter(self.items)
+
+    def add(self, spot):
+        if spot not in self.positions:
+            self.positions[spot] = len(self.items)
+            self.items.append(spot)
+
+    def discard(self, spot):
+        i = self.positions.pop(spot, None)
+        if i is None:
+            return
+        # Move the last spot into the gap
+        last = self.items.pop()
+        if last is not spot:
+            self.items[i] = last
+            self.positions[last] = i
+
+    def choice(self, rng=random):
+        return self.items[rng.randrange(len(self.items))]
+
+class StaticLayer:
+    """The ground, fence and dirt mounds baked into world tiles and blitted by camera offset.
+    A tile is only baked again when a spot in it changes how its bed looks. The grass is a
+    run-length encoded color key, so blitting a tile only copies its fence and bed pixels"""
+    def __init__(self, garden, world_width, world_height, ground_y):
+        self.garden = garden
+        self.world_width = world_width
+        self.world_height = world_height
+        self.ground_y = ground_y  # Tile rows start here; above it is sky
+        self.tiles = {}  # (col, row) -> baked surface, least recently drawn first
+        self.bakes = 0
+
+    def tile_range(self, left, top, right, bottom):
+        # Tiles overlapping a world rectangle, clipped to the ground
+        col0 = max(0, int(left // TILE_SIZE))
+        col1 = min(int((self.world_width - 1) // TILE_SIZE), int((right - 1) // TILE_SIZE))
+        row0 = max(0, int((top - self.ground_y) // TILE_SIZE))
+        row1 = min(int((self.world_height - self.ground_y - 1) // TILE_SIZE),
+                   int((bottom - 1 - self.ground_y) // TILE_SIZE))
+        return col0, row0, col1, row1
+
+    def invalidate(self, left, top, right, bottom):
+        col0, row0, col1, row1 = self.tile_range(left, top, right, bottom)
+        for row in range(row0, row1 + 1):
+            for col in range(col0, col1 + 1):
+                self.tiles.pop((col, row), None)
+
+    def bake(self, col, row):
+        left = col * TILE_SIZE
+        top = self.ground_y + row * TILE_SIZE
+        tile = pygame.Surface((TILE_SIZE, TILE_SIZE)).convert()
+        tile.fill(GRASS_GREEN)
+
+        # Fence at top of garden
+        fence_y = self.ground_y + 50 - top
+        if -40 < fence_y < TILE_SIZE + 15:
+            for x in range(left - left % 40 - 40, left + TILE_SIZE, 40):
+                pygame.draw.rect(tile, (160, 120, 80), (x - left, fence_y, 8, 40))
+                pygame.draw.polygon(tile, (160, 120, 80), [
+                    (x - left, fence_y),
+                    (x - left + 4, fence_y - 15),
+                    (x - left + 8, fence_y)
+                ])
+            pygame.draw.rect(tile, (140, 100, 60), (0, fence_y + 10, TILE_SIZE, 6))
+            pygame.draw.rect(tile, (140, 100, 60), (0, fence_y + 30, TILE_SIZE, 6))
+
+        # Spot beds reaching into the tile; bed_rect is within 25 px of a spot. Chunks load a whole
+        # chunk beyond the view, so a tile in view never misses a bed, and evicted chunks come back the same
+        for spot in self.garden.index.in_rect(left - 25, top - 25, left + TILE_SIZE + 25, top + TILE_SIZE + 25):
+            spot.draw_bed(tile, spot.x - left, spot.y - top)
+        tile.set_colorkey(GRASS_GREEN, pygame.RLEACCEL)
+        self.bakes += 1
+        return tile
+
+    def draw(self, surface, camera_x, camera_y):
+        for rect in self.garden.changed:
+            self.invalidate(*rect)
+        self.garden.changed.clear()
+
+        width, height = surface.get_size()
+        surface.fill(GRASS_GREEN, (0, self.ground_y - camera_y, width, height))
+        col0, row0, col1, row1 = self.tile_range(camera_x, camera_y, camera_x + width, camera_y + height)
+        tiles = self.tiles
+        for row in range(row0, row1 + 1):
+            for col in range(col0, col1 + 1):
+                # Take it out and put it back, so the dict stays in drawing order
+                tile = tiles.pop((col, row), None) or self.bake(col, row)
+                tiles[col, row] = tile
+                surface.blit(tile, (col * TILE_SIZE - camera_x, self.ground_y + row * TILE_SIZE - camera_y))
+        while len(tiles) > TILE_CACHE:
+            del tiles[next(iter(tiles))]
+
+def plant_near(garden, x, y, particles, sound):
+    # Plants the nearest empty spot in reach
+    for spot in garden.index.within(x, y, SPOT_REACH):
+        if garden.plant(spot):
+            for _ in range(8):
+                particles.append(Particle(spot.x, spot.y - 10, DIRT_BROWN, False))
+            if sound:
+                sound.play()
+            return spot
+    return None
+
+def water_near(garden, x, y, tick, particles, sound):
+    # Waters the nearest seed in reach
+    for spot in garden.index.within(x, y, SPOT_REACH):
+        if garden.water(spot, tick):
+            for _ in range(10):
+                particles.append(Particle(spot.x, spot.y - 20, (100, 180, 255), True))
+            if sound:
+                sound.play()
+            return spot
+    return None
+
+def water_can(garden, x, y, facing_right, tick, particles, sound):
+    # Waters the seeds in the cone in front of the bunny, and the nearest seed in reach whichever side it's on
+    watered = garden.water_cone(x, y, 0.0 if facing_right else math.pi, tick)
+    for spot in watered:
+        for _ in range(10):
+            particles.append(Particle(spot.x, spot.y - 20, (100, 180, 255), True))
+    nearest = water_near(garden, x, y, tick, particles, None)
+    if nearest:
+        watered.append(nearest)
+    if watered and sound:
+        sound.play()
+    return watered
+
+def place_sprinkler(garden, x, y, tick, sound):
+    # Puts a sprinkler down at the bunny's feet, unless there's one there already
+    if garden.sprinkler_index.nearest(x, y, SPRINKLER_GAP):
+        return None
+    if sound:
+        sound.play()
+    return garden.add_sprinkler(x, y, tick)
+
 class Butterfly:
     """Butterflies attracted to flowers"""
     def __init__(self, x, y):
         self.x = x
         self.y = y
-        self.color = random.choice([(255, 150, 200), (200, 150, 255), (255, 200, 100), (150, 200, 255)])
+        self.color = random.choice(BUTTERFLY_COLORS)
         self.time = random.uniform(0, 2 * math.pi)
         self.wing_speed = random.uniform(0.2, 0.35)
         self.target_x = x
@@ -207,22 +738,71 @@ class Butterfly:
         # Flutter
         self.y += math.sin(self.time * 0.1) * 0.5
 
-    def draw(self, surface, camera_x, camera_y):
+    def draw(self, queue, camera_x, camera_y):
         screen_x = self.x - camera_x
         screen_y = self.y - camera_y
 
         if -30 < screen_x < SCREEN_WIDTH + 30 and -30 < screen_y < SCREEN_HEIGHT + 30:
             wing_flap = abs(math.sin(self.time * self.wing_speed))
             wing_size = int(10 * wing_flap) + 5
-
-            # Wings
-            pygame.draw.ellipse(surface, self.color,
-                              (int(screen_x - wing_size - 2), int(screen_y - 5), wing_size, 10))
-            pygame.draw.ellipse(surface, self.color,
-                              (int(screen_x + 2), int(screen_y - 5), wing_size, 10))
-            # Body
-            pygame.draw.ellipse(surface, (50, 50, 50),
-                              (int(screen_x - 2), int(screen_y - 6), 4, 12))
+            sprite = butterfly_sprite(self.color, wing_size)
+            queue.submit(sprite, (int(screen_x) - wing_size - 3, int(screen_y) - 7))
+
+def draw_flock(flock, queue, camera_x, camera_y):
+    """Every flock butterfly on screen, drawn like Butterfly.draw"""
+    table = flock.table
+    rows = flock.visible(camera_x - 30, camera_y - 30, camera_x + SCREEN_WIDTH + 30, camera_y + SCREEN_HEIGHT + 30)
+    screen_x = (table['x'][rows] - camera_x).astype(int)
+    screen_y = (table['y'][rows] - camera_y).astype(int)
+    wing_size = (10 * abs(np.sin(table['time'][rows] * table['wing_speed'][rows]))).astype(int) + 5
+    for x, y, color, wing in zip(screen_x.tolist(), screen_y.tolist(), table['color'][rows].tolist(), wing_size.tolist()):
+        queue.submit(butterfly_sprite(BUTTERFLY_COLORS[color], wing), (x - wing - 3, y - 7))
+
+butterfly_sprites = {}
+
+def butterfly_columns(butterflies, flock):
+    """The butterflies, flocking or not, as columns for a save"""
+    if flock is not None:
+        table = flock.table
+        return {name: table[name].copy() for name in BUTTERFLY_COLUMNS}
+    return {'x': np.array([b.x for b in butterflies], float), 'y': np.array([b.y for b in butterflies], float),
+            'target_x': np.array([b.target_x for b in butterflies], float),
+            'target_y': np.array([b.target_y for b in butterflies], float),
+            'time': np.array([b.time for b in butterflies], float),
+            'wing_speed': np.array([b.wing_speed for b in butterflies], float),
+            'color': np.array([BUTTERFLY_COLORS.index(b.color) for b in butterflies], np.uint8),
+            'has_target': np.ones(len(butterflies), np.bool_)}
+
+def restore_butterflies(columns, butterflies, flock):
+    """Bring back saved butterflies, into the flock if there is one"""
+    if flock is not None:
+        first = len(flock)
+        flock.add_many(columns['x'], columns['y'], columns['color'], columns['wing_speed'], columns['time'])
+        for name in ('target_x', 'target_y', 'has_target'):
+            flock.table[name][first:] = columns[name]
+        return
+    for x, y, target_x, target_y, time, wing_speed, color in zip(
+            *(columns[name].tolist() for name in ('x', 'y', 'target_x', 'target_y', 'time', 'wing_speed', 'color'))):
+        butterfly = Butterfly(x, y)
+        butterfly.target_x, butterfly.target_y = target_x, target_y
+        butterfly.time, butterfly.wing_speed = time, wing_speed
+        butterfly.color = BUTTERFLY_COLORS[color]
+        butterflies.append(butterfly)
+
+def butterfly_sprite(color, wing_size):
+    """One cached sprite per color and wing flap size"""
+    key = (color, wing_size)
+    sprite = butterfly_sprites.get(key)
+    if sprite is None:
+        c = wing_size + 3
+        sprite = pygame.Surface((c * 2, 14), pygame.SRCALPHA)
+        # Wings
+        pygame.draw.ellipse(sprite, color, (c - wing_size - 2, 2, wing_size, 10))
+        pygame.draw.ellipse(sprite, color, (c + 2, 2, wing_size, 10))
+        # Body
+        pygame.draw.ellipse(sprite, (50, 50, 50), (c - 2, 1, 4, 12))
+        sprite = butterfly_sprites[key] = sprite.convert_alpha()
+    return sprite
 
 class Cloud:
     """Background clouds"""
@@ -231,19 +811,30 @@ class Cloud:
         self.y = random.randint(30, 150)
         self.speed = random.uniform(0.1, 0.3)
         self.size = random.uniform(0.7, 1.3)
+        self.sprite = self.make_sprite()
+
+    def make_sprite(self):
+        size = int(40 * self.size)
+        # Puffs reach 1.35 sizes left/right and 0.7 sizes + 8 below the center
+        cx = int(size * 1.35) + 1
+        cy = size + 1
+        sprite = pygame.Surface((cx * 2, cy + int(size * 0.7) + 10), pygame.SRCALPHA)
+        pygame.draw.circle(sprite, WHITE, (cx, cy), size)
+        pygame.draw.circle(sprite, WHITE, (int(cx - size * 0.6), cy + 8), int(size * 0.7))
+        pygame.draw.circle(sprite, WHITE, (int(cx + size * 0.6), cy + 5), int(size * 0.75))
+        self.sprite_offset = (cx, cy)
+        return sprite.convert_alpha()
 
     def update(self):
         self.x += self.speed
 
-    def draw(self, surface, camera_x):
+    def draw(self, queue, camera_x):
         screen_x = self.x - camera_x * 0.2  # Parallax
         if screen_x > SCREEN_WIDTH + 100:
             self.x -= SCREEN_WIDTH + 200
 
-        size = int(40 * self.size)
-        pygame.draw.circle(surface, WHITE, (int(screen_x), int(self.y)), size)
-        pygame.draw.circle(surface, WHITE, (int(screen_x - size * 0.6), int(self.y + 8)), int(size * 0.7))
-        pygame.draw.circle(surface, WHITE, (int(screen_x + size * 0.6), int(self.y + 5)), int(size * 0.75))
+        ox, oy = self.sprite_offset
+        queue.submit(self.sprite, (int(screen_x) - ox, int(self.y) - oy))
 
 class Character:
     """Gardener bunny"""
@@ -364,30 +955,64 @@ def create_water_sound():
     except:
         return None
 
+def snapshot(garden, tick, character, butterflies, flock):
+    return Snapshot(garden.seed, garden.cols, garden.rows, garden.origin_x, garden.origin_y, tick,
+                    character.x, character.y, garden.snapshot(), butterfly_columns(butterflies, flock),
+                    np.array([(sprinkler.x, sprinkler.y) for sprinkler in garden.sprinklers], float).reshape(-1, 2))
+
 def main():
+    parser = argparse.ArgumentParser(description="Garden Grower")
+    parser.add_argument('--large', action='store_true',
+                        help=f"a {LARGE_GARDEN[0] * LARGE_GARDEN[1]:,} plot garden, generated as you explore it")
+    parser.add_argument('--seed', type=int, help="garden layout seed (default: a new garden each time)")
+    parser.add_argument('--flock', action='store_true', help="butterflies flock together on their way to flowers")
+    parser.add_argument('--save', metavar='PATH', help="where the garden is autosaved (default: saves/ next to the game)")
+    parser.add_argument('--new', action='store_true', help="start a new garden instead of carrying on the saved one")
+    args = parser.parse_args()
+
     clock = pygame.time.Clock()
 
-    # World size
-    WORLD_WIDTH = SCREEN_WIDTH * 2
-    WORLD_HEIGHT = int(SCREEN_HEIGHT * 1.5)
+    # Carry on the saved garden, unless asked for a new one or a particular layout
+    save_path = args.save or default_path(args.large)
+    saved = None
+    if not args.new and args.seed is None and os.path.exists(save_path):
+        try:
+            saved = read_save(save_path)
+        except (OSError, ValueError, KeyError) as error:
+            print(f"Couldn't load {save_path}, starting a new garden: {error}")
+
+    # Create planting spots in a grid pattern
     GROUND_Y = SCREEN_HEIGHT // 2
+    if saved:
+        garden = Garden(saved.seed, saved.cols, saved.rows, saved.origin_x, saved.origin_y)
+        garden.restore(saved.spots)
+        for x, y in saved.sprinklers.tolist():
+            garden.add_sprinkler(x, y, saved.tick)
+    else:
+        cols, rows = LARGE_GARDEN if args.large else (12, 6)
+        seed = args.seed if args.seed is not None else random.randrange(1 << 30)
+        garden = Garden(seed, cols, rows, 150, GROUND_Y + 100)
+    spot_index = garden.index
+    day = DayCycle(SKY_BLUE, SCREEN_WIDTH, SCREEN_HEIGHT, seed=garden.seed)
+
+    # World size
+    WORLD_WIDTH = max(SCREEN_WIDTH * 2, garden.width() + 100)
+    WORLD_HEIGHT = max(int(SCREEN_HEIGHT * 1.5), garden.height() + 50)
+    static_layer = StaticLayer(garden, WORLD_WIDTH, WORLD_HEIGHT, GROUND_Y)
 
     # Create character
     character = Character(WORLD_WIDTH // 2, WORLD_HEIGHT // 2)
 
-    # Create planting spots in a grid pattern
-    plant_spots = []
-    spot_spacing = 120
-    for row in range(6):
-        for col in range(12):
-            x = 150 + col * spot_spacing + random.randint(-20, 20)
-            y = GROUND_Y + 100 + row * 100 + random.randint(-15, 15)
-            plant_spots.append(PlantSpot(x, y))
-
     butterflies = []
+    flock = Flock(max_speed=2.0) if args.flock else None
     particles = []
     clouds = [Cloud() for _ in range(8)]
     time_counter = 0
+    if saved:
+        character.x, character.y = saved.bunny_x, saved.bunny_y
+        restore_butterflies(saved.butterflies, butterflies, flock)
+        time_counter = saved.tick
+    autosaver = Autosaver(save_path)
 
     # Sounds
     plant_sound = create_plant_sound()
@@ -414,9 +1039,11 @@ def main():
     running = True
     a_button_pressed = False
     b_button_pressed = False
+    y_button_pressed = False
 
     # Stats
-    flowers_grown = 0
+    render_queue = RenderQueue()
+    show_stats = False
 
     while running:
         time_counter += 1
@@ -428,26 +1055,17 @@ def main():
             elif event.type == pygame.KEYDOWN:
                 if event.key == pygame.K_ESCAPE:
                     running = False
+                elif event.key == pygame.K_F3:
+                    show_stats = not show_stats
                 elif event.key == pygame.K_SPACE or event.key == pygame.K_z:
                     # Plant seed
-                    for spot in plant_spots:
-                        if spot.is_near(character.x, character.y):
-                            if spot.plant_seed():
-                                for _ in range(8):
-                                    particles.append(Particle(spot.x, spot.y - 10, DIRT_BROWN, False))
-                                if plant_sound:
-                                    plant_sound.play()
-                                break
+                    plant_near(garden, character.x, character.y, particles, plant_sound)
                 elif event.key == pygame.K_x or event.key == pygame.K_RETURN:
-                    # Water plant
-                    for spot in plant_spots:
-                        if spot.is_near(character.x, character.y):
-                            if spot.water():
-                                for _ in range(10):
-                                    particles.append(Particle(spot.x, spot.y - 20, (100, 180, 255), True))
-                                if water_sound:
-                                    water_sound.play()
-                                break
+                    # Water plants with the watering can
+                    water_can(garden, character.x, character.y, character.facing_right, time_counter,
+                              particles, water_sound)
+                elif event.key == pygame.K_c:
+                    place_sprinkler(garden, character.x, character.y, time_counter, water_sound)
 
         # Movement input
         dx, dy = 0, 0
@@ -475,29 +1093,22 @@ def main():
             # A button = plant
             a_now = joystick.get_button(0)
             if a_now and not a_button_pressed:
-                for spot in plant_spots:
-                    if spot.is_near(character.x, character.y):
-                        if spot.plant_seed():
-                            for _ in range(8):
-                                particles.append(Particle(spot.x, spot.y - 10, DIRT_BROWN, False))
-                            if plant_sound:
-                                plant_sound.play()
-                            break
+                plant_near(garden, character.x, character.y, particles, plant_sound)
             a_button_pressed = a_now
 
             # B/X button = water
             b_now = joystick.get_button(1) or joystick.get_button(2)
             if b_now and not b_button_pressed:
-                for spot in plant_spots:
-                    if spot.is_near(character.x, character.y):
-                        if spot.water():
-                            for _ in range(10):
-                                particles.append(Particle(spot.x, spot.y - 20, (100, 180, 255), True))
-                            if water_sound:
-                                water_sound.play()
-                            break
+                water_can(garden, character.x, character.y, character.facing_right, time_counter,
+                          particles, water_sound)
             b_button_pressed = b_now
 
+            # Y button = sprinkler
+            y_now = joystick.get_button(3)
+            if y_now and not y_button_pressed:
+                place_sprinkler(garden, character.x, character.y, time_counter, water_sound)
+            y_button_pressed = y_now
+
         # Normalize diagonal
         if dx != 0 and dy != 0:
             length = math.sqrt(dx * dx + dy * dy)
@@ -510,30 +1121,53 @@ def main():
         character.x = max(50, min(WORLD_WIDTH - 50, character.x))
         character.y = max(GROUND_Y + 50, min(WORLD_HEIGHT - 50, character.y))
 
-        # Update plant spots
-        old_flowers = flowers_grown
-        flowers_grown = 0
-        for spot in plant_spots:
-            spot.update()
-            if spot.state == "flower":
-                flowers_grown += 1
+        # Camera
+        camera_x = character.x - SCREEN_WIDTH // 2
+        camera_y = character.y - SCREEN_HEIGHT // 2
+        camera_x = int(max(0, min(WORLD_WIDTH - SCREEN_WIDTH, camera_x)))
+        camera_y = int(max(0, min(WORLD_HEIGHT - SCREEN_HEIGHT, camera_y)))
+
+        # Generate the chunks coming into view and let go of the far ones
+        garden.stream(camera_x, camera_y, camera_x + SCREEN_WIDTH, camera_y + SCREEN_HEIGHT)
 
-        # Spawn butterfly when new flower blooms
-        if flowers_grown > old_flowers:
+        # Time of day and weather
+        day.update(time_counter)
+
+        # Sprinklers water their seeds when due; the rest wait on the heap
+        garden.sprinkle(time_counter)
+
+        # Spawn a butterfly for each new flower
+        for _ in range(garden.bloom(time_counter)):
             new_butterfly = Butterfly(
-                random.randint(0, WORLD_WIDTH),
+                random.randint(max(0, int(camera_x) - SCREEN_WIDTH // 2),
+                               min(WORLD_WIDTH, int(camera_x) + SCREEN_WIDTH * 3 // 2)),
                 random.randint(GROUND_Y - 100, GROUND_Y)
             )
-            butterflies.append(new_butterfly)
+            if flock is not None:
+                flock.add(new_butterfly.x, new_butterfly.y, BUTTERFLY_COLORS.index(new_butterfly.color),
+                          new_butterfly.wing_speed, new_butterfly.time)
+            else:
+                butterflies.append(new_butterfly)
 
         # Update butterflies - they go to flowers
-        flower_spots = [s for s in plant_spots if s.state == "flower"]
         for butterfly in butterflies:
             # Occasionally pick a new target
-            if random.random() < 0.01 and flower_spots:
-                target = random.choice(flower_spots)
-                butterfly.set_target(target.x, target.y - 50)
+            if random.random() < 0.01:
+                target = garden.flower_for(butterfly.x, butterfly.y)
+                if target:
+                    butterfly.set_target(target.x, target.y - 50)
             butterfly.update()
+        if flock is not None:
+            x, y = flock.table['x'], flock.table['y']
+            for row in flock.retargeting(0.01).tolist():
+                target = garden.flower_for(x[row], y[row])
+                if target:
+                    flock.set_target(row, target.x, target.y - 50 + random.randint(-30, -10))
+            flock.step()
+
+        # Autosave; the game only copies the garden, the autosaver's thread writes it
+        if time_counter % (AUTOSAVE_SECONDS * 60) == 0:
+            autosaver.save(snapshot(garden, time_counter, character, butterflies, flock))
 
         # Update particles
         for particle in particles[:]:
@@ -545,50 +1179,42 @@ def main():
         for cloud in clouds:
             cloud.update()
 
-        # Camera
-        camera_x = character.x - SCREEN_WIDTH // 2
-        camera_y = character.y - SCREEN_HEIGHT // 2
-        camera_x = max(0, min(WORLD_WIDTH - SCREEN_WIDTH, camera_x))
-        camera_y = max(0, min(WORLD_HEIGHT - SCREEN_HEIGHT, camera_y))
-
         # Draw
-        # Sky
-        screen.fill(SKY_BLUE)
+        # Sky, down to where the ground tiles start
+        screen.fill(day.sky_color(), (0, 0, SCREEN_WIDTH, GROUND_Y - camera_y))
 
-        # Sun
+        # Sun, or the moon at night
         sun_x = SCREEN_WIDTH - 100
         sun_y = 80
-        pygame.draw.circle(screen, SUN_YELLOW, (sun_x, sun_y), 50)
-        for i in range(12):
-            angle = i * math.pi / 6 + time_counter * 0.01
-            ray_x = sun_x + math.cos(angle) * 70
-            ray_y = sun_y + math.sin(angle) * 70
-            pygame.draw.line(screen, SUN_YELLOW, (sun_x, sun_y), (int(ray_x), int(ray_y)), 3)
+        if day.is_day():
+            pygame.draw.circle(screen, SUN_YELLOW, (sun_x, sun_y), 50)
+            for i in range(12):
+                angle = i * math.pi / 6 + time_counter * 0.01
+                ray_x = sun_x + math.cos(angle) * 70
+                ray_y = sun_y + math.sin(angle) * 70
+                pygame.draw.line(screen, SUN_YELLOW, (sun_x, sun_y), (int(ray_x), int(ray_y)), 3)
+        else:
+            day.draw_moon(screen, sun_x, sun_y)
 
         # Clouds
         for cloud in clouds:
-            cloud.draw(screen, camera_x)
+            cloud.draw(render_queue, camera_x)
+        render_queue.flush(screen)
 
-        # Ground
-        ground_screen_y = GROUND_Y - camera_y
-        pygame.draw.rect(screen, GRASS_GREEN,
-                        (0, ground_screen_y, SCREEN_WIDTH, SCREEN_HEIGHT - ground_screen_y))
+        # Ground, fence and dirt mounds
+        static_layer.draw(screen, camera_x, camera_y)
 
-        # Fence at top of garden
-        fence_y = GROUND_Y + 50 - camera_y
-        for x in range(0, SCREEN_WIDTH + 50, 40):
-            pygame.draw.rect(screen, (160, 120, 80), (x, int(fence_y), 8, 40))
-            pygame.draw.polygon(screen, (160, 120, 80), [
-                (x, int(fence_y)),
-                (x + 4, int(fence_y - 15)),
-                (x + 8, int(fence_y))
-            ])
-        pygame.draw.rect(screen, (140, 100, 60), (0, int(fence_y + 10), SCREEN_WIDTH, 6))
-        pygame.draw.rect(screen, (140, 100, 60), (0, int(fence_y + 30), SCREEN_WIDTH, 6))
+        # Plants and flowers on top
+        for spot in garden.visible(camera_x - 50, camera_y - 50,
+                                   camera_x + SCREEN_WIDTH + 50, camera_y + SCREEN_HEIGHT + 50):
+            if spot.state == "growing" or spot.state == "flower":
+                spot.draw_plant(screen, spot.x - camera_x, spot.y - camera_y, time_counter)
 
-        # Plant spots
-        for spot in plant_spots:
-            spot.draw(screen, camera_x, camera_y, time_counter)
+        # Sprinklers, with their spray reaching past the edges of the screen
+        for sprinkler in garden.sprinkler_index.in_rect(camera_x - SPRINKLER_RADIUS, camera_y - SPRINKLER_RADIUS,
+                                                        camera_x + SCREEN_WIDTH + SPRINKLER_RADIUS,
+                                                        camera_y + SCREEN_HEIGHT + SPRINKLER_RADIUS):
+            sprinkler.draw(screen, sprinkler.x - camera_x, sprinkler.y - camera_y, time_counter)
 
         # Character
         char_screen_x = character.x - camera_x
@@ -597,19 +1223,28 @@ def main():
 
         # Butterflies
         for butterfly in butterflies:
-            butterfly.draw(screen, camera_x, camera_y)
+            butterfly.draw(render_queue, camera_x, camera_y)
+        if flock is not None:
+            draw_flock(flock, render_queue, camera_x, camera_y)
+        render_queue.flush(screen)
 
         # Particles
         for particle in particles:
             particle.draw(screen, camera_x, camera_y)
 
+        # Rain, then light the whole scene for the time of day in one pass
+        day.rain.draw(render_queue)
+        render_queue.flush(screen)
+        day.tint(screen)
+
         # UI
-        flower_text = font.render(f"Flowers: {flowers_grown}", True, (80, 60, 40))
+        flower_text = font.render(f"Flowers: {garden.flowers}", True, (80, 60, 40))
         screen.blit(flower_text, (20, 20))
 
         # Controls hint
         hint1 = small_font.render("Move: Arrow Keys / Left Stick", True, (80, 80, 80))
-        hint2 = small_font.render("Plant: SPACE / A Button | Water: X / B Button", True, (80, 80, 80))
+        hint2 = small_font.render("Plant: SPACE / A Button | Water: X / B Button | Sprinkler: C / Y Button",
+                                  True, (80, 80, 80))
         screen.blit(hint1, (20, SCREEN_HEIGHT - 55))
         screen.blit(hint2, (20, SCREEN_HEIGHT - 30))
 
@@ -617,22 +1252,47 @@ def main():
         esc_hint = small_font.render("ESC to exit", True, (80, 80, 80))
         screen.blit(esc_hint, (SCREEN_WIDTH - 120, 20))
 
+        # Batching stats (F3, for grown-ups)
+        render_queue.end_frame()
+        if show_stats:
+            stats_text = small_font.render(render_queue.stats_text(), True, (80, 80, 80))
+            screen.blit(stats_text, (20, 80))
+            sprite_text = small_font.render(flower_sprites.stats_text(), True, (80, 80, 80))
+            screen.blit(sprite_text, (20, 155))
+            save_text = small_font.render(autosaver.stats_text(), True, (80, 80, 80))
+            screen.blit(save_text, (20, 180))
+            day_text = small_font.render(day.stats_text(), True, (80, 80, 80))
+            screen.blit(day_text, (20, 205))
+            garden_text = small_font.render(
+                f"{len(garden.chunks)} chunks loaded ({len(spot_index)} of {len(garden):,} spots), "
+                f"{len(garden.saved)} saved, {garden.loads} generated, "
+                f"{len(static_layer.tiles)} tiles baked ({static_layer.bakes} bakes)", True, (80, 80, 80))
+            screen.blit(garden_text, (20, 105))
+            if flock is not None:
+                flock_text = small_font.render(f"Flock: {len(flock)} butterflies, {flock.neighbors:.1f} neighbors each, "
+                                               f"{flock.pairs} pairs too close",
+                                               True, (80, 80, 80))
+                screen.blit(flock_text, (20, 130))
+
         # Nearby spot indicator
-        for spot in plant_spots:
-            if spot.is_near(character.x, character.y):
-                screen_x = spot.x - camera_x
-                screen_y = spot.y - camera_y - 80
-                if spot.state == "empty":
-                    prompt = small_font.render("Press A/SPACE to plant!", True, (50, 120, 50))
-                    screen.blit(prompt, (int(screen_x - 80), int(screen_y)))
-                elif spot.state == "seed":
-                    prompt = small_font.render("Press B/X to water!", True, (50, 100, 180))
-                    screen.blit(prompt, (int(screen_x - 70), int(screen_y)))
-                break
+        spot = spot_index.nearest(character.x, character.y)
+        if spot:
+            screen_x = spot.x - camera_x
+            screen_y = spot.y - camera_y - 80
+            if spot.state == "empty":
+                prompt = small_font.render("Press A/SPACE to plant!", True, (50, 120, 50))
+                screen.blit(prompt, (int(screen_x - 80), int(screen_y)))
+            elif spot.state == "seed":
+                prompt = small_font.render("Press B/X to water!", True, (50, 100, 180))
+                screen.blit(prompt, (int(screen_x - 70), int(screen_y)))
 
         pygame.display.flip()
         clock.tick(60)
 
+    # Save on the way out, and wait for it to be written
+    autosaver.save(snapshot(garden, time_counter, character, butterflies, flock))
+    autosaver.close()
+
     pygame.quit()
     sys.exit()
 
@@ -0,0 +1,148 @@
+"""
+Garden Saves
+Autosave and restore for Garden Grower.
+
+A garden is its layout seed and size plus every spot that isn't empty: which
+chunk it's in, its place in the chunk, its state and when it was watered. Its
+color, petals and place all regenerate from the seed, so they aren't stored.
+Butterflies are stored as columns, sprinklers as positions. The file is a
+compressed NumPy archive.
+
+The game loop only copies the garden into a Snapshot and hands it over. A
+worker thread turns it into arrays, writes them to a temporary file and
+renames that over the save, so a crash mid-write never leaves a broken save.
+"""
+
+import os
+import time
+import threading
+from itertools import chain
+from operator import itemgetter
+from collections import deque, namedtuple
+
+import numpy as np
+
+SAVE_VERSION = 1
+AUTOSAVE_SECONDS = 30
+STATES = ("empty", "seed", "growing", "flower")  # Stored as their index
+BUTTERFLY_COLUMNS = ('x', 'y', 'target_x', 'target_y', 'time', 'wing_speed', 'color', 'has_target')
+
+# One moment of a garden. spots is {(cx, cy): {i: (state, watered at)}}, butterflies {column: array}
+# and sprinklers an (n, 2) array of positions
+Snapshot = namedtuple('Snapshot', 'seed cols rows origin_x origin_y tick bunny_x bunny_y spots butterflies '
+                                  'sprinklers')
+
+
+def default_path(large):
+    folder = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'saves')
+    return os.path.join(folder, 'garden_large.npz' if large else 'garden.npz')
+
+def spot_arrays(spots):
+    """The snapshot's spots as flat columns, chunk by chunk"""
+    count = sum(map(len, spots.values()))
+    lengths = list(map(len, spots.values()))
+    chunk_x = np.repeat(np.array([cx for cx, cy in spots], np.int16), lengths)
+    chunk_y = np.repeat(np.array([cy for cx, cy in spots], np.int16), lengths)
+    # Iterating a chunk's changes gives its spot indices, and its values (state, watered at)
+    index = np.fromiter(chain.from_iterable(spots.values()), np.uint8, count)
+    changes = list(chain.from_iterable(changes.values() for changes in spots.values()))
+    codes = {name: code for code, name in enumerate(STATES)}
+    state = np.fromiter(map(codes.__getitem__, map(itemgetter(0), changes)), np.uint8, count)
+    watered_at = np.array(list(map(itemgetter(1), changes)), np.float64)  # Not watered yet comes out NaN
+    watered_at = np.where(np.isnan(watered_at), -1, watered_at).astype(np.int64)
+    return chunk_x, chunk_y, index, state, watered_at
+
+def write_save(path, snapshot):
+    """Write the snapshot to path, atomically: whoever reads path sees the old save or the new one"""
+    chunk_x, chunk_y, index, state, watered_at = spot_arrays(snapshot.spots)
+    butterflies = {f'butterfly_{name}': column for name, column in snapshot.butterflies.items()}
+    folder = os.path.dirname(os.path.abspath(path))
+    os.makedirs(folder, exist_ok=True)
+    temp = path + '.tmp'
+    with open(temp, 'wb') as f:
+        np.savez_compressed(f, version=SAVE_VERSION,
+                            garden=np.array([snapshot.seed, snapshot.cols, snapshot.rows, snapshot.origin_x,
+                                             snapshot.origin_y, snapshot.tick], np.int64),
+                            bunny=np.array([snapshot.bunny_x, snapshot.bunny_y]),
+                            chunk_x=chunk_x, chunk_y=chunk_y, index=index, state=state, watered_at=watered_at,
+                            sprinklers=snapshot.sprinklers, **butterflies)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temp, path)
+
+def read_save(path):
+    """The Snapshot saved at path"""
+    with np.load(path) as data:
+        if int(data['version']) != SAVE_VERSION:
+            raise ValueError(f"{path} is a version {int(data['version'])} save, not {SAVE_VERSION}")
+        seed, cols, rows, origin_x, origin_y, tick = data['garden'].tolist()
+        bunny_x, bunny_y = data['bunny'].tolist()
+        chunk_x, chunk_y = data['chunk_x'], data['chunk_y']
+        index, state, watered_at = data['index'].tolist(), data['state'].tolist(), data['watered_at'].tolist()
+        butterflies = {name: data[f'butterfly_{name}'] for name in BUTTERFLY_COLUMNS}
+        # Saves from before sprinklers have none
+        sprinklers = data['sprinklers'] if 'sprinklers' in data.files else np.empty((0, 2))
+
+    # Spots were written chunk by chunk, so each chunk is one run
+    spots = {}
+    if len(chunk_x):
+        breaks = np.flatnonzero((np.diff(chunk_x) != 0) | (np.diff(chunk_y) != 0)) + 1
+        starts = [0] + breaks.tolist()
+        ends = breaks.tolist() + [len(chunk_x)]
+        for start, end, cx, cy in zip(starts, ends, chunk_x[starts].tolist(), chunk_y[starts].tolist()):
+            spots[cx, cy] = {index[k]: (STATES[state[k]], None if watered_at[k] < 0 else watered_at[k])
+                             for k in range(start, end)}
+    return Snapshot(seed, cols, rows, origin_x, origin_y, tick, bunny_x, bunny_y, spots, butterflies, sprinklers)
+
+
+class Autosaver:
+    """Writes saves on a worker thread; save() from the game loop, close() to write the last one and stop"""
+    def __init__(self, path):
+        self.path = path
+        self.queue = deque(maxlen=1)  # Only the newest snapshot is worth writing. append and popleft are atomic
+        self.submitted = 0
+        self.written = 0
+        self.write_time = 0.0  # Seconds the last write took
+        self.error = None      # Why the last write failed, if it did
+        self.running = True
+        self.thread = threading.Thread(target=self.work, daemon=True)
+        self.thread.start()
+
+    def save(self, snapshot):
+        """Queue a snapshot to write, replacing any still waiting; never waits on the disk"""
+        self.queue.append(snapshot)
+        self.submitted += 1
+
+    def close(self):
+        """Let the worker write what's queued and stop it"""
+        self.running = False
+        self.thread.join()
+
+    def work(self):
+        while True:
+            try:
+                snapshot = self.queue.popleft()
+            except IndexError:
+                if not self.running:
+                    return
+                time.sleep(0.05)
+                continue
+            start = time.perf_counter()
+            try:
+                write_save(self.path, snapshot)
+            except OSError as error:
+                # A full or read-only disk shouldn't end the game; try again next time
+                self.error = str(error)
+                continue
+            except Exception as error:
+                # Nor should anything else going wrong in a write end the worker, or later saves would go nowhere
+                self.error = f"{type(error).__name__}: {error}"
+                continue
+            self.error = None
+            self.write_time = time.perf_counter() - start
+            self.written += 1
+
+    def stats_text(self):
+        if self.error:
+            return f"Autosave failed: {self.error}"
+        return f"Autosaves: {self.written} written, last took {self.write_time * 1000:.0f} ms"
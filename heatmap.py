@@ -0,0 +1,284 @@
+"""
+Bullet Heatmaps
+Where NOVA STORM's enemy bullets go, for tuning the boss patterns.
+
+Each frame the game hands the recorder a copy of the enemy bullet positions
+and the player's. A worker thread bins them into a density grid per boss
+pattern and per phase, and scores how crowded the space around the player
+is. The main loop only copies two arrays and appends to a deque, which
+never waits on the worker; if the worker falls too far behind, the oldest
+frames are dropped and counted.
+
+    python heatmap.py --seconds 120 --out heatmaps    # Record a bot boss fight and write the PNGs
+    python bullet_hell.py --heatmap heatmaps          # Or record your own runs
+"""
+
+import os
+import sys
+import csv
+import time
+import argparse
+import threading
+from collections import deque, namedtuple, defaultdict
+
+import numpy as np
+import pygame
+
+CELL = 16               # Heatmap cell size in pixels
+QUEUE_FRAMES = 600      # Frames the worker may fall behind before the oldest are dropped
+DANGER_RADIUS = 64      # Bullets this close to the player count toward its danger
+REACH = 6               # Cells either side of the player it can reach in a few frames
+UNFAIR_COVERAGE = 0.5   # Share of reachable cells holding a bullet past which there's no way through
+UNFAIR_FRAMES = 15      # Frames that has to last to count as an unfair section
+FRAME_RATE = 60
+
+# One frame's copy of what the worker needs. section is the boss pattern, or 'waves' without a boss
+Sample = namedtuple('Sample', 'frame section phase x y player_x player_y grazes')
+
+# Black through purple, red and yellow to white
+HEAT_STOPS = [(0.0, (0, 0, 0)), (0.25, (90, 20, 140)), (0.5, (220, 40, 60)), (0.75, (255, 200, 40)),
+              (1.0, (255, 255, 255))]
+HEAT_PALETTE = np.stack([np.interp(np.linspace(0, 1, 256), [stop for stop, color in HEAT_STOPS],
+                                   [color[channel] for stop, color in HEAT_STOPS])
+                         for channel in range(3)], axis=1).astype(np.uint8)
+
+
+class HeatmapRecorder:
+    """Bins bullet positions on a worker thread; record() from the game loop, close() then write()"""
+    def __init__(self, width, height, cell=CELL):
+        self.width = width
+        self.height = height
+        self.cell = cell
+        self.cols = -(-width // cell)
+        self.rows = -(-height // cell)
+        self.queue = deque(maxlen=QUEUE_FRAMES)  # append and popleft are atomic, so no lock is needed
+        self.submitted = 0
+        self.binned = 0
+
+        # Owned by the worker until close() returns
+        self.density = defaultdict(lambda: np.zeros(self.rows * self.cols, np.int64))  # By section, then phase
+        self.frames = defaultdict(int)
+        self.grazes = np.zeros(self.rows * self.cols, np.int64)
+        self.series = []  # (frame, section, phase, bullets, near, coverage, grazes) per frame
+
+        self.running = True
+        self.thread = threading.Thread(target=self.work, daemon=True)
+        self.thread.start()
+
+    def record(self, sim, frame):
+        """Queue this frame's enemy bullets; cheap enough to call every frame"""
+        bullets = sim.enemy_bullets
+        boss = sim.boss
+        if boss and not boss.defeated:
+            section = boss.patterns[boss.current_pattern].__name__.replace('pattern_', '')
+            phase = boss.phase
+        else:
+            section, phase = 'waves', -1
+        target = sim.target()
+        self.queue.append(Sample(frame, section, phase, bullets['x'].copy(), bullets['y'].copy(),
+                                 target.x, target.y, sim.graze_count))
+        self.submitted += 1
+
+    def dropped(self):
+        return self.submitted - self.binned - len(self.queue)
+
+    def close(self):
+        """Let the worker finish what's queued and stop it"""
+        self.running = False
+        self.thread.join()
+
+    def work(self):
+        last_grazes = None
+        while True:
+            try:
+                sample = self.queue.popleft()
+            except IndexError:
+                if not self.running:
+                    return
+                time.sleep(0.002)
+                continue
+            self.bin(sample, last_grazes)
+            last_grazes = sample.grazes
+            self.binned += 1
+
+    def cells(self, x, y):
+        # Flat cell index of every point on screen
+        col = (x // self.cell).astype(np.int64)
+        row = (y // self.cell).astype(np.int64)
+        inside = (col >= 0) & (col < self.cols) & (row >= 0) & (row < self.rows)
+        return row[inside] * self.cols + col[inside]
+
+    def bin(self, sample, last_grazes):
+        cells = self.cells(sample.x, sample.y)
+        counts = np.bincount(cells, minlength=self.rows * self.cols)
+        for name in [sample.section, f'phase{sample.phase}'] if sample.phase >= 0 else [sample.section]:
+            self.density[name] += counts
+            self.frames[name] += 1
+
+        # Danger: bullets close by, and how much of the space the player can reach is taken
+        dx = sample.x - sample.player_x
+        dy = sample.y - sample.player_y
+        near = int(np.count_nonzero(dx * dx + dy * dy < DANGER_RADIUS * DANGER_RADIUS))
+        col = min(self.cols - 1, max(0, int(sample.player_x // self.cell)))
+        row = min(self.rows - 1, max(0, int(sample.player_y // self.cell)))
+        reach = counts.reshape(self.rows, self.cols)[max(0, row - REACH):row + REACH + 1,
+                                                      max(0, col - REACH):col + REACH + 1]
+        coverage = np.count_nonzero(reach) / reach.size
+
+        # The count drops when a rewind restores it or a new run starts; that's a reset, not negative grazes
+        grazes = max(0, sample.grazes - last_grazes) if last_grazes is not None else 0
+        if grazes > 0:
+            self.grazes[row * self.cols + col] += grazes
+        self.series.append((sample.frame, sample.section, sample.phase, len(sample.x), near, coverage, grazes))
+
+    # ============== OUTPUT ==============
+
+    def unfair_sections(self):
+        """(first frame, last frame, section, phase) of every stretch with no way through"""
+        sections = []
+        start = None
+        for i, (frame, section, phase, bullets, near, coverage, grazes) in enumerate(self.series):
+            if coverage >= UNFAIR_COVERAGE:
+                if start is None:
+                    start = i
+            elif start is not None:
+                if i - start >= UNFAIR_FRAMES:
+                    sections.append((self.series[start][0], self.series[i - 1][0], *self.series[start][1:3]))
+                start = None
+        if start is not None and len(self.series) - start >= UNFAIR_FRAMES:
+            sections.append((self.series[start][0], self.series[-1][0], *self.series[start][1:3]))
+        return sections
+
+    def heat_surface(self, grid, frames):
+        # Bullets per cell per frame on a log scale, so sparse patterns still show their shape
+        density = np.log1p(grid.reshape(self.rows, self.cols) / max(1, frames))
+        peak = density.max()
+        levels = (density / peak * 255).astype(np.uint8) if peak > 0 else np.zeros_like(density, np.uint8)
+        surface = pygame.surfarray.make_surface(HEAT_PALETTE[levels].transpose(1, 0, 2))
+        return pygame.transform.scale(surface, (self.cols * self.cell, self.rows * self.cell))
+
+    def write(self, out_dir):
+        """Save a PNG per pattern and phase, the graze map, and the danger series as CSV and a chart"""
+        os.makedirs(out_dir, exist_ok=True)
+        written = []
+        for name, grid in self.density.items():
+            path = os.path.join(out_dir, f'heat_{name}.png')
+            pygame.image.save(self.heat_surface(grid, self.frames[name]), path)
+            written.append(path)
+        path = os.path.join(out_dir, 'grazes.png')
+        pygame.image.save(self.heat_surface(self.grazes, 1), path)
+        written.append(path)
+
+        path = os.path.join(out_dir, 'danger.csv')
+        with open(path, 'w', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(['frame', 'section', 'phase', 'bullets', 'near', 'coverage', 'grazes'])
+            writer.writerows((*row[:5], f'{row[5]:.3f}', row[6]) for row in self.series)
+        written.append(path)
+        if self.series:
+            path = os.path.join(out_dir, 'danger.png')
+            pygame.image.save(self.danger_chart(), path)
+            written.append(path)
+        return written
+
+    def danger_chart(self, width=1200, height=300):
+        """Bullets near the player (red) and reachable coverage (yellow) over time, unfair
+        sections shaded, grazes as ticks along the bottom and pattern changes as grey lines"""
+        surface = pygame.Surface((width, height))
+        surface.fill((10, 10, 20))
+        series = self.series
+        first, last = series[0][0], series[-1][0]
+        span = max(1, last - first)
+
+        def x_of(frame):
+            return int((frame - first) / span * (width - 1))
+
+        for start, end, section, phase in self.unfair_sections():
+            pygame.draw.rect(surface, (70, 15, 25), (x_of(start), 0, max(1, x_of(end) - x_of(start)), height))
+        section = None
+        for frame, name, phase, bullets, near, coverage, grazes in series:
+            if name != section:
+                pygame.draw.line(surface, (70, 70, 90), (x_of(frame), 0), (x_of(frame), height))
+                section = name
+            if grazes:
+                pygame.draw.line(surface, (80, 230, 255), (x_of(frame), height - 1), (x_of(frame), height - 12))
+        threshold = height - 1 - int(UNFAIR_COVERAGE * (height - 20))
+        pygame.draw.line(surface, (120, 60, 60), (0, threshold), (width, threshold))
+
+        peak_near = max(row[4] for row in series) or 1
+        near_points = [(x_of(row[0]), height - 1 - int(row[4] / peak_near * (height - 20))) for row in series]
+        coverage_points = [(x_of(row[0]), height - 1 - int(row[5] * (height - 20))) for row in series]
+        if len(series) > 1:
+            pygame.draw.lines(surface, (255, 80, 80), False, near_points)
+            pygame.draw.lines(surface, (255, 230, 80), False, coverage_points)
+        return surface
+
+    def summary(self):
+        """Per-section lines: frames, mean bullets, mean and peak danger, grazes, unfair frames"""
+        stats = defaultdict(lambda: [0, 0, 0, 0.0, 0.0, 0, 0])
+        for frame, section, phase, bullets, near, coverage, grazes in self.series:
+            entry = stats[section]
+            entry[0] += 1
+            entry[1] += bullets
+            entry[2] += near
+            entry[3] = max(entry[3], coverage)
+            entry[4] += coverage
+            entry[5] += grazes
+            entry[6] += coverage >= UNFAIR_COVERAGE
+        lines = [f"  {'section':<14} {'frames':>6} {'bullets':>8} {'near':>6} {'coverage':>9} {'peak':>5} "
+                 f"{'grazes':>7} {'crowded':>8}"]
+        for section, (frames, bullets, near, peak, coverage, grazes, crowded) in stats.items():
+            lines.append(f"  {section:<14} {frames:>6} {bullets / frames:>8.0f} {near / frames:>6.1f} "
+                         f"{coverage / frames:>9.2f} {peak:>5.2f} {grazes:>7} {crowded:>8}")
+        return lines
+
+# ============== COMMAND LINE ==============
+
+def main():
+    parser = argparse.ArgumentParser(description="Record NOVA STORM boss bullet heatmaps from a bot fight")
+    parser.add_argument('--seconds', type=int, default=120)
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--power', type=float, default=4.0,
+                        help="the bot's shot power; high enough by default to see every phase")
+    parser.add_argument('--out', default='heatmaps', help="folder for the PNGs and danger series")
+    args = parser.parse_args()
+
+    os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+    os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+    import bullet_hell as game  # The game imports this module, so it's only pulled in here
+
+    sim = game.Simulation(args.seed)
+    sim.player.invincible = float('inf')
+    sim.player.power = args.power
+    sim.boss = game.Boss(sim.rng)
+    sim.boss_spawned = True
+    recorder = HeatmapRecorder(game.SCREEN_WIDTH, game.SCREEN_HEIGHT)
+
+    # The bot shoots and drifts under the boss, so the phases come in turn
+    frames = args.seconds * FRAME_RATE
+    start = time.perf_counter()
+    for frame in range(frames):
+        boss = sim.boss
+        dx = max(-1.0, min(1.0, (boss.x - sim.player.x) / 20)) if not boss.defeated else 0
+        sim.step(game.Controls(dx=dx, shooting=True))
+        sim.sounds.clear()
+        recorder.record(sim, frame)
+        if sim.state == game.GameState.VICTORY:
+            break
+    elapsed = time.perf_counter() - start
+    recorder.close()
+
+    print(f"heatmap: boss seed {args.seed}, {recorder.submitted} frames in {elapsed:.1f}s, "
+          f"{recorder.dropped()} dropped by the worker, {sim.state.name.lower()}")
+    print("\n".join(recorder.summary()))
+    unfair = recorder.unfair_sections()
+    print(f"  {len(unfair)} unfair section{'s' if len(unfair) != 1 else ''} "
+          f"(reachable coverage over {UNFAIR_COVERAGE:.0%} for {UNFAIR_FRAMES}+ frames)")
+    for first, last, section, phase in unfair:
+        print(f"    {first / FRAME_RATE:6.1f}s - {last / FRAME_RATE:6.1f}s  {section}, phase {phase}")
+    for path in recorder.write(args.out):
+        print(f"  wrote {path}")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,433 @@
+"""
+Netplay
+Two-player rollback co-op for NOVA STORM over UDP.
+
+Both peers run the whole simulation. Each sends its input a few frames
+before it's due and predicts the other player's by repeating their last
+known one, so neither ever waits on the network. When a real input turns
+out to differ from its prediction, the session restores the snapshot from
+that frame and re-simulates back up to the present within the same render
+frame; everyone sees the corrected world a frame later.
+
+    python netplay.py test --latency 80 --loss 0.05      # Two headless peers through a lossy relay
+    python netplay.py relay 7001 7002 --latency 80       # A relay for two games on this machine
+"""
+
+import os
+import sys
+import time
+import zlib
+import heapq
+import random
+import socket
+import struct
+import argparse
+import itertools
+from collections import Counter, deque
+
+INPUT_DELAY = 2         # Frames between reading an input and using it, so it usually arrives in time
+MAX_ROLLBACK = 8        # Furthest a session runs ahead of the peer's last known input
+CHECKSUM_INTERVAL = 60  # Confirmed frames between snapshot checksums, swapped to catch desyncs
+SYNC_WINDOW = 30        # Packets averaged to judge which peer is running ahead
+SYNC_INTERVAL = 20      # Fewest frames between two waits to let the peer catch up
+MAX_INPUTS = 32         # Inputs carried by one packet
+MAX_PACKET = 1024
+
+MAGIC = b'NOVA'
+# Magic, seed, sender's frame, its newest contiguous input from us, its frame advantage,
+# its newest checksum frame and checksum, then the first frame and count of the inputs that follow
+HEADER = struct.Struct('<4sIiibiIiB')
+# Stick x and y in 1/63rds, then shoot, focus and bomb bits
+INPUT = struct.Struct('<bbB')
+
+def pack_controls(controls):
+    dx = max(-127, min(127, round(controls.dx * 63)))
+    dy = max(-127, min(127, round(controls.dy * 63)))
+    flags = bool(controls.shooting) | bool(controls.focused) << 1 | bool(controls.bomb) << 2
+    return INPUT.pack(dx, dy, flags)
+
+NEUTRAL = INPUT.pack(0, 0, 0)
+
+def unpack_controls(data, controls_type):
+    dx, dy, flags = INPUT.unpack(data)
+    return controls_type(dx / 63, dy / 63, bool(flags & 1), bool(flags & 2), bool(flags & 4))
+
+def parse_address(text):
+    host, _, port = text.rpartition(':')
+    return (host or '127.0.0.1', int(port))
+
+def open_socket(port, host=''):
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    sock.bind((host, port))
+    sock.setblocking(False)
+    return sock
+
+def receive_all(sock):
+    # Every datagram waiting on a non-blocking socket
+    while True:
+        try:
+            yield sock.recvfrom(MAX_PACKET)
+        except BlockingIOError:
+            return
+        except OSError:
+            continue  # An ICMP error from an earlier send; the peer isn't up yet
+
+# ============== RELAY ==============
+
+class LossyRelay:
+    """Passes packets between two local ports with added latency, jitter and loss.
+    Each side's address is learned from the packets it sends, so peers only need the relay's ports"""
+    def __init__(self, ports=(0, 0), latency=0.0, jitter=0.0, loss=0.0, seed=None, clock=time.monotonic):
+        self.sockets = [open_socket(port, '127.0.0.1') for port in ports]
+        self.ports = [sock.getsockname()[1] for sock in self.sockets]
+        self.addresses = [None, None]
+        self.latency = latency
+        self.jitter = jitter
+        self.loss = loss
+        self.rng = random.Random(seed)
+        self.clock = clock
+        self.queue = []  # (due time, order, side it goes out on, packet)
+        self.order = itertools.count()
+        self.forwarded = 0
+        self.dropped = 0
+
+    def poll(self):
+        """Take in everything waiting on both ports and send on whatever is due"""
+        now = self.clock()
+        for side, sock in enumerate(self.sockets):
+            for packet, address in receive_all(sock):
+                self.addresses[side] = address
+                if self.rng.random() < self.loss:
+                    self.dropped += 1
+                    continue
+                delay = max(0.0, self.latency + self.rng.uniform(-self.jitter, self.jitter))
+                heapq.heappush(self.queue, (now + delay, next(self.order), 1 - side, packet))
+        while self.queue and self.queue[0][0] <= now:
+            due, order, side, packet = heapq.heappop(self.queue)
+            if self.addresses[side]:
+                try:
+                    self.sockets[side].sendto(packet, self.addresses[side])
+                    self.forwarded += 1
+                except OSError:
+                    self.dropped += 1
+
+    def close(self):
+        for sock in self.sockets:
+            sock.close()
+
+# ============== ROLLBACK SESSION ==============
+
+class RollbackSession:
+    """One peer of a two-player game. player is 0 or 1, the ship steered from this end.
+    make_sim(seed) builds the simulation once both ends agree on a seed; player one picks it"""
+    def __init__(self, player, peer, make_sim, controls_type, port=0, seed=None,
+                 input_delay=INPUT_DELAY, max_rollback=MAX_ROLLBACK):
+        self.player = player
+        self.peer = peer
+        self.make_sim = make_sim
+        self.controls_type = controls_type
+        self.socket = open_socket(port)
+        self.seed = seed if player == 0 else None
+        self.input_delay = input_delay
+        self.max_rollback = max_rollback
+        self.sim = None
+        self.connected = False
+
+        self.frame = 0  # Next frame to simulate
+        # Packed inputs by frame for each player. The first frames are neutral on both ends,
+        # filling the gap before the first delayed input
+        self.inputs = [{frame: NEUTRAL for frame in range(-1, input_delay)} for _ in range(2)]
+        self.confirmed = input_delay - 1  # Every remote input up to this frame is known
+        self.used = {}       # The remote input each simulated, unconfirmed frame was run with
+        self.snapshots = {}  # World before each unconfirmed frame
+        self.peer_ack = -1   # Newest of our inputs the peer has all of
+        self.advantage = deque(maxlen=SYNC_WINDOW)
+        self.peer_advantage = deque(maxlen=SYNC_WINDOW)
+        self.synced_at = 0
+        self.checksum = (-1, 0)   # Our newest (frame, checksum)
+        self.peer_checksums = {}  # The peer's, by frame, until ours catches up
+        self.checked = -1
+        self.checksums_matched = 0
+        self.desync = None   # First checksum frame the peers disagree on
+
+        # Stats
+        self.depths = Counter()
+        self.resimulated = 0
+        self.resim_time = 0.0
+        self.worst_rollback = 0.0
+        self.stalls = 0
+
+    def advance(self, controls):
+        """Read the network, roll back if a prediction was wrong, then simulate one frame
+        with the local controls. Returns False if it waited on the peer instead"""
+        self.receive()
+        if self.sim is None:
+            self.send()
+            return False
+
+        # Never more than max_rollback frames ahead of what the peer has confirmed,
+        # and now and then a frame's wait to let a peer that's fallen behind catch up
+        if self.frame - self.confirmed > self.max_rollback or self.running_ahead():
+            self.stalls += 1
+            self.send()
+            return False
+
+        self.inputs[self.player][self.frame + self.input_delay] = pack_controls(controls)
+        self.send()
+        self.simulate(self.frame)
+        self.frame += 1
+        self.prune()
+        return True
+
+    def running_ahead(self):
+        if len(self.advantage) < SYNC_WINDOW or self.frame - self.synced_at < SYNC_INTERVAL:
+            return False
+        # Both ends measure latency plus the gap between them, with opposite signs on the gap
+        gap = (sum(self.advantage) - sum(self.peer_advantage)) / (2 * SYNC_WINDOW)
+        if gap < 1:
+            return False
+        self.synced_at = self.frame
+        return True
+
+    def simulate(self, frame):
+        remote = self.inputs[1 - self.player]
+        guess = remote.get(frame, remote[self.confirmed])  # Unknown inputs repeat the last known one
+        self.used[frame] = guess
+        self.snapshots[frame] = self.sim.snapshot()
+        pads = [unpack_controls(self.inputs[self.player][frame], self.controls_type),
+                unpack_controls(guess, self.controls_type)]
+        if self.player:
+            pads.reverse()
+        self.sim.step(pads[0], 1.0, pads[1])
+
+    def roll_back(self, frame):
+        start = time.perf_counter()
+        sim = self.sim
+        # Particles and sounds already shown aren't rolled back with the world
+        particles = list(sim.particles.particles)
+        sounds = list(sim.sounds)
+        sim.restore(self.snapshots[frame])
+        for resim in range(frame, self.frame):
+            self.simulate(resim)
+        sim.particles.particles[:] = particles
+        sim.sounds[:] = sounds
+
+        elapsed = time.perf_counter() - start
+        depth = self.frame - frame
+        self.depths[depth] += 1
+        self.resimulated += depth
+        self.resim_time += elapsed
+        self.worst_rollback = max(self.worst_rollback, elapsed)
+
+    def prune(self):
+        # Snapshots of confirmed frames can't be rolled back to any more. Every so often one is
+        # checksummed first; both ends built it from the same inputs, so they must agree
+        settled = min(self.confirmed + 1, self.frame)
+        for frame in [frame for frame in self.snapshots if frame < settled]:
+            snapshot = self.snapshots.pop(frame)
+            del self.used[frame]
+            if frame % CHECKSUM_INTERVAL == 0:
+                self.checksum = (frame, zlib.crc32(snapshot))
+                self.check()
+        for frame in [frame for frame in self.inputs[self.player] if frame < min(settled, self.peer_ack) - 1]:
+            del self.inputs[self.player][frame]
+        remote = self.inputs[1 - self.player]
+        for frame in [frame for frame in remote if frame < min(settled, self.confirmed) - 1]:
+            del remote[frame]
+
+    def check(self):
+        frame, checksum = self.checksum
+        if frame <= self.checked or frame not in self.peer_checksums:
+            return
+        self.checked = frame
+        if self.peer_checksums[frame] == checksum:
+            self.checksums_matched += 1
+        elif self.desync is None:
+            self.desync = frame
+        for old in [old for old in self.peer_checksums if old <= frame]:
+            del self.peer_checksums[old]
+
+    # ============== WIRE ==============
+
+    def send(self):
+        local = self.inputs[self.player]
+        start = max(self.peer_ack + 1, 0)
+        end = min(max(local) + 1, start + MAX_INPUTS)
+        advantage = max(-128, min(127, round(sum(self.advantage) / max(1, len(self.advantage)))))
+        header = HEADER.pack(MAGIC, self.seed or 0, self.frame, self.confirmed, advantage, *self.checksum,
+                             start, max(0, end - start))
+        packet = header + b''.join(local[frame] for frame in range(start, end))
+        try:
+            self.socket.sendto(packet, self.peer)
+        except OSError:
+            pass  # Nobody listening yet; the next frame sends it all again
+
+    def receive(self):
+        remote = self.inputs[1 - self.player]
+        rollback = None
+        for packet, address in receive_all(self.socket):
+            if len(packet) < HEADER.size or packet[:4] != MAGIC:
+                continue
+            magic, seed, frame, ack, advantage, checksum_frame, checksum, start, count = \
+                HEADER.unpack_from(packet)
+            if len(packet) != HEADER.size + count * INPUT.size:
+                continue
+            self.connected = True
+            if self.seed is None and self.player == 1:
+                self.seed = seed
+            self.peer_ack = max(self.peer_ack, ack)
+            self.advantage.append(self.frame - frame)
+            self.peer_advantage.append(advantage)
+            if checksum_frame > self.checked:
+                self.peer_checksums[checksum_frame] = checksum
+                self.check()
+
+            for i in range(count):
+                input_frame = start + i
+                if input_frame <= self.confirmed or input_frame in remote:
+                    continue
+                data = packet[HEADER.size + i * INPUT.size:HEADER.size + (i + 1) * INPUT.size]
+                remote[input_frame] = data
+                if input_frame in self.used and self.used[input_frame] != data:
+                    rollback = input_frame if rollback is None else min(rollback, input_frame)
+            while self.confirmed + 1 in remote:
+                self.confirmed += 1
+
+        if self.sim is None and self.connected and self.seed is not None:
+            self.sim = self.make_sim(self.seed)
+        elif rollback is not None:
+            self.roll_back(rollback)
+
+    def close(self):
+        self.socket.close()
+
+    # ============== STATS ==============
+
+    def resim_rate(self):
+        """Frames re-simulated per second of re-simulation time"""
+        return self.resimulated / self.resim_time if self.resim_time else 0.0
+
+    def rollbacks(self):
+        return sum(self.depths.values())
+
+    def stats_text(self):
+        return (f"frame {self.frame} (peer +{self.confirmed - self.frame + 1}) | "
+                f"{self.rollbacks()} rollbacks, {self.resimulated} frames re-simulated at "
+                f"{self.resim_rate():,.0f}/s, worst {self.worst_rollback * 1000:.1f} ms | {self.stalls} waits")
+
+    def histogram_text(self):
+        depths = ' '.join(f"{depth}:{self.depths[depth]}" for depth in range(1, self.max_rollback + 1))
+        sync = f"DESYNC at frame {self.desync}" if self.desync is not None else f"{self.checksums_matched} checksums ok"
+        return f"rollback depths {depths} | {sync}"
+
+# ============== LOOPBACK TEST ==============
+
+def bot_pad(rng, state, controls_type):
+    # Wanders, shooting, changing course and focus every so often; now and then a bomb
+    if state['hold'] <= 0:
+        state['dx'] = rng.choice([-1, 0, 1])
+        state['dy'] = rng.choice([-1, 0, 0, 1])
+        state['focused'] = rng.random() < 0.3
+        state['hold'] = rng.randint(10, 40)
+    state['hold'] -= 1
+    return controls_type(state['dx'], state['dy'], True, state['focused'], rng.random() < 0.002)
+
+def run_test(args):
+    os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+    os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+    import bullet_hell as game  # The game imports this module, so it's only pulled in here
+
+    # Game time drives the relay too, so a run with the same seed meets the same network every time
+    now = [0.0]
+    relay = LossyRelay(latency=args.latency / 1000, jitter=args.jitter / 1000, loss=args.loss,
+                       seed=args.seed, clock=lambda: now[0])
+
+    def make_sim(seed):
+        sim = game.Simulation(seed, players=2)
+        for player in sim.players:
+            player.invincible = float('inf')  # A game over would end the test early
+        return sim
+
+    sessions = [RollbackSession(player, ('127.0.0.1', relay.ports[player]), make_sim, game.Controls,
+                                seed=args.seed if player == 0 else None, max_rollback=args.max_rollback)
+                for player in range(2)]
+    bots = [(random.Random(args.seed * 2 + player), {'hold': 0}) for player in range(2)]
+    budget = 1000 / game.FRAME_RATE
+    tick = 0
+    print(f"netplay loopback: seed {args.seed}, {args.latency:g} ms latency +-{args.jitter:g}, "
+          f"{args.loss:.0%} loss, input delay {INPUT_DELAY}, rollback window {args.max_rollback}")
+    while min(session.frame for session in sessions) < args.frames and tick < args.frames * 2:
+        now[0] = tick / game.FRAME_RATE
+        relay.poll()
+        for session, (rng, state) in zip(sessions, bots):
+            session.advance(bot_pad(rng, state, game.Controls))
+            if session.sim:
+                session.sim.sounds.clear()
+        tick += 1
+
+    for player, session in enumerate(sessions):
+        print(f"  player {player + 1}: {session.frame} frames in {tick} ticks, {session.stalls} waits, "
+              f"{session.rollbacks()} rollbacks")
+        print(f"    re-simulated {session.resimulated} frames at {session.resim_rate():,.0f} frames/s, "
+              f"worst rollback {session.worst_rollback * 1000:.2f} ms (frame budget {budget:.1f} ms)")
+        peak = max(session.depths.values(), default=1)
+        for depth in range(1, session.max_rollback + 1):
+            count = session.depths[depth]
+            print(f"    depth {depth}: {count:>6}  {'#' * round(count * 40 / peak)}")
+        session.close()
+    print(f"  relay: {relay.forwarded} packets forwarded, {relay.dropped} dropped")
+    relay.close()
+
+    desync = [session.desync for session in sessions if session.desync is not None]
+    matched = min(session.checksums_matched for session in sessions)
+    if desync or not matched:
+        print(f"FAIL: {'desync at frame ' + str(min(desync)) if desync else 'no checksums compared'}")
+        return 1
+    print(f"PASS: {matched} checksums matched")
+    return 0
+
+def run_relay(args):
+    relay = LossyRelay(args.ports, latency=args.latency / 1000, jitter=args.jitter / 1000, loss=args.loss)
+    print(f"relaying 127.0.0.1:{relay.ports[0]} <-> 127.0.0.1:{relay.ports[1]} with {args.latency:g} ms "
+          f"latency +-{args.jitter:g}, {args.loss:.0%} loss (Ctrl+C to stop)")
+    reported = time.monotonic()
+    try:
+        while True:
+            relay.poll()
+            time.sleep(0.001)
+            if time.monotonic() - reported >= 5:
+                reported = time.monotonic()
+                print(f"  {relay.forwarded} forwarded, {relay.dropped} dropped")
+    except KeyboardInterrupt:
+        pass
+    relay.close()
+    return 0
+
+def main():
+    parser = argparse.ArgumentParser(description="NOVA STORM rollback netplay tools")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    def network(command):
+        command.add_argument('--latency', type=float, default=60, help="one-way delay in ms (default: 60)")
+        command.add_argument('--jitter', type=float, default=10, help="random extra delay in ms, +-")
+        command.add_argument('--loss', type=float, default=0.05, help="share of packets dropped (default: 0.05)")
+
+    test = commands.add_parser('test', help="run two headless peers against each other through a lossy relay")
+    network(test)
+    test.add_argument('--frames', type=int, default=3600)
+    test.add_argument('--seed', type=int, default=1)
+    test.add_argument('--max-rollback', type=int, default=MAX_ROLLBACK)
+    test.set_defaults(run=run_test)
+
+    relay = commands.add_parser('relay', help="relay between two games on this machine, e.g. "
+                                              "bullet_hell.py --netplay 127.0.0.1:7001 and "
+                                              "bullet_hell.py --netplay 127.0.0.1:7002 --player 2")
+    relay.add_argument('ports', type=int, nargs=2)
+    network(relay)
+    relay.set_defaults(run=run_relay)
+
+    args = parser.parse_args()
+    return args.run(args)
+
+if __name__ == '__main__':
+    sys.exit(main())
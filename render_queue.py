@@ -0,0 +1,80 @@
+"""
+Render Queue
+Batched sprite drawing shared by all the games.
+Entities submit their cached sprites instead of blitting them one by one;
+the queue sorts everything by layer and blend mode and draws each group
+with a single Surface.blits (or fblits) call.
+A submit_many batch is kept as one ready-made blit sequence, so thousands of
+bullets cost one list build rather than a sort entry and a repack each.
+"""
+
+from itertools import groupby, repeat
+from operator import itemgetter
+
+_layer_and_blend = itemgetter(0, 1)
+
+
+class RenderQueue:
+    """Collects sprite submissions for one frame and flushes them in batches"""
+    def __init__(self):
+        self.items = []
+        # Totals for the frame in progress (a frame may flush more than once)
+        self.frame_sprites = 0
+        self.frame_calls = 0
+        # Totals from the last finished frame, for checking how well things batch
+        self.sprites_drawn = 0
+        self.draw_calls = 0
+
+    def submit(self, surface, pos, blend=0, layer=0):
+        self.items.append((layer, blend, surface, pos))
+
+    def submit_centered(self, surface, x, y, blend=0, layer=0):
+        pos = (int(x) - surface.get_width() // 2, int(y) - surface.get_height() // 2)
+        self.items.append((layer, blend, surface, pos))
+
+    def submit_many(self, surface, positions, blend=0, layer=0):
+        """Submit one surface at many top-left positions, as a single item holding their blit sequence"""
+        if blend == 0:
+            blits = list(zip(repeat(surface), positions))
+        else:
+            blits = list(zip(repeat(surface), positions, repeat(None), repeat(blend)))
+        if blits:
+            self.items.append((layer, blend, None, blits))
+
+    def flush(self, target):
+        """Draw everything submitted this frame onto target, lowest layer first"""
+        items = self.items
+        items.sort(key=_layer_and_blend)  # Stable, so submit order is kept inside a group
+        fblits = getattr(target, 'fblits', None)  # pygame-ce only
+        draw_calls = 0
+        sprites = 0
+
+        for (layer, blend), group in groupby(items, key=_layer_and_blend):
+            blits = []
+            for item in group:
+                if item[2] is None:
+                    blits.extend(item[3])  # A submit_many batch
+                elif blend == 0:
+                    blits.append((item[2], item[3]))
+                else:
+                    blits.append((item[2], item[3], None, blend))
+            if blend == 0 and fblits is not None:
+                fblits(blits)
+            else:
+                target.blits(blits, doreturn=False)
+            draw_calls += 1
+            sprites += len(blits)
+
+        self.frame_sprites += sprites
+        self.frame_calls += draw_calls
+        items.clear()
+
+    def end_frame(self):
+        """Publish this frame's sprite and draw-call counts"""
+        self.sprites_drawn = self.frame_sprites
+        self.draw_calls = self.frame_calls
+        self.frame_sprites = 0
+        self.frame_calls = 0
+
+    def stats_text(self):
+        return f"{self.sprites_drawn} sprites / {self.draw_calls} draw calls"
@@ -0,0 +1,196 @@
+"""
+Rewind
+Compact binary snapshots of game state and a fixed-memory ring of them.
+
+A snapshot is one flat byte buffer: a fixed-size header of scalar fields,
+then every archetype table's live rows, column by column. Tables are padded
+to whole blocks of rows so their columns stay at the same offsets from frame
+to frame, which keeps the difference between consecutive snapshots sparse.
+
+The ring keeps the newest snapshot whole and every older one as the XOR
+with the snapshot after it, stored as a compressed bitmap of the 64-byte
+blocks that changed plus those blocks. Stepping back one frame undoes one
+delta, so scrubbing costs the same however much history is kept.
+"""
+
+import zlib
+import struct
+from collections import deque
+
+import numpy as np
+
+ROW_BLOCK = 256     # Tables are stored in whole blocks of this many rows
+DELTA_BLOCK = 64    # Deltas keep the changed 64-byte blocks; whole columns tend to change together
+
+
+class StateLayout:
+    """Fixed binary layout for a set of an object's attributes.
+    Fields are (name, struct format) for scalars or (name, dtype, length) for NumPy arrays"""
+    def __init__(self, *fields):
+        self.scalars = [name for name, *spec in fields if len(spec) == 1]
+        self.struct = struct.Struct('<' + ''.join(spec[0] for name, *spec in fields if len(spec) == 1))
+        self.arrays = [(name, np.dtype(spec[0]), spec[1]) for name, *spec in fields if len(spec) == 2]
+        self.size = self.struct.size + sum(dtype.itemsize * length for name, dtype, length in self.arrays)
+
+    def pack(self, obj):
+        parts = [self.struct.pack(*[getattr(obj, name) for name in self.scalars])]
+        for name, dtype, length in self.arrays:
+            parts.append(np.asarray(getattr(obj, name), dtype).tobytes())
+        return b''.join(parts)
+
+    def blank(self):
+        return bytes(self.size)
+
+    def unpack(self, obj, buffer, offset=0):
+        """Set obj's attributes from buffer at offset; arrays are filled in place. Returns the end offset"""
+        for name, value in zip(self.scalars, self.struct.unpack_from(buffer, offset)):
+            setattr(obj, name, value)
+        offset += self.struct.size
+        for name, dtype, length in self.arrays:
+            getattr(obj, name)[:] = np.frombuffer(buffer, dtype, length, offset)
+            offset += dtype.itemsize * length
+        return offset
+
+
+def stored_rows(count):
+    return -(-count // ROW_BLOCK) * ROW_BLOCK
+
+def pack_state(header, tables):
+    """One snapshot buffer: header bytes, then each table's row count and columns"""
+    header_size = -(-(len(header) + 4 * len(tables)) // 8) * 8
+    size = header_size + sum(stored_rows(table.count) * sum(column.itemsize for column in table.columns.values())
+                             for table in tables)
+    buffer = np.zeros(size, np.uint8)
+    buffer[:len(header)] = np.frombuffer(header, np.uint8)
+    buffer[len(header):len(header) + 4 * len(tables)] = np.array([table.count for table in tables],
+                                                                  np.uint32).view(np.uint8)
+    offset = header_size
+    for table in tables:
+        count, rows = table.count, stored_rows(table.count)
+        if not count:
+            continue
+        for column in table.columns.values():
+            buffer[offset:offset + count * column.itemsize] = column[:count].view(np.uint8)
+            offset += rows * column.itemsize
+    return buffer
+
+def unpack_state(buffer, header_size, tables):
+    """Refill tables from a snapshot buffer and return its header bytes"""
+    counts = np.frombuffer(buffer, np.uint32, len(tables), header_size).tolist()
+    offset = -(-(header_size + 4 * len(tables)) // 8) * 8
+    for table, count in zip(tables, counts):
+        rows = stored_rows(count)
+        table.count = 0
+        table.reserve(count)
+        for column in table.columns.values():
+            column[:count] = buffer[offset:offset + count * column.itemsize].view(column.dtype)
+            offset += rows * column.itemsize
+        table.count = count
+    return buffer[:header_size].tobytes()
+
+
+def blocks(buffer, size):
+    # The buffer as rows of DELTA_BLOCK bytes, zero-padded to size
+    if len(buffer) == size:
+        return buffer.view(np.uint64).reshape(-1, DELTA_BLOCK // 8)
+    padded = np.zeros(size, np.uint8)
+    padded[:len(buffer)] = buffer
+    return padded.view(np.uint64).reshape(-1, DELTA_BLOCK // 8)
+
+def delta_size(newer, older):
+    return -(-max(len(newer), len(older)) // DELTA_BLOCK) * DELTA_BLOCK
+
+def encode_delta(newer, older, scratch):
+    """The XOR of two snapshots as (bitmap of changed blocks, changed blocks).
+    scratch is a uint64 buffer with room for delta_size bytes"""
+    size = delta_size(newer, older)
+    xor = scratch[:size // 8].reshape(-1, DELTA_BLOCK // 8)
+    np.bitwise_xor(blocks(newer, size), blocks(older, size), out=xor)
+    # OR each block's words together a column at a time; much faster than any(axis=1) on such short rows
+    merged = xor[:, 0] | xor[:, 1]
+    for i in range(2, DELTA_BLOCK // 8):
+        merged |= xor[:, i]
+    changed = merged != 0
+    return zlib.compress(np.packbits(changed).tobytes(), 1), xor.take(np.flatnonzero(changed), axis=0)
+
+def decode_delta(newer, bitmap, changed_blocks, older_length, size):
+    """Rebuild the older snapshot from the newer one and their delta"""
+    changed = np.unpackbits(np.frombuffer(zlib.decompress(bitmap), np.uint8), count=size // DELTA_BLOCK)
+    older = np.empty(size, np.uint8)
+    older[:len(newer)] = newer
+    older[len(newer):] = 0
+    older_blocks = older.view(np.uint64).reshape(-1, DELTA_BLOCK // 8)
+    older_blocks[np.flatnonzero(changed)] ^= changed_blocks
+    return older[:older_length]
+
+
+class RewindBuffer:
+    """The last max_frames snapshots in a fixed block of memory, newest whole and the rest as deltas"""
+    def __init__(self, max_frames, capacity):
+        self.max_frames = max_frames
+        self.ring = np.zeros(capacity, np.uint8)
+        self.ring.fill(0)  # Touch every page now, so writing history never page-faults mid-game
+        self.scratch = np.zeros(0, np.uint64)
+        self.entries = deque()  # (start, blocks end, bitmap end, end, delta size, older length)
+        self.latest = None
+
+    def __len__(self):
+        return len(self.entries) + (self.latest is not None)
+
+    def clear(self):
+        self.entries.clear()
+        self.latest = None
+
+    def memory_used(self):
+        used = sum(entry[3] - entry[0] for entry in self.entries)
+        return used + (len(self.latest) if self.latest is not None else 0)
+
+    def push(self, snapshot):
+        if self.latest is not None:
+            size = delta_size(snapshot, self.latest)
+            if self.scratch.nbytes < size:
+                self.scratch = np.zeros(size // 4, np.uint64)  # Twice what's needed, to grow rarely
+            bitmap, changed = encode_delta(snapshot, self.latest, self.scratch)
+            # Blocks first, and every entry a whole number of 8 bytes, so the blocks stay aligned
+            entry_size = -(-(changed.nbytes + len(bitmap)) // 8) * 8
+            if entry_size > len(self.ring):
+                self.entries.clear()  # Too big to keep any history behind it
+            else:
+                while len(self.entries) >= self.max_frames - 1:
+                    self.entries.popleft()
+                start = self.reserve(entry_size)
+                blocks_end = start + changed.nbytes
+                bitmap_end = blocks_end + len(bitmap)
+                self.ring[start:blocks_end] = changed.view(np.uint8).ravel()
+                self.ring[blocks_end:bitmap_end] = np.frombuffer(bitmap, np.uint8)
+                self.entries.append((start, blocks_end, bitmap_end, start + entry_size, size, len(self.latest)))
+        self.latest = snapshot
+
+    def pop(self):
+        """Take the newest snapshot, making the one before it the newest"""
+        snapshot = self.latest
+        if self.entries:
+            start, blocks_end, bitmap_end, end, size, older_length = self.entries.pop()
+            self.latest = decode_delta(snapshot, self.ring[blocks_end:bitmap_end].tobytes(),
+                                       self.ring[start:blocks_end].view(np.uint64).reshape(-1, DELTA_BLOCK // 8),
+                                       older_length, size)
+        else:
+            self.latest = None
+        return snapshot
+
+    def reserve(self, size):
+        # Where the next entry goes: after the newest one, or back at the start of the ring,
+        # dropping the oldest entries until there is room
+        entries = self.entries
+        while entries:
+            oldest, newest = entries[0][0], entries[-1]
+            head = newest[3]
+            if newest[0] >= oldest:  # Entries run oldest to newest without wrapping
+                if head + size <= len(self.ring):
+                    return head
+                if size <= oldest:
+                    return 0
+            elif head + size <= oldest:
+                return head
+            entries.popleft()
+        return 0
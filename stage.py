@@ -0,0 +1,232 @@
+"""
+Stage Scripts
+Timed enemy spawns for NOVA STORM, read from JSON stage files.
+
+A stage is parsed once into a timeline sorted by spawn frame. A running game
+keeps a cursor into it and only looks at the spawns that fall due, so a frame
+costs nothing beyond the enemies it actually spawns.
+
+    python stage.py stages/stage1.json     # Check a stage and project its bullet counts
+"""
+
+import os
+import sys
+import json
+import argparse
+from collections import namedtuple
+
+FRAME_RATE = 60     # Stage times are in seconds; the timeline counts 60 fps frames
+SPAWN_Y = -50       # Default spawn height, just above the screen
+
+# One enemy (or the boss) entering. x is a share of the screen width so a stage fits any
+# resolution; offset is the enemy's place in its formation, in pixels from there
+Spawn = namedtuple('Spawn', 'frame kind x offset y')
+BOSS = 'boss'
+
+FORMATIONS = ['single', 'line', 'v', 'stream']
+
+
+class StageError(ValueError):
+    """A stage file that can't be played, with the event at fault in the message"""
+
+
+class Stage:
+    """A parsed stage: its name and every spawn, sorted by frame"""
+    def __init__(self, name, spawns):
+        self.name = name
+        self.spawns = sorted(spawns, key=lambda spawn: spawn.frame)  # Stable, so file order breaks ties
+        self.frames = [spawn.frame for spawn in self.spawns]
+        boss = [spawn.frame for spawn in self.spawns if spawn.kind == BOSS]
+        self.boss_frame = boss[0] if boss else None
+
+    def __len__(self):
+        return len(self.spawns)
+
+    def length(self):
+        return self.frames[-1] if self.frames else 0
+
+
+class StageCursor:
+    """Where one run is in a stage's timeline"""
+    def __init__(self, stage):
+        self.stage = stage
+        self.position = 0
+
+    def due(self, frame, slack=0.0):
+        """The spawns at or before frame that haven't been handed out yet"""
+        frames = self.stage.frames
+        start = end = self.position
+        while end < len(frames) and frames[end] <= frame + slack:
+            end += 1
+        self.position = end
+        return self.stage.spawns[start:end]
+
+    def finished(self):
+        return self.position >= len(self.stage.frames)
+
+# ============== LOADING ==============
+
+def load_stage(path, enemy_kinds):
+    """Parse and check a stage file. enemy_kinds are the enemy names the game knows"""
+    try:
+        with open(path) as f:
+            data = json.load(f)
+    except (OSError, ValueError) as e:
+        raise StageError(f"{path}: {e}")
+    if not isinstance(data, dict) or not isinstance(data.get('events'), list):
+        raise StageError(f"{path}: expected an object with an 'events' list")
+
+    name = data.get('name', os.path.splitext(os.path.basename(path))[0])
+    spawns = []
+    for i, event in enumerate(data['events']):
+        try:
+            spawns.extend(expand_event(event, enemy_kinds))
+        except StageError as e:
+            raise StageError(f"{path}: event {i + 1}: {e}")
+    boss = [spawn.frame for spawn in spawns if spawn.kind == BOSS]
+    if len(boss) > 1:
+        raise StageError(f"{path}: the boss can only enter once")
+    # The stage stops spawning once the boss is in, so anything later would never come
+    late = [spawn.frame for spawn in spawns if boss and spawn.frame > boss[0]]
+    if late:
+        raise StageError(f"{path}: {len(late)} spawn{'s' if len(late) != 1 else ''} after the boss at "
+                         f"{boss[0] / FRAME_RATE:g}s would never enter, the first at {min(late) / FRAME_RATE:g}s")
+    return Stage(name, spawns)
+
+def field(event, key, default, kind=float, low=None, high=None):
+    if key not in event:
+        if default is None:
+            raise StageError(f"'{key}' is required")
+        value = default
+    else:
+        value = event[key]
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        raise StageError(f"'{key}' must be a number, not {value!r}")
+    # int() would quietly truncate, hiding a typo like "count": 2.7
+    if kind is int and not number.is_integer():
+        raise StageError(f"'{key}' must be a whole number, not {value!r}")
+    value = kind(number)
+    if (low is not None and value < low) or (high is not None and value > high):
+        raise StageError(f"'{key}' must be between {low} and {high}, not {value}")
+    return value
+
+def expand_event(event, enemy_kinds):
+    """Turn one event into its spawns, including repeats and formation members"""
+    if not isinstance(event, dict):
+        raise StageError("expected an object")
+    time = field(event, 'time', None, low=0)
+    repeat = field(event, 'repeat', 1, int, low=1)
+    every = field(event, 'every', 0, low=0)
+    if repeat > 1 and every <= 0:
+        raise StageError("'repeat' needs 'every' seconds between repeats")
+
+    if event.get('boss'):
+        if repeat > 1:
+            raise StageError("the boss can't repeat")
+        return [Spawn(round(time * FRAME_RATE), BOSS, 0.5, 0, 0)]
+
+    kind = event.get('enemy')
+    if kind not in enemy_kinds:
+        raise StageError(f"unknown enemy {kind!r}, expected one of {', '.join(enemy_kinds)}")
+    formation = event.get('formation', 'single')
+    if formation not in FORMATIONS:
+        raise StageError(f"unknown formation {formation!r}, expected one of {', '.join(FORMATIONS)}")
+    count = 1 if formation == 'single' else field(event, 'count', None, int, low=1)
+    x = field(event, 'x', 0.5, low=0, high=1)
+    y = field(event, 'y', SPAWN_Y)
+    spacing = field(event, 'spacing', 80, low=0)
+    interval = field(event, 'interval', 0.5, low=0)
+
+    spawns = []
+    for r in range(repeat):
+        start = time + r * every
+        for i in range(count):
+            delay, offset, drop = 0, 0, 0
+            if formation == 'line':
+                offset = (i - (count - 1) / 2) * spacing
+            elif formation == 'v':
+                # Leader in front, the wings trailing back and out from it
+                side = 1 if i % 2 else -1
+                rank = (i + 1) // 2
+                offset = side * rank * spacing
+                drop = rank * spacing / 2
+            elif formation == 'stream':
+                delay = i * interval
+            frame = round((start + delay) * FRAME_RATE)
+            spawns.append(Spawn(frame, kind, x, offset, y - drop))
+    return spawns
+
+# ============== VALIDATOR ==============
+
+def project(stage, seed, lifetime, boss_seconds):
+    """Play the stage headless with nobody shooting back and every enemy destroyed lifetime
+    seconds after it spawns. Returns the peak live bullets, beams and enemies for each second"""
+    import bullet_hell as game  # The game imports this module, so it's only pulled in here
+
+    sim = game.Simulation(seed, stage=stage)
+    sim.player.invincible = float('inf')
+    frames = stage.length() + (boss_seconds if stage.boss_frame is not None else lifetime) * FRAME_RATE
+    seconds = []
+    for frame in range(int(frames)):
+        if frame % FRAME_RATE == 0:
+            seconds.append([0, 0, 0])
+        sim.step(game.Controls())
+        sim.sounds.clear()
+        for table in sim.enemies.values():
+            expired = table['time'] >= lifetime * FRAME_RATE
+            if expired.any():
+                sim.cancel(table['serial'][expired])
+                table.kill_where(expired)
+        peak = seconds[-1]
+        peak[0] = max(peak[0], len(sim.enemy_bullets))
+        peak[1] = max(peak[1], len(sim.lasers))
+        peak[2] = max(peak[2], sim.enemy_count() + (1 if sim.boss else 0))
+    return seconds
+
+def main():
+    parser = argparse.ArgumentParser(description="Check a NOVA STORM stage and project its bullet counts")
+    parser.add_argument('stage', help="stage file (JSON)")
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--lifetime', type=float, default=8,
+                        help="seconds each enemy lives before the projection destroys it (default: 8)")
+    parser.add_argument('--boss-seconds', type=int, default=48,
+                        help="seconds after the boss warning to project (default: 48, every pattern once)")
+    parser.add_argument('--budget', type=int, default=600,
+                        help="flag seconds whose peak bullet count goes over this (default: 600)")
+    args = parser.parse_args()
+
+    # No window or audio device needed
+    os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+    os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+    import bullet_hell as game
+    try:
+        stage = load_stage(args.stage, [kind.name for kind in game.ENEMY_KINDS])
+    except StageError as e:
+        print(f"error: {e}")
+        return 1
+
+    enemies = sum(1 for spawn in stage.spawns if spawn.kind != BOSS)
+    boss = f"boss at {stage.boss_frame / FRAME_RATE:.1f}s" if stage.boss_frame is not None else "no boss"
+    print(f"{stage.name}: {enemies} enemies over {stage.length() / FRAME_RATE:.1f}s, {boss}")
+
+    seconds = project(stage, args.seed, args.lifetime, args.boss_seconds)
+    if not seconds:
+        print("no frames projected")
+        return 0
+    print(f"peak live counts per second (seed {args.seed}, enemies destroyed after {args.lifetime:g}s):")
+    print("  second  bullets  beams  enemies")
+    worst = max(range(len(seconds)), key=lambda s: seconds[s][0])
+    scale = 40 / max(seconds[worst][0], args.budget)  # Bars to the bigger of the peak and the budget
+    for second, (bullets, beams, enemies) in enumerate(seconds):
+        bar = '#' * round(bullets * scale)
+        flag = "  over budget" if bullets > args.budget else ""
+        print(f"  {second:>6}  {bullets:>7}  {beams:>5}  {enemies:>7}  {bar}{flag}")
+    over = sum(1 for peak in seconds if peak[0] > args.budget)
+    print(f"peak {seconds[worst][0]} bullets at {worst}s; "
+          f"{over} second{'s' if over != 1 else ''} over the budget of {args.budget}")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
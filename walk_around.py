@@ -2,12 +2,21 @@
 Walk Around Game for Toddlers
 A cute character explores a colorful world!
 Perfect for 3-year-olds learning to use a controller or arrow keys.
+
+    python walk_around.py                            # Butterflies flutter about on their own
+    python walk_around.py --flock --butterflies 500  # A big flock that drifts between the flowers
 """
 
 import pygame
 import random
 import math
 import sys
+import argparse
+import numpy as np
+from render_queue import RenderQueue
+from flocking import Flock
+from daycycle import DayCycle
+from flower_cache import flower_sprites, phase, sprite_surface
 
 # Initialize Pygame
 pygame.init()
@@ -29,6 +38,7 @@ WHITE = (255, 255, 255)
 PINK = (255, 182, 193)
 PURPLE = (200, 162, 255)
 ORANGE = (255, 180, 100)
+BUTTERFLY_COLORS = [PINK, PURPLE, ORANGE, (100, 200, 255)]
 
 class Flower:
     """Pretty flowers that sway in the wind"""
@@ -52,28 +62,26 @@ class Flower:
         # Only draw if on screen
         if -50 < screen_x < SCREEN_WIDTH + 50 and -50 < screen_y < SCREEN_HEIGHT + 50:
             sway = math.sin(self.time * self.sway_speed + self.sway_offset) * 3
-
-            # Stem
-            pygame.draw.line(surface, (80, 160, 80),
-                           (int(screen_x), int(screen_y)),
-                           (int(screen_x + sway), int(screen_y + 20)), 3)
-
-            # Petals
-            for i in range(self.petals):
-                angle = (2 * math.pi * i / self.petals) + self.time * 0.01
-                petal_x = screen_x + sway + math.cos(angle) * self.size
-                petal_y = screen_y + math.sin(angle) * self.size
-                pygame.draw.circle(surface, self.color, (int(petal_x), int(petal_y)), self.size // 2)
-
-            # Center
-            pygame.draw.circle(surface, SUN_YELLOW, (int(screen_x + sway), int(screen_y)), self.size // 3)
+            step, sway = phase(self.time * 0.01, self.petals, sway)
+            x, y = int(screen_x), int(screen_y)
+            stem, (anchor_x, anchor_y) = flower_sprites.get(('meadow stem', sway), stem_sprite, sway)
+            surface.blit(stem, (x - anchor_x, y - anchor_y))
+            blossom, (anchor_x, anchor_y) = flower_sprites.blossom(self.petals, self.size, self.color, step, SUN_YELLOW)
+            surface.blit(blossom, (x + sway - anchor_x, y - anchor_y))
+
+def stem_sprite(sway):
+    """A flower's stem, anchored where it meets the blossom before it sways"""
+    sprite = sprite_surface(12, 24)
+    x, y = 6, 1
+    pygame.draw.line(sprite, (80, 160, 80), (x, y), (x + sway, y + 20), 3)
+    return sprite, (x, y)
 
 class Butterfly:
     """Butterflies that flutter around"""
     def __init__(self, x, y):
         self.x = x
         self.y = y
-        self.color = random.choice([PINK, PURPLE, ORANGE, (100, 200, 255)])
+        self.color = random.choice(BUTTERFLY_COLORS)
         self.time = random.uniform(0, 2 * math.pi)
         self.wing_speed = random.uniform(0.2, 0.4)
         self.move_angle = random.uniform(0, 2 * math.pi)
@@ -86,22 +94,42 @@ class Butterfly:
         self.x += math.cos(self.move_angle) * self.speed
         self.y += math.sin(self.move_angle) * self.speed + math.sin(self.time * 0.05) * 0.5
 
-    def draw(self, surface, camera_x, camera_y):
+    def draw(self, queue, camera_x, camera_y):
         screen_x = self.x - camera_x
         screen_y = self.y - camera_y
 
         if -50 < screen_x < SCREEN_WIDTH + 50 and -50 < screen_y < SCREEN_HEIGHT + 50:
             wing_flap = abs(math.sin(self.time * self.wing_speed))
             wing_size = int(8 * wing_flap) + 4
-
-            # Wings
-            pygame.draw.ellipse(surface, self.color,
-                              (int(screen_x - wing_size - 2), int(screen_y - 4), wing_size, 8))
-            pygame.draw.ellipse(surface, self.color,
-                              (int(screen_x + 2), int(screen_y - 4), wing_size, 8))
-            # Body
-            pygame.draw.ellipse(surface, (50, 50, 50),
-                              (int(screen_x - 2), int(screen_y - 5), 4, 10))
+            sprite = butterfly_sprite(self.color, wing_size)
+            queue.submit(sprite, (int(screen_x) - wing_size - 3, int(screen_y) - 6))
+
+def draw_flock(flock, queue, camera_x, camera_y):
+    """Every flock butterfly on screen, drawn like Butterfly.draw"""
+    table = flock.table
+    rows = flock.visible(camera_x - 50, camera_y - 50, camera_x + SCREEN_WIDTH + 50, camera_y + SCREEN_HEIGHT + 50)
+    screen_x = (table['x'][rows] - camera_x).astype(int)
+    screen_y = (table['y'][rows] - camera_y).astype(int)
+    wing_size = (8 * abs(np.sin(table['time'][rows] * table['wing_speed'][rows]))).astype(int) + 4
+    for x, y, color, wing in zip(screen_x.tolist(), screen_y.tolist(), table['color'][rows].tolist(), wing_size.tolist()):
+        queue.submit(butterfly_sprite(BUTTERFLY_COLORS[color], wing), (x - wing - 3, y - 6))
+
+butterfly_sprites = {}
+
+def butterfly_sprite(color, wing_size):
+    """One cached sprite per color and wing flap size"""
+    key = (color, wing_size)
+    sprite = butterfly_sprites.get(key)
+    if sprite is None:
+        c = wing_size + 3
+        sprite = pygame.Surface((c * 2, 12), pygame.SRCALPHA)
+        # Wings
+        pygame.draw.ellipse(sprite, color, (c - wing_size - 2, 2, wing_size, 8))
+        pygame.draw.ellipse(sprite, color, (c + 2, 2, wing_size, 8))
+        # Body
+        pygame.draw.ellipse(sprite, (50, 50, 50), (c - 2, 1, 4, 10))
+        sprite = butterfly_sprites[key] = sprite.convert_alpha()
+    return sprite
 
 class Cloud:
     """Fluffy clouds drifting by"""
@@ -110,11 +138,26 @@ class Cloud:
         self.y = y
         self.speed = random.uniform(0.2, 0.5)
         self.size = random.uniform(0.8, 1.5)
+        self.sprite = self.make_sprite()
+
+    def make_sprite(self):
+        size = int(40 * self.size)
+        # Puffs reach 1.5 sizes left/right, 1 size above and 0.8 sizes + 10 below the center
+        cx = int(size * 1.5) + 1
+        cy = size + 1
+        sprite = pygame.Surface((cx * 2, cy + int(size * 0.8) + 12), pygame.SRCALPHA)
+        pygame.draw.circle(sprite, WHITE, (cx, cy), size)
+        pygame.draw.circle(sprite, WHITE, (int(cx - size * 0.7), cy + 10), int(size * 0.7))
+        pygame.draw.circle(sprite, WHITE, (int(cx + size * 0.7), cy + 5), int(size * 0.8))
+        pygame.draw.circle(sprite, WHITE, (int(cx - size * 0.3), int(cy - size * 0.4)), int(size * 0.6))
+        pygame.draw.circle(sprite, WHITE, (int(cx + size * 0.4), int(cy - size * 0.3)), int(size * 0.5))
+        self.sprite_offset = (cx, cy)
+        return sprite.convert_alpha()
 
     def update(self):
         self.x += self.speed
 
-    def draw(self, surface, camera_x, camera_y):
+    def draw(self, queue, camera_x, camera_y):
         screen_x = self.x - camera_x * 0.3  # Parallax - clouds move slower
         screen_y = self.y
 
@@ -123,12 +166,8 @@ class Cloud:
             self.x -= SCREEN_WIDTH + 400
 
         if -200 < screen_x < SCREEN_WIDTH + 200:
-            size = int(40 * self.size)
-            pygame.draw.circle(surface, WHITE, (int(screen_x), int(screen_y)), size)
-            pygame.draw.circle(surface, WHITE, (int(screen_x - size * 0.7), int(screen_y + 10)), int(size * 0.7))
-            pygame.draw.circle(surface, WHITE, (int(screen_x + size * 0.7), int(screen_y + 5)), int(size * 0.8))
-            pygame.draw.circle(surface, WHITE, (int(screen_x - size * 0.3), int(screen_y - size * 0.4)), int(size * 0.6))
-            pygame.draw.circle(surface, WHITE, (int(screen_x + size * 0.4), int(screen_y - size * 0.3)), int(size * 0.5))
+            ox, oy = self.sprite_offset
+            queue.submit(self.sprite, (int(screen_x) - ox, int(screen_y) - oy))
 
 class Footprint:
     """Little footprints left behind"""
@@ -254,6 +293,11 @@ class Character:
                           (int(screen_x + 4), int(screen_y + 25 - foot_offset), 18, 12))
 
 def main():
+    parser = argparse.ArgumentParser(description="Ellie's Adventure")
+    parser.add_argument('--flock', action='store_true', help="butterflies fly together and visit the flowers")
+    parser.add_argument('--butterflies', type=int, default=20)
+    args = parser.parse_args()
+
     clock = pygame.time.Clock()
 
     # World size (bigger than screen for exploration)
@@ -270,7 +314,18 @@ def main():
 
     butterflies = [Butterfly(random.randint(0, WORLD_WIDTH),
                             random.randint(0, WORLD_HEIGHT // 2))
-                   for _ in range(20)]
+                   for _ in range(args.butterflies)]
+
+    # Flocking butterflies live in one table instead
+    flock = None
+    if args.flock:
+        flock = Flock(max_speed=1.5, bounds=(0, 50, WORLD_WIDTH, WORLD_HEIGHT // 2))
+        flock.add_many(np.array([b.x for b in butterflies], float), np.array([b.y for b in butterflies], float),
+                       np.array([BUTTERFLY_COLORS.index(b.color) for b in butterflies]),
+                       np.array([b.wing_speed for b in butterflies]), np.array([b.time for b in butterflies]))
+        butterflies = []
+        flower_x = np.array([flower.x for flower in flowers], float)
+        flower_y = np.array([flower.y for flower in flowers], float)
 
     clouds = [Cloud(random.randint(-200, SCREEN_WIDTH + 200),
                    random.randint(50, 200))
@@ -296,8 +351,13 @@ def main():
 
     pygame.mouse.set_visible(False)
     running = True
+    render_queue = RenderQueue()
+    show_stats = False
+    day = DayCycle((135, 206, 235), SCREEN_WIDTH, SCREEN_HEIGHT)
+    time_counter = 0
 
     while running:
+        time_counter += 1
         # Event handling
         for event in pygame.event.get():
             if event.type == pygame.QUIT:
@@ -305,6 +365,8 @@ def main():
             elif event.type == pygame.KEYDOWN:
                 if event.key == pygame.K_ESCAPE:
                     running = False
+                elif event.key == pygame.K_F3:
+                    show_stats = not show_stats
 
         # Get input
         dx, dy = 0, 0
@@ -364,6 +426,15 @@ def main():
             # Keep butterflies in world
             butterfly.x = max(0, min(WORLD_WIDTH, butterfly.x))
             butterfly.y = max(50, min(WORLD_HEIGHT // 2, butterfly.y))
+        if flock is not None:
+            # Now and then a butterfly heads for one of the three flowers nearest it
+            rows = flock.retargeting(0.01)
+            if len(rows):
+                d2 = (flower_x - flock.table['x'][rows, None]) ** 2 + (flower_y - flock.table['y'][rows, None]) ** 2
+                nearest = np.argpartition(d2, 2, axis=1)[:, :3]
+                pick = nearest[np.arange(len(rows)), flock.rng.integers(3, size=len(rows))]
+                flock.set_target(rows, flower_x[pick], flower_y[pick] - 30)
+            flock.step()
         for cloud in clouds:
             cloud.update()
         for footprint in footprints[:]:
@@ -371,34 +442,34 @@ def main():
             if footprint.life <= 0:
                 footprints.remove(footprint)
 
+        # Time of day and weather
+        day.update(time_counter)
+
         # Draw
-        # Sky gradient
-        for y in range(SCREEN_HEIGHT // 2):
-            ratio = y / (SCREEN_HEIGHT // 2)
-            color = (
-                int(100 + 35 * ratio),
-                int(180 + 26 * ratio),
-                int(255 - 20 * ratio)
-            )
-            pygame.draw.line(screen, color, (0, y), (SCREEN_WIDTH, y))
+        # Sky gradient, redrawn only when the time of day or the rain changes it
+        screen.blit(day.sky_gradient((100, 180, 255), (135, 206, 235), SCREEN_HEIGHT // 2), (0, 0))
 
         # Grass
         pygame.draw.rect(screen, GRASS_GREEN, (0, SCREEN_HEIGHT // 2, SCREEN_WIDTH, SCREEN_HEIGHT // 2))
 
-        # Sun
+        # Sun, or the moon at night
         sun_x = SCREEN_WIDTH - 150
         sun_y = 100
-        pygame.draw.circle(screen, SUN_YELLOW, (sun_x, sun_y), 60)
-        # Sun rays
-        for i in range(12):
-            angle = i * math.pi / 6 + pygame.time.get_ticks() * 0.001
-            ray_x = sun_x + math.cos(angle) * 80
-            ray_y = sun_y + math.sin(angle) * 80
-            pygame.draw.line(screen, SUN_YELLOW, (sun_x, sun_y), (int(ray_x), int(ray_y)), 4)
+        if day.is_day():
+            pygame.draw.circle(screen, SUN_YELLOW, (sun_x, sun_y), 60)
+            # Sun rays
+            for i in range(12):
+                angle = i * math.pi / 6 + pygame.time.get_ticks() * 0.001
+                ray_x = sun_x + math.cos(angle) * 80
+                ray_y = sun_y + math.sin(angle) * 80
+                pygame.draw.line(screen, SUN_YELLOW, (sun_x, sun_y), (int(ray_x), int(ray_y)), 4)
+        else:
+            day.draw_moon(screen, sun_x, sun_y)
 
         # Clouds
         for cloud in clouds:
-            cloud.draw(screen, camera_x, camera_y)
+            cloud.draw(render_queue, camera_x, camera_y)
+        render_queue.flush(screen)
 
         # Footprints
         for footprint in footprints:
@@ -415,12 +486,32 @@ def main():
 
         # Butterflies (in front of character)
         for butterfly in butterflies:
-            butterfly.draw(screen, camera_x, camera_y)
+            butterfly.draw(render_queue, camera_x, camera_y)
+        if flock is not None:
+            draw_flock(flock, render_queue, camera_x, camera_y)
+
+        # Rain, then light the whole scene for the time of day in one pass
+        day.rain.draw(render_queue)
+        render_queue.flush(screen)
+        day.tint(screen)
 
         # Exit hint
         hint_text = small_font.render("Press ESC to exit | Arrow Keys or Left Stick to move", True, (80, 80, 80))
         screen.blit(hint_text, (SCREEN_WIDTH - 420, SCREEN_HEIGHT - 30))
 
+        # Batching stats (F3, for grown-ups)
+        render_queue.end_frame()
+        if show_stats:
+            stats_text = small_font.render(render_queue.stats_text(), True, (80, 80, 80))
+            screen.blit(stats_text, (20, 20))
+            if flock is not None:
+                flock_text = small_font.render(f"Flock: {len(flock)} butterflies, {flock.neighbors:.1f} neighbors each, "
+                                               f"{flock.pairs} pairs too close",
+                                               True, (80, 80, 80))
+                screen.blit(flock_text, (20, 45))
+            day_text = small_font.render(day.stats_text(), True, (80, 80, 80))
+            screen.blit(day_text, (20, 70))
+
         pygame.display.flip()
         clock.tick(60)
 